@@ -0,0 +1,21 @@
+"""ASGI config for AWFM project: HTTP through Django, WebSockets through Channels."""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'awfm.settings')
+django_application = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402 (needs the app registry)
+from channels.security.websocket import OriginValidator  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from questionnaire.consumers import JWTQueryAuthMiddleware  # noqa: E402
+from questionnaire.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_application,
+    # Frontends are on CORS origins rather than ALLOWED_HOSTS, so both are accepted.
+    'websocket': OriginValidator(
+        JWTQueryAuthMiddleware(URLRouter(websocket_urlpatterns)), settings.WEBSOCKET_ALLOWED_ORIGINS,
+    ),
+})
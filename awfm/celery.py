@@ -0,0 +1,10 @@
+"""Celery app for background tasks (`celery -A awfm worker`); web processes never import it."""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'awfm.settings')
+
+app = Celery('awfm')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
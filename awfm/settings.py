@@ -2,6 +2,8 @@
 Django settings for AWFM Questionnaire project.
 """
 import os
+import sys
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
@@ -14,10 +16,14 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-change-me-in-producti
 
 DEBUG = os.environ.get('DEBUG', 'True').lower() == 'true'
 
+# Running the test suite (manage.py test)
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 # Application definition
 INSTALLED_APPS = [
+    'daphne',  # ASGI runserver, so WebSockets work in development
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -26,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     # Third party
     'rest_framework',
+    'channels',
     'corsheaders',
     'cloudinary_storage',
     'cloudinary',
@@ -37,8 +44,11 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'questionnaire.User'
 
 MIDDLEWARE = [
+    'questionnaire.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'questionnaire.middleware.APICompressionMiddleware',
+    'questionnaire.middleware.LoadSheddingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,6 +77,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'awfm.wsgi.application'
+ASGI_APPLICATION = 'awfm.asgi.application'
 
 # Database
 DATABASE_URL = os.environ.get('DATABASE_URL')
@@ -99,7 +110,8 @@ USE_TZ = True
 # Static files
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Hashed names (12 hex chars, as ManifestStaticFilesStorage and content bundles use) are cached forever
+WHITENOISE_IMMUTABLE_FILE_TEST = r'^.+\.[0-9a-f]{12}\..+$'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -112,20 +124,275 @@ CORS_ALLOW_ALL_ORIGINS = DEBUG
 
 # REST Framework
 REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'questionnaire.authentication.CachedJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'questionnaire.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'questionnaire.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'questionnaire.throttling.BucketThrottle',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
 }
 
+# Redis (Celery broker, throttling, shared cache)
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {'socket_timeout': 1, 'socket_connect_timeout': 1},
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Celery (background tasks; see awfm/celery.py)
+CELERY_BROKER_URL = REDIS_URL or 'memory://'
+CELERY_TASK_IGNORE_RESULT = True
+
+# Care-team notification digests (questionnaire.notifications): digest windows per
+# preference frequency, how often due digests are collected, and digests per send task
+NOTIFICATIONS = {
+    'WINDOWS': {'hourly': 60 * 60, 'daily': 24 * 60 * 60},
+    'POLL_SECONDS': int(os.environ.get('NOTIFICATIONS_POLL_SECONDS', '300')),
+    'FAN_OUT_LIMIT': 1000,
+    'BATCH_SIZE': 100,
+}
+# AI interaction retention (questionnaire.retention): days kept in the hot table, days
+# kept (compressed) in the archive, and rows moved per batch
+AI_RETENTION = {
+    'HOT_DAYS': int(os.environ.get('AI_RETENTION_HOT_DAYS', '90')),
+    'ARCHIVE_DAYS': int(os.environ.get('AI_RETENTION_ARCHIVE_DAYS', '730')),
+    'BATCH_SIZE': 1000,
+    'PAUSE_SECONDS': 0.2,
+}
+# Peer similarity (questionnaire.similarity): metric ('jaccard' or 'cosine'), neighbors kept
+# per user, size of each block's score matrix, and how often changed users are refreshed
+SIMILARITY = {
+    'METRIC': os.environ.get('SIMILARITY_METRIC', 'jaccard'),
+    'NEIGHBORS': 20,
+    'BLOCK_BYTES': 16 * 1024 * 1024,
+    'REFRESH_SECONDS': 300,
+    'REFRESH_LIMIT': 5000,
+}
+# Batched autosave (questionnaire.autosave, /api/responses/ops/): operations per request,
+# and how long an Idempotency-Key's response is replayed / held while its request runs
+AUTOSAVE = {
+    'MAX_OPS': 500,
+    'IDEMPOTENCY_TTL': 24 * 60 * 60,
+    'PENDING_TTL': 60,
+}
+# User data erasure (questionnaire.erasure): how often new requests are started and after how
+# long a started request that never ran is started again, rows per DELETE, pause between
+# batches, and media files deleted per run and tries per file before the erasure is marked failed
+ERASURE = {
+    'POLL_SECONDS': 60,
+    'CLAIM_TIMEOUT_SECONDS': 15 * 60,
+    'BATCH_SIZE': 2000,
+    'PAUSE_SECONDS': 0.05,
+    'MEDIA_BATCH_SIZE': 200,
+    'MEDIA_MAX_ATTEMPTS': 5,
+}
+# PHI audit trail (questionnaire.audit): where flushed events go (Redis list drained by the
+# worker, or straight to the database), events held per process, flush interval and batch
+# sizes, and how many monthly PostgreSQL partitions to create ahead. Tests flush explicitly:
+# a background writer would hold SQLite's write lock while test cases run.
+AUDIT = {
+    'ENABLED': os.environ.get('AUDIT_ENABLED', 'True').lower() == 'true',
+    'BACKGROUND_FLUSH': not TESTING,
+    'SINK': (
+        {'BACKEND': 'questionnaire.audit.RedisAuditSink', 'URL': REDIS_URL} if REDIS_URL
+        else {'BACKEND': 'questionnaire.audit.DatabaseAuditSink'}
+    ),
+    'BUFFER_SIZE': 10000,
+    'FLUSH_SECONDS': 1.0,
+    'BATCH_SIZE': 500,
+    'DRAIN_SECONDS': 10,
+    'DRAIN_BATCH_SIZE': 2000,
+    'PARTITION_MONTHS_AHEAD': 2,
+}
+# Content images (questionnaire.images): how sources are fetched (IMAGE_SOURCE_DIR reads local
+# files instead, for offline work), variant widths and formats (best first; formats this Pillow
+# build cannot write are skipped), encoder quality, the variant served as `image`, the largest
+# source accepted, tries per image, how often new images are picked up and how many per run,
+# how often each process reloads ready images, and how long clients may cache a variant
+IMAGES = {
+    'FETCHER': (
+        {'BACKEND': 'questionnaire.images.LocalFileFetcher', 'ROOT': os.environ['IMAGE_SOURCE_DIR']}
+        if os.environ.get('IMAGE_SOURCE_DIR')
+        else {'BACKEND': 'questionnaire.images.HTTPFetcher', 'TIMEOUT': 10, 'MAX_BYTES': 20 * 1024 * 1024}
+    ),
+    'WIDTHS': [320, 480, 640, 960, 1280],
+    'FORMATS': ['avif', 'webp'],
+    'QUALITY': {'avif': 55, 'webp': 80},
+    'DEFAULT_FORMAT': 'webp',
+    'DEFAULT_WIDTH': 640,
+    'MAX_PIXELS': 40_000_000,
+    'MAX_ATTEMPTS': 5,
+    'POLL_SECONDS': 60,
+    'BATCH_SIZE': 20,
+    'LOOKUP_SECONDS': 30,
+    'CACHE_SECONDS': 365 * 24 * 60 * 60,
+}
+# Hash partitioning of the response tables by user (questionnaire.partitioning, PostgreSQL
+# only): partitions per table, rows copied per batch and pause between batches, and how long
+# the swap waits for its table lock per attempt and how many attempts it makes
+RESPONSE_PARTITIONS = {
+    'PARTITIONS': int(os.environ.get('RESPONSE_PARTITIONS', '16')),
+    'BATCH_SIZE': 20000,
+    'PAUSE_SECONDS': 0.05,
+    'LOCK_TIMEOUT': '2s',
+    'SWAP_ATTEMPTS': 10,
+}
+CELERY_BEAT_SCHEDULE = {
+    'process-notifications': {
+        'task': 'questionnaire.tasks.process_notifications',
+        'schedule': NOTIFICATIONS['POLL_SECONDS'],
+    },
+    'refresh-similarity': {
+        'task': 'questionnaire.tasks.refresh_similarity',
+        'schedule': SIMILARITY['REFRESH_SECONDS'],
+    },
+    'rebuild-similarity': {
+        'task': 'questionnaire.tasks.rebuild_similarity',
+        'schedule': 24 * 60 * 60,
+    },
+    'drain-audit-events': {
+        'task': 'questionnaire.tasks.drain_audit_events',
+        'schedule': AUDIT['DRAIN_SECONDS'],
+    },
+    'ensure-audit-partitions': {
+        'task': 'questionnaire.tasks.ensure_audit_partitions',
+        'schedule': 24 * 60 * 60,
+    },
+    'process-pending-images': {
+        'task': 'questionnaire.tasks.process_pending_images',
+        'schedule': IMAGES['POLL_SECONDS'],
+    },
+    'start-erasures': {
+        'task': 'questionnaire.tasks.start_erasures',
+        'schedule': ERASURE['POLL_SECONDS'],
+    },
+    'delete-erased-media': {
+        'task': 'questionnaire.tasks.delete_erased_media',
+        'schedule': 60 * 60,
+    },
+    'archive-ai-interactions': {
+        'task': 'questionnaire.tasks.archive_ai_interactions',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Email: SendGrid through Anymail when configured, the console otherwise
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+if os.environ.get('SENDGRID_API_KEY'):
+    EMAIL_BACKEND = 'anymail.backends.sendgrid.EmailBackend'
+    ANYMAIL = {'SENDGRID_API_KEY': os.environ['SENDGRID_API_KEY']}
+else:
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Channel layer for WebSocket push (questionnaire.realtime); in-memory only works within one process
+if REDIS_URL:
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer', 'CONFIG': {'hosts': [REDIS_URL]}}}
+else:
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+# Origins that may open WebSockets (awfm.asgi): the API's own hosts and the frontends allowed by CORS
+WEBSOCKET_ALLOWED_ORIGINS = ['*'] if CORS_ALLOW_ALL_ORIGINS else ALLOWED_HOSTS + CORS_ALLOWED_ORIGINS
+
+# JWT auth: short-lived access tokens, single-use rotating refresh tokens
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=14),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': False,  # Revocation uses the cache denylist instead
+    'UPDATE_LAST_LOGIN': False,
+}
+# Process-local cache of authenticated users (questionnaire.authentication)
+JWT_USER_CACHE = {'TTL': 60, 'MAX_SIZE': 10000}
+
+# Token-bucket rate limits (questionnaire.throttling): sustained rate plus burst size
+THROTTLE_BUCKETS = {
+    'ai': {'rate': '10/min', 'burst': 5},
+    'write': {'rate': '120/min', 'burst': 30},
+    'read': {'rate': '600/min', 'burst': 120},
+    # Placeholder users created by anonymous legacy writes (questionnaire.backfill.mirror_response)
+    'legacy_user': {'rate': '30/hour', 'burst': 10},
+}
+if REDIS_URL:
+    THROTTLE_BACKEND = {'BACKEND': 'questionnaire.throttling.RedisTokenBucketBackend', 'URL': REDIS_URL}
+else:
+    THROTTLE_BACKEND = {'BACKEND': 'questionnaire.throttling.MemoryTokenBucketBackend'}
+
+# Shed low-priority traffic when a worker is saturated (questionnaire.middleware)
+LOAD_SHEDDING = {
+    'ENABLED': os.environ.get('LOAD_SHEDDING_ENABLED', 'True').lower() == 'true',
+    'MAX_QUEUE_SECONDS': float(os.environ.get('LOAD_SHEDDING_MAX_QUEUE_SECONDS', '2.0')),
+    'MAX_LATENCY_SECONDS': float(os.environ.get('LOAD_SHEDDING_MAX_LATENCY_SECONDS', '3.0')),
+    'LOW_PRIORITY_SCOPES': ['ai'],
+    'LOW_PRIORITY_PREFIXES': ['/api/me/export/'],
+    'RETRY_AFTER': 5,
+}
+
+# API response compression (questionnaire.middleware.APICompressionMiddleware)
+API_COMPRESSION_PREFIX = '/api/'
+API_COMPRESSION_MIN_SIZE = int(os.environ.get('API_COMPRESSION_MIN_SIZE', '1024'))
+API_BROTLI_QUALITY = 5
+
+# Prometheus metrics (questionnaire.metrics); set METRICS_TOKEN to require it on scrapes
+METRICS = {
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+    'CELERY_BROKER_URL': REDIS_URL,
+    'CELERY_QUEUES': ['celery'],
+}
+
+# /api/ready/ probes (questionnaire.health): per-probe timeout and how long a result is reused
+READINESS = {
+    'CHECKS': ['database', 'cache'] + (['storage'] if os.environ.get('CLOUDINARY_CLOUD_NAME') else []),
+    'TIMEOUT': float(os.environ.get('READINESS_TIMEOUT', '1.0')),
+    'CACHE_SECONDS': 5,
+}
+
+# Legacy response backfill (questionnaire.backfill): the main question the legacy q1-q3
+# checkpoints belong to, chunking and the share of database time a run may use
+LEGACY_BACKFILL = {
+    'MAIN_QUESTION': os.environ.get('LEGACY_MAIN_QUESTION', 'q10a'),
+    'CHUNK_SIZE': 500,
+    'TARGET_SECONDS': 0.5,
+    'MAX_LOAD': float(os.environ.get('BACKFILL_MAX_LOAD', '0.25')),
+}
+
+# Research exports: key for pseudonymizing user ids (keep out of the export itself)
+RESEARCH_EXPORT_KEY = os.environ.get('RESEARCH_EXPORT_KEY', '')
+
 # Cloudinary settings
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME', ''),
     'API_KEY': os.environ.get('CLOUDINARY_API_KEY', ''),
     'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET', ''),
 }
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+STORAGES = {
+    'default': {'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    # Content image originals and variants (questionnaire.images), stored byte for byte
+    'images': (
+        {'BACKEND': 'cloudinary_storage.storage.RawMediaCloudinaryStorage'} if CLOUDINARY_STORAGE['CLOUD_NAME']
+        else {'BACKEND': 'django.core.files.storage.FileSystemStorage',
+              'OPTIONS': {'location': BASE_DIR / 'media' / 'images'}}
+    ),
+}
 
 # Media files
 MEDIA_URL = '/media/'
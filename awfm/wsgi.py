@@ -4,3 +4,21 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'awfm.settings')
 application = get_wsgi_application()
+
+
+def warm_up():
+    """
+    Import what the first request would otherwise import lazily (URLconf,
+    views, DRF renderers and parsers), so a preloading master does it once
+    and workers share the modules copy-on-write. Opens no connections.
+    """
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    get_resolver().url_patterns
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES',
+                 'DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_THROTTLE_CLASSES'):
+        getattr(api_settings, name)
+
+
+warm_up()
@@ -0,0 +1,40 @@
+"""Gunicorn settings: load the app once in the master and fork workers from it."""
+import gc
+import os
+import tempfile
+from pathlib import Path
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = True
+
+# Workers write metrics here and /api/metrics/ aggregates them (questionnaire.metrics).
+# Must be set before the app, and so prometheus_client, is loaded; stale files are
+# from workers of a previous run.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'awfm-metrics'))
+_metrics_dir = Path(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+_metrics_dir.mkdir(parents=True, exist_ok=True)
+for _stale in _metrics_dir.glob('*.db'):
+    _stale.unlink()
+
+
+def pre_fork(server, worker):
+    # Sockets must not be shared across processes; workers open their own.
+    from django.db import connections
+    connections.close_all()
+    # Keep the garbage collector from touching (and so copying) the preloaded objects.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from django.core.cache import caches
+    from questionnaire.throttling import reset_backend
+
+    caches.close_all()
+    reset_backend()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
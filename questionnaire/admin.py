@@ -1,26 +1,594 @@
 """Admin configuration for the AWFM Questionnaire."""
-from django.contrib import admin
-from .models import Question, Choice, TeamMember, MainScreenQuestion, Response
+import json
+from datetime import timedelta
 
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-@admin.register(MainScreenQuestion)
-class MainScreenQuestionAdmin(admin.ModelAdmin):
-    list_display = ['title', 'subtitle', 'section_label']
+from .models import (
+    User, Section, MainQuestion, Checkpoint, Choice,
+    QuestionResponse, CheckpointResponse, SelectedChoice, Explanation,
+    CareTeam, TeamMembership, TeamInvitation, PlanSnapshot,
+    Reaction, Comment, AIInteraction, AIInteractionArchive, AIUsageTotal, BackfillCheckpoint,
+    LegacyMainScreenQuestion, LegacyQuestion, LegacyChoice, LegacyResponse, LegacyResponseChoice, LegacyTeamMember,
+    ErasureRequest, MediaDeletion, AuditEvent, ImageAsset,
+)
+from .erasure import request_erasure
+from .images import image_fields
+from .retention import ai_usage, decompress_payload
+from .signals import bulk_saved
 
 
-@admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
-    list_display = ['key', 'title', 'subtitle', 'checkpoint_label', 'order']
+# =============================================================================
+# LARGE-TABLE HELPERS
+# =============================================================================
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) on large PostgreSQL tables.
+
+    Unfiltered changelists use the table's pg_class.reltuples; filtered ones
+    use the planner's row estimate. Exact counts are only run when the
+    estimate is below `exact_threshold`, where they are cheap anyway.
+    """
+    exact_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                estimate = row[0] if row else -1
+            else:
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                estimate = int(plan[0]['Plan']['Plan Rows'])
+
+        # reltuples is -1 for never-analyzed tables.
+        if estimate < self.exact_threshold:
+            return super().count
+        return estimate
+
+
+class CreatedBeforeFilter(admin.SimpleListFilter):
+    """
+    Keyset paging on (created_at, id), newest first.
+
+    Used instead of date_hierarchy, whose drill-down runs DISTINCT date
+    queries over the whole table, and instead of deep ?p= pages, whose
+    OFFSET reads and discards every row before the page. Both choices seek
+    the created_at index: a point in time, or "Older than this page", which
+    continues after the last row shown.
+    """
+    title = 'created before'
+    parameter_name = 'created_before'
+    windows = [
+        ('1d', 'Yesterday', timedelta(days=1)),
+        ('7d', '1 week ago', timedelta(days=7)),
+        ('30d', '1 month ago', timedelta(days=30)),
+        ('90d', '3 months ago', timedelta(days=90)),
+        ('365d', '1 year ago', timedelta(days=365)),
+    ]
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, label, _ in self.windows]
+
+    def queryset(self, request, queryset):
+        for key, _, delta in self.windows:
+            if self.value() == key:
+                return queryset.filter(created_at__lt=timezone.now() - delta)
+        cursor = self._cursor()
+        if cursor:
+            created_at, pk = cursor
+            return queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, pk__gte=pk)
+        return queryset
+
+    def choices(self, changelist):
+        yield from super().choices(changelist)
+        rows = changelist.result_list
+        # Keys only follow the page order when it is the default, newest first.
+        if ORDER_VAR not in changelist.params and len(rows) == changelist.list_per_page:
+            last = rows[len(rows) - 1]
+            yield {
+                'selected': False,
+                'query_string': changelist.get_query_string(
+                    {self.parameter_name: f'{last.created_at.isoformat()}|{last.pk}'}, [PAGE_VAR],
+                ),
+                'display': 'Older than this page',
+            }
+
+    def _cursor(self):
+        created_at, _, pk = (self.value() or '').partition('|')
+        try:
+            created_at = parse_datetime(created_at)
+            return (created_at, int(pk)) if created_at else None
+        except ValueError:
+            return None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Defaults for tables that grow with users: estimated counts, no second
+    unfiltered count, and newest-first ordering on indexed columns.
+    `str_select_related` lists the joins the model's __str__ walks, so
+    autocomplete results and change forms do not query once per row.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    str_select_related = ()
+    bulk_batch_size = 2000
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.str_select_related:
+            queryset = queryset.select_related(*self.str_select_related)
+        return queryset
+
+    def bulk_update(self, request, queryset, message, **values):
+        """
+        Apply `values` to the selected rows that differ, with one UPDATE per
+        bulk_batch_size rows. UPDATE sends no signals, so bulk_saved() does
+        their work: delta sync, caches, sockets and similarity.
+        """
+        with transaction.atomic():
+            # Taken first: the UPDATE can move rows out of a filtered changelist's queryset.
+            pks = list(queryset.exclude(**values).values_list('pk', flat=True))
+            for start in range(0, len(pks), self.bulk_batch_size):
+                batch = pks[start:start + self.bulk_batch_size]
+                queryset.model.objects.filter(pk__in=batch).update(**values)
+                bulk_saved(queryset.model, batch)
+        self.message_user(request, message.format(count=len(pks)), messages.SUCCESS)
+
+
+# =============================================================================
+# USER
+# =============================================================================
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    list_display = ['email', 'username', 'first_name', 'last_name', 'is_staff', 'date_joined']
+    search_fields = ['email', 'username', 'first_name', 'last_name']
+    ordering = ['-date_joined']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Profile', {'fields': ('avatar', 'bio')}),
+        ('AI usage', {'fields': ('ai_usage_summary',)}),
+    )
+    readonly_fields = ['ai_usage_summary']
+    add_fieldsets = (
+        (None, {
+            'classes': ('wide',),
+            'fields': ('email', 'username', 'password1', 'password2'),
+        }),
+    )
+    actions = ['erase_data']
+
+    @admin.action(description="Erase selected users' data (deletion request)")
+    def erase_data(self, request, queryset):
+        with transaction.atomic():
+            for user in queryset:
+                request_erasure(user, requested_by=request.user)
+        self.message_user(request, f'Queued erasure of {len(queryset)} users; see Erasure requests.', messages.SUCCESS)
+
+    @admin.display(description='AI usage')
+    def ai_usage_summary(self, obj):
+        """Lifetime usage: interactions still in AIInteraction plus the archived totals."""
+        usage = ai_usage([obj.pk])[obj.pk]
+        return f"{usage['tokens_used']:,} tokens in {usage['interactions']:,} interactions"
+
+
+# =============================================================================
+# QUESTIONNAIRE STRUCTURE
+# =============================================================================
+
+@admin.register(Section)
+class SectionAdmin(admin.ModelAdmin):
+    list_display = ['key', 'title', 'order']
     list_editable = ['order']
+    search_fields = ['key', 'title']
     ordering = ['order']
 
 
+@admin.register(MainQuestion)
+class MainQuestionAdmin(admin.ModelAdmin):
+    list_display = ['key', 'section', 'title', 'subtitle', 'order']
+    list_filter = ['section']
+    list_editable = ['order']
+    list_select_related = ['section']
+    search_fields = ['key', 'title']
+    ordering = ['section__order', 'order']
+
+
+@admin.register(Checkpoint)
+class CheckpointAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'checkpoint_type', 'title', 'order']
+    list_filter = ['checkpoint_type', 'main_question__section']
+    search_fields = ['main_question__key', 'title']
+    autocomplete_fields = ['main_question']
+    ordering = ['main_question__order', 'order']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('main_question')
+
+
 @admin.register(Choice)
 class ChoiceAdmin(admin.ModelAdmin):
+    list_display = ['key', 'checkpoint', 'title_short', 'order']
+    list_filter = ['checkpoint__checkpoint_type', 'checkpoint__main_question']
+    list_editable = ['order']
+    search_fields = ['key', 'title', 'description']
+    autocomplete_fields = ['checkpoint']
+    ordering = ['checkpoint__main_question__order', 'checkpoint__order', 'order']
+
+    fieldsets = (
+        ('Basic Info', {
+            'fields': ('checkpoint', 'key', 'title', 'subtitle', 'image', 'description', 'order')
+        }),
+        ('Checkpoint 1 Content', {
+            'fields': ('why_this_matters', 'research_evidence', 'decision_impact'),
+            'classes': ('collapse',)
+        }),
+        ('Checkpoint 2 Content', {
+            'fields': ('what_you_are_fighting_for', 'cooperative_learning', 'barriers_to_access'),
+            'classes': ('collapse',)
+        }),
+        ('Checkpoint 3 Content', {
+            'fields': ('care_team_affirmation', 'interdependency_at_work', 'reflection_guidance'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('checkpoint__main_question')
+
+    def title_short(self, obj):
+        return obj.title[:50] + '...' if len(obj.title) > 50 else obj.title
+    title_short.short_description = 'Title'
+
+
+# =============================================================================
+# USER RESPONSES & EXPLANATIONS
+# =============================================================================
+
+@admin.register(QuestionResponse)
+class QuestionResponseAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'main_question', 'is_complete', 'created_at']
+    list_filter = ['is_complete', 'main_question', CreatedBeforeFilter]
+    list_select_related = ['user', 'main_question']
+    str_select_related = ['user', 'main_question']
+    search_fields = ['user__email', 'main_question__key']
+    autocomplete_fields = ['user', 'main_question']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['-created_at']
+    actions = ['mark_complete', 'mark_incomplete']
+
+    @admin.action(description='Mark selected responses complete')
+    def mark_complete(self, request, queryset):
+        self.bulk_update(request, queryset, '{count} responses marked complete.', is_complete=True)
+
+    @admin.action(description='Mark selected responses incomplete')
+    def mark_incomplete(self, request, queryset):
+        self.bulk_update(request, queryset, '{count} responses marked incomplete.', is_complete=False)
+
+
+class SelectedChoiceInline(admin.TabularInline):
+    """The user key is copied from the checkpoint response on save."""
+    model = SelectedChoice
+    fields = ['choice']
+    autocomplete_fields = ['choice']
+    extra = 0
+
+
+@admin.register(CheckpointResponse)
+class CheckpointResponseAdmin(LargeTableAdmin):
+    list_display = ['id', 'question_response', 'checkpoint', 'updated_at']
+    list_filter = ['checkpoint__checkpoint_type', CreatedBeforeFilter]
+    list_select_related = ['question_response__user', 'question_response__main_question', 'checkpoint__main_question']
+    str_select_related = ['question_response__user', 'checkpoint__main_question']
+    search_fields = ['user__email']
+    autocomplete_fields = ['question_response', 'checkpoint']
+    readonly_fields = ['user', 'created_at', 'updated_at']
+    inlines = [SelectedChoiceInline]
+    ordering = ['-created_at']
+
+
+@admin.register(Explanation)
+class ExplanationAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'explanation_type', 'visibility', 'created_at']
+    list_filter = ['explanation_type', 'visibility', CreatedBeforeFilter]
+    list_select_related = ['user']
+    str_select_related = ['user', 'question_response__main_question']
+    search_fields = ['user__email', 'description']
+    autocomplete_fields = ['user', 'question_response']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['-created_at']
+    actions = ['make_private', 'make_care_team']
+
+    @admin.action(description='Set visibility to Only Me')
+    def make_private(self, request, queryset):
+        self.bulk_update(request, queryset, '{count} explanations made private.', visibility='private')
+
+    @admin.action(description='Set visibility to Care Team')
+    def make_care_team(self, request, queryset):
+        self.bulk_update(request, queryset, '{count} explanations shared with care team.', visibility='care_team')
+
+
+# =============================================================================
+# CARE TEAM
+# =============================================================================
+
+@admin.register(CareTeam)
+class CareTeamAdmin(LargeTableAdmin):
+    list_display = ['name', 'owner', 'created_at']
+    list_select_related = ['owner']
+    str_select_related = ['owner']
+    search_fields = ['owner__email', 'name']
+    autocomplete_fields = ['owner']
+    ordering = ['-created_at']
+
+
+@admin.register(TeamMembership)
+class TeamMembershipAdmin(LargeTableAdmin):
+    list_display = ['user', 'care_team', 'role', 'has_affirmed', 'joined_at']
+    list_filter = ['role', 'has_affirmed']
+    list_select_related = ['user', 'care_team__owner']
+    str_select_related = ['user', 'care_team__owner']
+    search_fields = ['user__email', 'care_team__owner__email']
+    autocomplete_fields = ['care_team', 'user']
+    readonly_fields = ['affirmed_snapshot']
+    ordering = ['-joined_at']
+
+
+@admin.register(PlanSnapshot)
+class PlanSnapshotAdmin(LargeTableAdmin):
+    """Read-only: versions are written by questionnaire.snapshots and never changed."""
+    list_display = ['user', 'version', 'reason', 'digest', 'created_at']
+    list_filter = ['reason', CreatedBeforeFilter]
+    list_select_related = ['user']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'version', 'reason', 'digest', 'manifest', 'sync_token', 'created_at']
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TeamInvitation)
+class TeamInvitationAdmin(LargeTableAdmin):
+    list_display = ['email', 'care_team', 'status', 'created_at', 'expires_at']
+    list_filter = ['status', CreatedBeforeFilter]
+    list_select_related = ['care_team__owner']
+    str_select_related = ['care_team__owner']
+    search_fields = ['email']
+    autocomplete_fields = ['care_team', 'invited_by', 'invited_user']
+    ordering = ['-created_at']
+    actions = ['mark_expired']
+
+    @admin.action(description='Mark selected invitations expired')
+    def mark_expired(self, request, queryset):
+        # Invitations are not part of delta sync, so a plain UPDATE is enough.
+        updated = queryset.filter(status='pending').update(status='expired')
+        self.message_user(request, f'{updated} invitations marked expired.', messages.SUCCESS)
+
+
+# =============================================================================
+# SOCIAL INTERACTIONS & AI
+# =============================================================================
+
+@admin.register(Reaction)
+class ReactionAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'reaction_type', 'explanation_id', 'created_at']
+    list_filter = ['reaction_type', CreatedBeforeFilter]
+    list_select_related = ['user']
+    str_select_related = ['user', 'explanation']
+    search_fields = ['user__email']
+    autocomplete_fields = ['user', 'explanation']
+    ordering = ['-created_at']
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'explanation_id', 'created_at']
+    list_filter = [CreatedBeforeFilter]
+    list_select_related = ['user']
+    str_select_related = ['user', 'explanation']
+    search_fields = ['user__email']
+    autocomplete_fields = ['user', 'explanation']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['-created_at']
+
+
+@admin.register(AIInteraction)
+class AIInteractionAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'interaction_type', 'model_used', 'tokens_used', 'created_at']
+    list_filter = ['interaction_type', 'model_used', CreatedBeforeFilter]
+    list_select_related = ['user']
+    str_select_related = ['user']
+    search_fields = ['user__email']
+    autocomplete_fields = ['user', 'explanation', 'compared_explanations']
+    readonly_fields = ['created_at']
+    ordering = ['-created_at']
+
+
+@admin.register(AIInteractionArchive)
+class AIInteractionArchiveAdmin(LargeTableAdmin):
+    """Read-only: rows are moved here by the archive_ai_interactions task."""
+    list_display = ['id', 'user', 'interaction_type', 'model_used', 'tokens_used', 'created_at']
+    list_filter = ['interaction_type', 'model_used', CreatedBeforeFilter]
+    list_select_related = ['user']
+    search_fields = ['user__email']
+    exclude = ['payload']
+    readonly_fields = [
+        'id', 'user', 'explanation', 'compared_explanation_ids', 'interaction_type', 'prompt', 'response',
+        'model_used', 'tokens_used', 'created_at', 'archived_at',
+    ]
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Prompt')
+    def prompt(self, obj):
+        return decompress_payload(obj.payload)['prompt']
+
+    @admin.display(description='Response')
+    def response(self, obj):
+        return decompress_payload(obj.payload)['response']
+
+
+@admin.register(AIUsageTotal)
+class AIUsageTotalAdmin(admin.ModelAdmin):
+    list_display = ['user', 'interactions', 'tokens_used', 'updated_at']
+    list_select_related = ['user']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'interactions', 'tokens_used', 'updated_at']
+
+
+# =============================================================================
+# ERASURE
+# =============================================================================
+
+class MediaDeletionInline(admin.TabularInline):
+    model = MediaDeletion
+    fields = ['resource', 'attempts', 'last_error', 'deleted_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ErasureRequest)
+class ErasureRequestAdmin(admin.ModelAdmin):
+    """Read-only: requests are queued from the user admin and carried out by the erase_user task."""
+    list_display = ['id', 'user_id', 'status', 'requested_by', 'created_at', 'completed_at']
+    list_filter = ['status']
+    search_fields = ['user_id']
+    readonly_fields = [field.name for field in ErasureRequest._meta.fields if field.name != 'report'] + ['report_json']
+    exclude = ['report']
+    inlines = [MediaDeletionInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Report')
+    def report_json(self, obj):
+        return json.dumps(obj.report, indent=2) if obj.report else ''
+
+
+# =============================================================================
+# IMAGES
+# =============================================================================
+
+@admin.register(ImageAsset)
+class ImageAssetAdmin(admin.ModelAdmin):
+    """Assets are created when a choice's image changes and filled in by the process_pending_images task."""
+    list_display = ['source_url', 'status', 'digest', 'width', 'height', 'variant_count', 'attempts', 'processed_at']
+    list_filter = ['status']
+    search_fields = ['source_url', '=digest']
+    readonly_fields = [field.name for field in ImageAsset._meta.fields if field.name != 'variants'] + ['srcset']
+    exclude = ['variants']
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Variants')
+    def variant_count(self, obj):
+        return len(obj.variants)
+
+    @admin.display(description='Served as')
+    def srcset(self, obj):
+        return json.dumps(image_fields(obj.source_url), indent=2)
+
+    @admin.action(description='Process selected images again')
+    def retry(self, request, queryset):
+        updated = queryset.update(status='pending', attempts=0, last_error='')
+        self.message_user(request, f'{updated} images will be processed within {settings.IMAGES["POLL_SECONDS"]}s.',
+                          messages.SUCCESS)
+
+
+# =============================================================================
+# AUDIT
+# =============================================================================
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(LargeTableAdmin):
+    """Read-only: events are appended by questionnaire.audit and never changed."""
+    list_display = ['id', 'occurred_at', 'action', 'object_type', 'object_id', 'actor', 'owner', 'ip']
+    list_filter = ['action', 'object_type']
+    search_fields = ['=actor', '=owner', '=object_id']
+    readonly_fields = [field.name for field in AuditEvent._meta.fields]
+    ordering = ['-id']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# =============================================================================
+# LEGACY SUPPORT
+# =============================================================================
+
+@admin.register(BackfillCheckpoint)
+class BackfillCheckpointAdmin(admin.ModelAdmin):
+    """Read-only: checkpoints are advanced by the backfill_legacy command."""
+    list_display = ['name', 'last_id', 'rows_copied', 'chunks', 'updated_at', 'finished_at', 'mismatches']
+    readonly_fields = [field.name for field in BackfillCheckpoint._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(LegacyMainScreenQuestion)
+class LegacyMainScreenQuestionAdmin(admin.ModelAdmin):
+    list_display = ['title', 'subtitle', 'section_label']
+
+
+@admin.register(LegacyQuestion)
+class LegacyQuestionAdmin(admin.ModelAdmin):
+    list_display = ['key', 'title', 'subtitle', 'checkpoint_label', 'order']
+    list_editable = ['order']
+    search_fields = ['key', 'title']
+    ordering = ['order']
+
+
+@admin.register(LegacyChoice)
+class LegacyChoiceAdmin(admin.ModelAdmin):
     list_display = ['choice_id', 'question', 'title_short', 'order']
     list_filter = ['question']
     list_editable = ['order']
-    search_fields = ['title', 'description']
+    list_select_related = ['question']
+    search_fields = ['choice_id', 'title', 'description']
     ordering = ['question__order', 'order']
 
     fieldsets = (
@@ -46,16 +614,28 @@ class ChoiceAdmin(admin.ModelAdmin):
     title_short.short_description = 'Title'
 
 
-@admin.register(TeamMember)
-class TeamMemberAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'affirmed', 'order']
-    list_editable = ['affirmed', 'order']
+class LegacyResponseChoiceInline(admin.TabularInline):
+    model = LegacyResponseChoice
+    fields = ['choice']
+    autocomplete_fields = ['choice']
+    extra = 0
 
 
-@admin.register(Response)
-class ResponseAdmin(admin.ModelAdmin):
+@admin.register(LegacyResponse)
+class LegacyResponseAdmin(LargeTableAdmin):
+    """Anonymous responses of the legacy endpoints; copied to the new tables by backfill_legacy."""
     list_display = ['id', 'user_id', 'question', 'created_at']
-    list_filter = ['question', 'created_at']
-    search_fields = ['user_id']
+    list_filter = ['question', CreatedBeforeFilter]
+    list_select_related = ['question']
+    str_select_related = ['question']
+    # user_id leads the (user_id, question) unique index; a substring search would scan the table.
+    search_fields = ['=user_id']
     readonly_fields = ['created_at', 'updated_at']
-    filter_horizontal = ['selected_choices']
+    inlines = [LegacyResponseChoiceInline]
+    ordering = ['-created_at']
+
+
+@admin.register(LegacyTeamMember)
+class TeamMemberAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'affirmed', 'order']
+    list_editable = ['affirmed', 'order']
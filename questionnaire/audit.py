@@ -0,0 +1,335 @@
+"""
+Audit trail of reads and writes of users' health data (HIPAA).
+
+Views call record() with who accessed which object. That only builds a
+dict and puts it on this process's in-memory buffer without blocking, so
+the request pays microseconds, never I/O. A full buffer drops the event
+and counts it in awfm_audit_events_total{result="dropped"} rather than
+stall the request. A background thread flushes the buffer every
+FLUSH_SECONDS to the configured sink (unless BACKGROUND_FLUSH is off, as
+under tests, where only flush() writes):
+
+- RedisAuditSink (when REDIS_URL is set) pushes the events to a Redis
+  list. The drain_audit_events task moves them to AuditEvent in bulk.
+- DatabaseAuditSink appends them to AuditEvent directly (dev, single box).
+
+append_events() is the only writer of AuditEvent. Under a lock on the
+AuditChain row it numbers the events and chains their hashes, then
+inserts them with one bulk_create. verify_chain() recomputes the chain.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .metrics import AUDIT_EVENTS
+from .models import AuditEvent, AuditChain
+
+logger = logging.getLogger(__name__)
+
+# Event fields covered by the hash, in hashing order.
+HASHED_FIELDS = ('id', 'occurred_at', 'actor', 'action', 'object_type', 'object_id', 'owner', 'ip', 'event_id')
+
+
+# =============================================================================
+# RECORDING (request path)
+# =============================================================================
+
+def record(request, action, object_type, object_ids, owner=None, actor=None):
+    """
+    Buffer one event per id in `object_ids` (a single id is fine). The actor
+    is `request`'s user unless given; `request` may be None outside requests.
+    """
+    if not settings.AUDIT['ENABLED']:
+        return
+    if isinstance(object_ids, (str, int, uuid.UUID)):
+        object_ids = [object_ids]
+    if actor is None:
+        user = getattr(request, 'user', None)
+        actor = user.pk if user is not None and user.is_authenticated else None
+    actor = str(actor) if actor else None
+    occurred_at = timezone.now().isoformat()
+    ip = request.META.get('REMOTE_ADDR') if request is not None else None
+    for object_id in object_ids:
+        get_buffer().add({
+            'occurred_at': occurred_at, 'actor': actor, 'action': action, 'object_type': object_type,
+            'object_id': str(object_id), 'owner': str(owner) if owner else None, 'ip': ip,
+            'event_id': uuid.uuid4().hex,
+        })
+
+
+def record_rows(request, action, object_type, rows, owner_field='user'):
+    """Buffer an event per serialized row (dicts with 'id' and the owner's id in `owner_field`)."""
+    for row in rows:
+        record(request, action, object_type, row['id'], owner=row.get(owner_field))
+
+
+class AuditBuffer:
+    """Bounded in-process queue drained by a daemon thread, started lazily in each process."""
+
+    def __init__(self, sink, size, batch_size, flush_seconds, background=True):
+        self.sink = sink
+        self.background = background
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue(maxsize=size)
+        self._pid = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One writer at a time: the thread or an explicit flush()
+
+    def add(self, event):
+        if self.background and self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            AUDIT_EVENTS.labels('dropped').inc()
+            logger.error('Audit buffer full; dropped %s %s:%s', event['action'], event['object_type'], event['object_id'])
+        else:
+            AUDIT_EVENTS.labels('buffered').inc()
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's thread is gone; its queued events stay with the parent.
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            threading.Thread(target=self._run, name='audit-flush', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _take(self):
+        """Up to batch_size buffered events, without waiting."""
+        events = []
+        while len(events) < self.batch_size:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self):
+        pending, delay = [], self.flush_seconds
+        while True:
+            time.sleep(delay)
+            with self._flush_lock:
+                pending = pending or self._take()
+                while pending:
+                    try:
+                        self.sink.write(pending)
+                    except Exception:
+                        logger.exception('Audit sink failed; keeping %d events for the next attempt', len(pending))
+                        delay = min(delay * 2, 60)
+                        break
+                    AUDIT_EVENTS.labels('flushed').inc(len(pending))
+                    pending, delay = self._take(), self.flush_seconds
+            close_old_connections()
+
+    def flush(self):
+        """Write everything buffered now (process exit, management commands)."""
+        with self._flush_lock:
+            events = self._take()
+            while events:
+                self.sink.write(events)
+                AUDIT_EVENTS.labels('flushed').inc(len(events))
+                events = self._take()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = settings.AUDIT
+                sink_config = dict(config['SINK'])
+                sink = import_string(sink_config.pop('BACKEND'))(**{key.lower(): value for key, value in sink_config.items()})
+                _buffer = AuditBuffer(
+                    sink, config['BUFFER_SIZE'], config['BATCH_SIZE'], config['FLUSH_SECONDS'],
+                    background=config['BACKGROUND_FLUSH'],
+                )
+                if _buffer.background:
+                    atexit.register(_flush_at_exit)
+    return _buffer
+
+
+def _flush_at_exit():
+    try:
+        _buffer.flush()
+    except Exception:
+        logger.exception('Could not flush the audit buffer at exit')
+
+
+# =============================================================================
+# SINKS
+# =============================================================================
+
+class DatabaseAuditSink:
+    """Append straight to AuditEvent from the flush thread."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def write(self, events):
+        append_events(events)
+
+
+class RedisAuditSink:
+    """Push events to a Redis list for drain_audit_events; one round trip per flush."""
+
+    def __init__(self, url, key='audit:events', **kwargs):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.key = key
+
+    def write(self, events):
+        self.client.rpush(self.key, *[json.dumps(event) for event in events])
+
+    def drain(self, batch_size, max_batches=None):
+        """Move queued events to AuditEvent, one batch at a time. Returns the number moved."""
+        lock = self.client.lock(f'{self.key}:drain', timeout=300, blocking=False)
+        if not lock.acquire():
+            return 0  # Another worker is draining.
+        moved, batches = 0, 0
+        try:
+            while max_batches is None or batches < max_batches:
+                raw = self.client.lrange(self.key, 0, batch_size - 1)
+                if not raw:
+                    break
+                append_events([json.loads(item) for item in raw])
+                # Only now drop them: a crash before this line redelivers, and append_events skips repeats.
+                self.client.ltrim(self.key, len(raw), -1)
+                moved += len(raw)
+                batches += 1
+                lock.extend(300, replace_ttl=True)
+        finally:
+            lock.release()
+        return moved
+
+
+# =============================================================================
+# CHAIN
+# =============================================================================
+
+def event_hash(previous_hash, event):
+    values = [str(event[field]) if event[field] is not None else None for field in HASHED_FIELDS]
+    return hashlib.sha256(previous_hash.encode() + json.dumps(values, separators=(',', ':')).encode()).hexdigest()
+
+
+def _hashable(event):
+    """The hashed fields of an AuditEvent or a buffered event, as the strings that are hashed."""
+    if isinstance(event, AuditEvent):
+        event = {field: getattr(event, field) for field in HASHED_FIELDS}
+    occurred_at = event['occurred_at']
+    if isinstance(occurred_at, str):
+        occurred_at = parse_datetime(occurred_at)
+    return dict(
+        event,
+        occurred_at=occurred_at.astimezone(dt_timezone.utc).isoformat(),
+        actor=uuid.UUID(str(event['actor'])).hex if event['actor'] else None,
+        owner=uuid.UUID(str(event['owner'])).hex if event['owner'] else None,
+        event_id=uuid.UUID(str(event['event_id'])).hex,
+    )
+
+
+def append_events(events):
+    """Number, chain and insert buffered events, skipping any already stored. Returns the rows written."""
+    with transaction.atomic():
+        chain, _ = AuditChain.objects.select_for_update().get_or_create(pk=1)
+        stored = set(
+            AuditEvent.objects.filter(event_id__in=[event['event_id'] for event in events])
+            .values_list('event_id', flat=True)
+        )
+        rows, last_hash, next_id = [], chain.last_hash, chain.last_id
+        for event in events:
+            if uuid.UUID(event['event_id']) in stored:
+                continue
+            next_id += 1
+            event = _hashable(dict(event, id=next_id))
+            last_hash = event_hash(last_hash, event)
+            rows.append(AuditEvent(
+                id=next_id, occurred_at=parse_datetime(event['occurred_at']), actor=event['actor'],
+                action=event['action'], object_type=event['object_type'], object_id=event['object_id'],
+                owner=event['owner'], ip=event['ip'], event_id=event['event_id'], hash=last_hash,
+            ))
+        if rows:
+            AuditEvent.objects.bulk_create(rows)
+            AuditChain.objects.filter(pk=1).update(last_id=next_id, last_hash=last_hash, updated_at=timezone.now())
+    return rows
+
+
+def verify_chain(after_id=0, previous_hash=None, chunk_size=5000):
+    """
+    Recompute the chain from event `after_id` + 1 on. Returns (events checked,
+    first bad id or None). Start from an event you trust (and its hash) to
+    check a recent range only.
+    """
+    if previous_hash is None:
+        previous_hash = '0' * 64 if after_id == 0 else AuditEvent.objects.get(pk=after_id).hash
+    checked, expected_id = 0, after_id + 1
+    events = AuditEvent.objects.filter(id__gt=after_id).order_by('id')
+    for event in events.iterator(chunk_size=chunk_size):
+        if event.id != expected_id:
+            return checked, expected_id  # A removed row
+        previous_hash = event_hash(previous_hash, _hashable(event))
+        if previous_hash != event.hash:
+            return checked, event.id
+        checked += 1
+        expected_id += 1
+    head = AuditChain.objects.filter(pk=1).values_list('last_id', flat=True).first() or 0
+    if expected_id - 1 < head:
+        return checked, expected_id  # Rows missing at the end
+    return checked, None
+
+
+# =============================================================================
+# PARTITIONS (PostgreSQL)
+# =============================================================================
+
+def _month_start(value, offset=0):
+    month = value.year * 12 + value.month - 1 + offset
+    return value.replace(year=month // 12, month=month % 12 + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def ensure_partitions(months_ahead=None, now=None):
+    """Create the monthly partitions of AuditEvent up to `months_ahead` months from now. Returns their names."""
+    if connection.vendor != 'postgresql':
+        return []
+    months_ahead = settings.AUDIT['PARTITION_MONTHS_AHEAD'] if months_ahead is None else months_ahead
+    now = (now or timezone.now()).astimezone(dt_timezone.utc)
+    table = AuditEvent._meta.db_table
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            start, end = _month_start(now, offset), _month_start(now, offset + 1)
+            name = f'{table}_{start:%Y_%m}'
+            cursor.execute('SELECT 1 FROM pg_class WHERE relname = %s', [name])
+            if cursor.fetchone():
+                continue
+            try:
+                with transaction.atomic():
+                    cursor.execute(
+                        f'CREATE TABLE {connection.ops.quote_name(name)} PARTITION OF '
+                        f'{connection.ops.quote_name(table)} FOR VALUES FROM (%s) TO (%s)', [start, end],
+                    )
+            except DatabaseError:
+                # The default partition already holds events of this month; they stay there.
+                logger.warning('Could not create audit partition %s', name, exc_info=True)
+                continue
+            created.append(name)
+    return created
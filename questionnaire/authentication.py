@@ -0,0 +1,118 @@
+"""
+JWT authentication without per-request database work.
+
+Access tokens are short-lived and users are resolved through a small
+process-local TTL cache. Revoked tokens are kept in a denylist in the shared
+Django cache, one key per token id that expires when the token would have.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .metrics import observe_cache
+
+DENYLIST_PREFIX = 'jwt-deny:'
+
+
+def _seconds_left(token):
+    return max(int(token['exp'] - time.time()), 1)
+
+
+def deny_token(token):
+    """Revoke `token` until it expires. Returns False if it was already revoked."""
+    return cache.add(DENYLIST_PREFIX + token[api_settings.JTI_CLAIM], 1, _seconds_left(token))
+
+
+def is_denied(token):
+    return cache.get(DENYLIST_PREFIX + token[api_settings.JTI_CLAIM]) is not None
+
+
+class UserCache:
+    """Bounded LRU of user objects, each kept for at most `ttl` seconds."""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None or item[0] < time.monotonic():
+                return None
+            self._items.move_to_end(user_id)
+            return item[1]
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._items[user_id] = (time.monotonic() + self.ttl, user)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(ttl=settings.JWT_USER_CACHE['TTL'], max_size=settings.JWT_USER_CACHE['MAX_SIZE'])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reads users from `user_cache` and honours the denylist.
+
+    Changes to a user (deactivation, password change) reach other workers
+    within JWT_USER_CACHE['TTL'] seconds; revoke tokens for immediate effect.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_denied(token):
+            raise InvalidToken(_('Token has been revoked.'))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = user_cache.get(user_id)
+        observe_cache('jwt_user', user is not None)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that denies the presented refresh token, so each one works only once."""
+
+    def validate(self, attrs):
+        # Denied only after every check passed, so a refresh that fails them does not use the token up.
+        data = super().validate(attrs)
+        # cache.add is atomic: two concurrent refreshes cannot both succeed.
+        if not deny_token(self.token_class(attrs['refresh'])):
+            raise InvalidToken(_('Token has been revoked.'))
+        return data
+
+
+def forget_user(sender, instance, **kwargs):
+    """Drop a saved or deleted user from this worker's cache (connected in signals)."""
+    user_cache.discard(str(instance.pk))
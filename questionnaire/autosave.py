@@ -0,0 +1,124 @@
+"""
+Batched autosave for /api/responses/ops/.
+
+Clients queue choice toggles and completion changes as numbered operations
+and send them in batches. A batch is coalesced (the last operation on each
+choice or question wins) and applied in one transaction: one DELETE and one
+INSERT on the selected_choices table, whatever the number of toggles.
+
+AutosaveCursor keeps the highest sequence number applied per client, so a
+batch sent again after a lost response only applies operations newer than
+the cursor. Bulk writes skip the m2m_changed signal, so the sync change log
+and the similarity dirty flag are updated here.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import AutosaveCursor, MainQuestion, Choice, QuestionResponse, CheckpointResponse, SelectedChoice
+from .similarity import mark_users_dirty
+from .sync import record_bulk_change
+
+
+def coalesce(ops):
+    """Reduce `ops` to ({choice id: selected}, {question key: is_complete}), applying them in seq order."""
+    choices, completions = {}, {}
+    for op in sorted(ops, key=lambda op: op['seq']):
+        if op['op'] == 'complete':
+            completions[op['question']] = op['value']
+        else:
+            choices[op['choice']] = op['op'] == 'add'
+    return choices, completions
+
+
+def _targets(choices, completions):
+    """Resolve choice ids and question keys, rejecting unknown ones."""
+    checkpoints = {
+        choice_id: (checkpoint_id, main_question_id)
+        for choice_id, checkpoint_id, main_question_id in Choice.objects.filter(pk__in=choices)
+        .values_list('id', 'checkpoint_id', 'checkpoint__main_question_id')
+    }
+    questions = dict(MainQuestion.objects.filter(key__in=completions).values_list('key', 'id'))
+    errors = {}
+    if set(choices) - set(checkpoints):
+        errors['choice'] = [f'Unknown choice ids: {sorted(set(choices) - set(checkpoints))}']
+    if set(completions) - set(questions):
+        errors['question'] = [f'Unknown questions: {sorted(set(completions) - set(questions))}']
+    if errors:
+        raise ValidationError(errors)
+    return checkpoints, questions
+
+
+def _ensure_responses(user, checkpoints, question_ids):
+    """Create missing QuestionResponse/CheckpointResponse rows; return their ids by main question / checkpoint."""
+    question_ids = set(question_ids) | {main_question_id for _, main_question_id in checkpoints.values()}
+    QuestionResponse.objects.bulk_create(
+        [QuestionResponse(user=user, main_question_id=main_question_id) for main_question_id in question_ids],
+        ignore_conflicts=True,
+    )
+    question_responses = dict(
+        QuestionResponse.objects.filter(user=user, main_question_id__in=question_ids)
+        .values_list('main_question_id', 'id')
+    )
+    wanted = set(checkpoints.values())
+    CheckpointResponse.objects.bulk_create(
+        [CheckpointResponse(question_response_id=question_responses[main_question_id], user=user, checkpoint_id=checkpoint_id)
+         for checkpoint_id, main_question_id in wanted],
+        ignore_conflicts=True,
+    )
+    checkpoint_responses = dict(
+        CheckpointResponse.objects.filter(
+            user=user, checkpoint_id__in={checkpoint_id for checkpoint_id, _ in wanted},
+        ).values_list('checkpoint_id', 'id')
+    )
+    return question_responses, checkpoint_responses
+
+
+def apply_ops(user, client, ops):
+    """
+    Apply the operations of `ops` newer than `client`'s cursor. Returns
+    (applied, skipped, last_seq, question response ids, checkpoint response ids).
+    """
+    with transaction.atomic():
+        AutosaveCursor.objects.bulk_create([AutosaveCursor(user=user, client=client)], ignore_conflicts=True)
+        # Serializes batches from the same client; other clients and users are not blocked.
+        cursor = AutosaveCursor.objects.select_for_update().get(user=user, client=client)
+        fresh = [op for op in ops if op['seq'] > cursor.last_seq]
+        skipped = len(ops) - len(fresh)
+        if not fresh:
+            return 0, skipped, cursor.last_seq, [], []
+
+        choices, completions = coalesce(fresh)
+        checkpoints, questions = _targets(choices, completions)
+        question_responses, checkpoint_responses = _ensure_responses(user, checkpoints, questions.values())
+
+        removed = [choice_id for choice_id, selected in choices.items() if not selected]
+        if removed:
+            SelectedChoice.objects.filter(
+                user=user, checkpointresponse_id__in={checkpoint_responses[checkpoints[choice_id][0]] for choice_id in removed},
+                choice_id__in=removed,
+            ).delete()
+        SelectedChoice.objects.bulk_create(
+            [SelectedChoice(checkpointresponse_id=checkpoint_responses[checkpoints[choice_id][0]], choice_id=choice_id, user=user)
+             for choice_id, selected in choices.items() if selected],
+            ignore_conflicts=True,
+        )
+
+        now = timezone.now()
+        touched = {checkpoint_responses[checkpoint_id] for checkpoint_id, _ in checkpoints.values()}
+        CheckpointResponse.objects.filter(user=user, pk__in=touched).update(updated_at=now)
+        for value in (True, False):
+            keys = [key for key, complete in completions.items() if complete is value]
+            if keys:
+                QuestionResponse.objects.filter(
+                    user=user, pk__in=[question_responses[questions[key]] for key in keys],
+                ).update(is_complete=value, updated_at=now)
+
+        record_bulk_change(QuestionResponse.objects.filter(user=user, pk__in=question_responses.values()))
+        record_bulk_change(CheckpointResponse.objects.filter(user=user, pk__in=touched))
+        if choices:
+            mark_users_dirty([user.pk])
+
+        cursor.last_seq = max(op['seq'] for op in fresh)
+        cursor.save(update_fields=['last_seq', 'updated_at'])
+    return len(fresh), skipped, cursor.last_seq, sorted(question_responses.values()), sorted(touched)
@@ -0,0 +1,463 @@
+"""
+Online backfill of legacy rows into the current schema.
+
+A Backfill walks its source table in primary-key order and copies one chunk
+per transaction, advancing its BackfillCheckpoint in that same transaction,
+so an interrupted run resumes after the last committed chunk and two runs
+never copy the same chunk at once. Between chunks it sleeps long enough to
+keep its share of database time at MAX_LOAD, and it resizes chunks so each
+takes about TARGET_SECONDS. verify() compares every copied row with its
+target by fingerprint and reports an order-independent checksum per side.
+
+LegacyResponseBackfill moves the 0001_initial Response rows (anonymous,
+one legacy question per checkpoint) into QuestionResponse and
+CheckpointResponse, and the legacy API writes through to the new tables
+(mirror_response). The legacy API is anonymous, so only client-generated
+ids are copied, to placeholder users: a user_id in UUID form could be any
+account's id, and is left in the legacy tables.
+"""
+import hashlib
+import re
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import (
+    User, MainQuestion, Choice, QuestionResponse, CheckpointResponse, SelectedChoice, BackfillCheckpoint,
+    LegacyQuestion, LegacyChoice, LegacyResponse, LegacyResponseChoice,
+)
+from .sync import record_bulk_change
+
+MIN_CHUNK_SIZE = 50
+MAX_CHUNK_SIZE = 10000
+MAX_REPORTED_MISMATCHES = 20
+
+
+def _digest(value):
+    return int.from_bytes(hashlib.sha256(repr(value).encode()).digest()[:16], 'big')
+
+
+class Backfill:
+    """
+    Copy `source` rows in keyset-ordered chunks. Subclasses set `name` and
+    `source` and implement copy(), source_fingerprints() and
+    target_fingerprints().
+    """
+    name = None
+    source = None
+
+    def __init__(self, chunk_size=None, max_load=None, target_seconds=None, progress=None):
+        config = settings.LEGACY_BACKFILL
+        self.chunk_size = chunk_size or config['CHUNK_SIZE']
+        self.max_load = max_load or config['MAX_LOAD']
+        self.target_seconds = target_seconds or config['TARGET_SECONDS']
+        self.progress = progress
+
+    def source_queryset(self):
+        return self.source.objects.order_by('pk')
+
+    def copy(self, rows):
+        """Write `rows` to the target. Must be idempotent: chunks are copied again after a crash."""
+        raise NotImplementedError
+
+    def source_fingerprints(self, rows):
+        """Return {key: value} describing what each source row should look like in the target."""
+        raise NotImplementedError
+
+    def target_fingerprints(self, keys):
+        """Return {key: value} for the target rows with the given keys that exist."""
+        raise NotImplementedError
+
+    def skipped(self, rows):
+        """Source rows that are deliberately not copied (not compared by verify())."""
+        return set()
+
+    def superseded(self, expected, actual):
+        """Whether a target row differs because it was changed after the copy (not a mismatch)."""
+        return False
+
+    def checkpoint(self):
+        return BackfillCheckpoint.objects.get_or_create(name=self.name)[0]
+
+    def reset(self):
+        BackfillCheckpoint.objects.filter(name=self.name).delete()
+
+    def pause_for(self, elapsed):
+        """Idle time that keeps this job's share of wall time, and so of database time, at max_load."""
+        if self.max_load >= 1:
+            return 0
+        return elapsed * (1 - self.max_load) / self.max_load
+
+    def next_chunk_size(self, size, elapsed):
+        if elapsed <= 0:
+            return min(size * 2, MAX_CHUNK_SIZE)
+        # Move toward the target gradually so one slow chunk does not collapse the size.
+        factor = min(max(self.target_seconds / elapsed, 0.5), 2.0)
+        return min(max(int(size * factor), MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+    def copy_chunk(self, size):
+        """Copy the next `size` rows after the checkpoint. Returns the number copied (0 at the end)."""
+        with transaction.atomic():
+            # Locking the checkpoint serializes concurrent runs of the same job.
+            checkpoint = BackfillCheckpoint.objects.select_for_update().get(name=self.name)
+            rows = list(self.source_queryset().filter(pk__gt=checkpoint.last_id)[:size])
+            now = timezone.now()
+            if not rows:
+                BackfillCheckpoint.objects.filter(pk=checkpoint.pk).update(finished_at=now, updated_at=now)
+                return 0
+            self.copy(rows)
+            BackfillCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                last_id=rows[-1].pk, rows_copied=F('rows_copied') + len(rows), chunks=F('chunks') + 1,
+                finished_at=None, updated_at=now,
+            )
+        return len(rows)
+
+    def run(self, max_chunks=None):
+        """Copy chunks until the source is exhausted or `max_chunks` ran. Returns True when finished."""
+        self.checkpoint()
+        size, chunks = self.chunk_size, 0
+        while max_chunks is None or chunks < max_chunks:
+            started = time.monotonic()
+            copied = self.copy_chunk(size)
+            if not copied:
+                return True
+            elapsed = time.monotonic() - started
+            chunks += 1
+            if self.progress:
+                self.progress(copied, size, elapsed)
+            size = self.next_chunk_size(size, elapsed)
+            time.sleep(self.pause_for(elapsed))
+        return False
+
+    def verify(self):
+        """
+        Compare every source row up to the checkpoint with the target.
+
+        Returns the counts, the first mismatched keys and a checksum of each
+        side (equal when every compared row matches), and records the
+        mismatch count on the checkpoint.
+        """
+        checkpoint = self.checkpoint()
+        result = {'source_rows': 0, 'target_rows': 0, 'skipped': 0, 'superseded': 0, 'mismatches': 0, 'examples': []}
+        source_sum = target_sum = 0
+        after = 0
+        while True:
+            with transaction.atomic():
+                rows = list(self.source_queryset().filter(pk__gt=after, pk__lte=checkpoint.last_id)[:self.chunk_size])
+                if not rows:
+                    break
+                after = rows[-1].pk
+                skipped = self.skipped(rows)
+                rows = [row for row in rows if row.pk not in skipped]
+                expected = self.source_fingerprints(rows)
+                actual = self.target_fingerprints(expected)
+            result['source_rows'] += len(expected)
+            result['target_rows'] += len(actual)
+            result['skipped'] += len(skipped)
+            for key, value in expected.items():
+                source_sum ^= _digest((key, value))
+                if key in actual:
+                    target_sum ^= _digest((key, actual[key]))
+                if key in actual and actual[key] != value and self.superseded(value, actual[key]):
+                    result['superseded'] += 1
+                elif actual.get(key) != value:
+                    result['mismatches'] += 1
+                    if len(result['examples']) < MAX_REPORTED_MISMATCHES:
+                        result['examples'].append(key)
+        result['source_checksum'] = f'{source_sum:032x}'
+        result['target_checksum'] = f'{target_sum:032x}'
+        BackfillCheckpoint.objects.filter(pk=checkpoint.pk).update(
+            verified_at=timezone.now(), mismatches=result['mismatches'],
+        )
+        return result
+
+
+# =============================================================================
+# LEGACY RESPONSES
+# =============================================================================
+
+LEGACY_USER_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'awfm:legacy-user')
+# Placeholder usernames are this prefix and the client's id, so the id can be found from the User.
+LEGACY_USERNAME_PREFIX = 'legacy:'
+LEGACY_QUESTION_KEY = re.compile(r'^q(\d+)$')
+
+
+def legacy_user_uuid(user_id):
+    """The User id for a client-generated legacy user_id: itself if it is a UUID, else a stable UUID5."""
+    return _parse_uuid(user_id) or uuid.uuid5(LEGACY_USER_NAMESPACE, user_id)
+
+
+def _parse_uuid(value):
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+def ensure_users(legacy_ids):
+    """Create inactive placeholder users, without a usable password, for legacy ids that have no User yet."""
+    by_id = {legacy_user_uuid(legacy_id): legacy_id for legacy_id in legacy_ids}
+    missing = set(by_id) - set(User.objects.filter(pk__in=by_id).values_list('pk', flat=True))
+    User.objects.bulk_create([
+        User(
+            id=user_id, username=f'{LEGACY_USERNAME_PREFIX}{by_id[user_id]}', email=f'{user_id.hex}@legacy.invalid',
+            password=make_password(None), is_active=False,
+        )
+        for user_id in missing
+    ], ignore_conflicts=True)
+
+
+def legacy_ids_of(user_id, username=None):
+    """
+    The legacy user_id strings that may stand for User `user_id`: its UUID
+    spellings and, for a placeholder user, the client id in its username.
+    """
+    legacy_ids = {str(user_id), user_id.hex, str(user_id).upper(), user_id.hex.upper()}
+    if username and username.startswith(LEGACY_USERNAME_PREFIX):
+        legacy_id = username[len(LEGACY_USERNAME_PREFIX):]
+        if legacy_user_uuid(legacy_id) == user_id:
+            legacy_ids.add(legacy_id)
+    return sorted(legacy_ids)
+
+
+class LegacyMapping:
+    """Legacy question and choice ids to the checkpoints and choices of the configured main question."""
+
+    def __init__(self):
+        self.main_question = MainQuestion.objects.get(key=settings.LEGACY_BACKFILL['MAIN_QUESTION'])
+        checkpoints = {cp.checkpoint_number: cp.pk for cp in self.main_question.checkpoints.all()}
+        self.checkpoint_count = len(checkpoints)
+        self.checkpoints = {}
+        for question_id, key in LegacyQuestion.objects.values_list('id', 'key'):
+            match = LEGACY_QUESTION_KEY.match(key)
+            if match and int(match[1]) in checkpoints:
+                self.checkpoints[question_id] = checkpoints[int(match[1])]
+
+        # Choices correspond by position: the legacy choice_id values are not
+        # reused as keys in the new content.
+        new_choices = defaultdict(list)
+        for choice_id, checkpoint_id in Choice.objects.filter(
+            checkpoint_id__in=self.checkpoints.values(),
+        ).order_by('order', 'id').values_list('id', 'checkpoint_id'):
+            new_choices[checkpoint_id].append(choice_id)
+        legacy_choices = defaultdict(list)
+        for choice_id, question_id in LegacyChoice.objects.filter(
+            question_id__in=self.checkpoints,
+        ).order_by('order', 'id').values_list('id', 'question_id'):
+            legacy_choices[question_id].append(choice_id)
+        self.choices = {}
+        for question_id, checkpoint_id in self.checkpoints.items():
+            self.choices.update(zip(legacy_choices[question_id], new_choices[checkpoint_id]))
+
+
+class LegacyResponseBackfill(Backfill):
+    name = 'legacy_responses'
+    source = LegacyResponse
+
+    def __init__(self, *args, mapping=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._mapping = mapping
+
+    @property
+    def mapping(self):
+        if self._mapping is None:
+            self._mapping = LegacyMapping()
+        return self._mapping
+
+    def skipped(self, rows):
+        # Anyone can post any user_id to the legacy API: never copy onto a real account.
+        placeholders = {row.pk: legacy_user_uuid(row.user_id) for row in rows if _parse_uuid(row.user_id) is None}
+        accounts = set(
+            User.objects.filter(pk__in=set(placeholders.values())).exclude(username__startswith=LEGACY_USERNAME_PREFIX)
+            .values_list('pk', flat=True)
+        )
+        return {
+            row.pk for row in rows
+            if row.question_id not in self.mapping.checkpoints
+            or row.pk not in placeholders or placeholders[row.pk] in accounts
+        }
+
+    def superseded(self, expected, actual):
+        return actual[1] > expected[1]
+
+    def _selected(self, rows):
+        selected = defaultdict(list)
+        links = LegacyResponseChoice.objects.filter(response__in=rows).values_list('response_id', 'choice_id')
+        for response_id, choice_id in links:
+            if choice_id in self.mapping.choices:
+                selected[response_id].append(self.mapping.choices[choice_id])
+        return selected
+
+    def _key(self, row):
+        return (str(legacy_user_uuid(row.user_id)), self.mapping.checkpoints[row.question_id])
+
+    def _checkpoint_responses(self, keys):
+        users = {user_id for user_id, _ in keys}
+        return {
+            (str(cr.user_id), cr.checkpoint_id): cr
+            for cr in CheckpointResponse.objects.filter(
+                user_id__in=users,
+                question_response__main_question=self.mapping.main_question,
+                checkpoint_id__in={checkpoint_id for _, checkpoint_id in keys},
+            )
+        }
+
+    def copy(self, rows):
+        mapping = self.mapping
+        skipped = self.skipped(rows)
+        rows = [row for row in rows if row.pk not in skipped]
+        if not rows:
+            return
+        keys = {row.pk: self._key(row) for row in rows}
+        users = {user_id for user_id, _ in keys.values()}
+        ensure_users({row.user_id for row in rows})
+
+        # One QuestionResponse per user, dated back to their first legacy answer.
+        QuestionResponse.objects.bulk_create(
+            [QuestionResponse(user_id=user_id, main_question=mapping.main_question) for user_id in users],
+            ignore_conflicts=True,
+        )
+        question_responses = {
+            str(qr.user_id): qr
+            for qr in QuestionResponse.objects.filter(user_id__in=users, main_question=mapping.main_question)
+        }
+        redated = []
+        for row in rows:
+            qr = question_responses[keys[row.pk][0]]
+            if row.created_at < qr.created_at:
+                qr.created_at = row.created_at
+                redated.append(qr)
+        QuestionResponse.objects.bulk_update(set(redated), ['created_at'])
+
+        existing = self._checkpoint_responses(set(keys.values()))
+        CheckpointResponse.objects.bulk_create([
+            CheckpointResponse(question_response=question_responses[user_id], user_id=user_id, checkpoint_id=checkpoint_id)
+            for user_id, checkpoint_id in set(keys.values()) - set(existing)
+        ], ignore_conflicts=True)
+        current = self._checkpoint_responses(set(keys.values()))
+
+        selected = self._selected(rows)
+        changed = {}
+        for row in rows:
+            key = keys[row.pk]
+            if key in existing and existing[key].updated_at > row.updated_at:
+                continue  # Answered again through the new API since; that answer wins.
+            cr = current[key]
+            if key not in existing:
+                cr.created_at = row.created_at
+            cr.updated_at = row.updated_at
+            changed[cr.pk] = (cr, selected[row.pk])
+        if not changed:
+            return
+
+        # bulk_update leaves auto_now alone, so the legacy timestamps are kept.
+        CheckpointResponse.objects.bulk_update([cr for cr, _ in changed.values()], ['created_at', 'updated_at'])
+        SelectedChoice.objects.filter(user_id__in=users, checkpointresponse_id__in=list(changed)).delete()
+        SelectedChoice.objects.bulk_create([
+            SelectedChoice(checkpointresponse_id=cr.pk, choice_id=choice_id, user_id=cr.user_id)
+            for cr, choice_ids in changed.values() for choice_id in set(choice_ids)
+        ], ignore_conflicts=True)
+
+        qr_ids = {cr.question_response_id for cr, _ in changed.values()}
+        complete = (
+            CheckpointResponse.objects.filter(user_id__in=users, question_response_id__in=qr_ids)
+            .values('question_response_id')
+            .annotate(answered=Count('id')).filter(answered__gte=mapping.checkpoint_count)
+            .values_list('question_response_id', flat=True)
+        )
+        QuestionResponse.objects.filter(user_id__in=users, pk__in=list(complete), is_complete=False).update(is_complete=True)
+
+        record_bulk_change(QuestionResponse.objects.filter(user_id__in=users, pk__in=qr_ids))
+        record_bulk_change(CheckpointResponse.objects.filter(user_id__in=users, pk__in=list(changed)))
+
+    def source_fingerprints(self, rows):
+        selected = self._selected(rows)
+        return {self._key(row): (tuple(sorted(set(selected[row.pk]))), row.updated_at) for row in rows}
+
+    def target_fingerprints(self, keys):
+        current = {key: cr for key, cr in self._checkpoint_responses(keys).items() if key in keys}
+        selected = defaultdict(set)
+        links = SelectedChoice.objects.filter(
+            user_id__in={cr.user_id for cr in current.values()},
+            checkpointresponse_id__in=[cr.pk for cr in current.values()],
+        ).values_list('checkpointresponse_id', 'choice_id')
+        for cr_id, choice_id in links:
+            selected[cr_id].add(choice_id)
+        return {key: (tuple(sorted(selected[cr.pk])), cr.updated_at) for key, cr in current.items()}
+
+
+MAPPING_VERSION_KEY = 'backfill:legacy-mapping-version'
+_mapping_cache = {'version': None, 'mapping': None}
+
+
+def legacy_mapping():
+    """
+    The LegacyMapping for the current content, rebuilt only after
+    invalidate_legacy_mapping() changes the version shared by all workers.
+    """
+    cache.add(MAPPING_VERSION_KEY, uuid.uuid4().hex, None)
+    version = cache.get(MAPPING_VERSION_KEY)
+    if version is None or _mapping_cache['version'] != version:
+        _mapping_cache['mapping'] = LegacyMapping()
+        _mapping_cache['version'] = version
+    return _mapping_cache['mapping']
+
+
+def invalidate_legacy_mapping(sender, **kwargs):
+    """
+    Drop the cached mapping when content it is built from changes (connected
+    in signals). Dropped now for this transaction and again on commit, so no
+    worker keeps a mapping built before the change committed.
+    """
+    cache.delete(MAPPING_VERSION_KEY)
+    transaction.on_commit(lambda: cache.delete(MAPPING_VERSION_KEY))
+
+
+def _configured_backfill():
+    try:
+        return LegacyResponseBackfill(mapping=legacy_mapping())
+    except MainQuestion.DoesNotExist:
+        return None  # Content not seeded yet: nothing to map legacy answers to.
+
+
+def mirror_response(response, may_create_user=None):
+    """
+    Write a legacy response saved through the legacy API through to the new
+    tables (dual write). Before a client id gets its placeholder User,
+    `may_create_user()` is asked; when it refuses, the row is left for
+    backfill_legacy to copy.
+    """
+    backfill = _configured_backfill()
+    if backfill is None or backfill.skipped([response]):
+        return
+    if (may_create_user is not None
+            and not User.objects.filter(pk=legacy_user_uuid(response.user_id)).exists()
+            and not may_create_user()):
+        return
+    backfill.copy([response])
+
+
+def forget_response(response):
+    """Remove the new-schema copy of a legacy response deleted through the legacy API."""
+    backfill = _configured_backfill()
+    if backfill is None or backfill.skipped([response]):
+        return
+    user_id, checkpoint_id = backfill._key(response)
+    stale = CheckpointResponse.objects.filter(
+        user_id=user_id, question_response__main_question=backfill.mapping.main_question,
+        checkpoint_id=checkpoint_id,
+    )
+    record_bulk_change(stale, action='delete')
+    stale.delete()
+    incomplete = list(QuestionResponse.objects.filter(
+        user_id=user_id, main_question=backfill.mapping.main_question, is_complete=True,
+    ).values_list('pk', flat=True))
+    QuestionResponse.objects.filter(user_id=user_id, pk__in=incomplete).update(is_complete=False)
+    record_bulk_change(QuestionResponse.objects.filter(user_id=user_id, pk__in=incomplete))
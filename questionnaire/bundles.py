@@ -0,0 +1,79 @@
+"""Precompiled questionnaire content bundles served as static files by WhiteNoise."""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from whitenoise.compress import Compressor
+
+from .models import Section
+from .serializers import SectionTreeSerializer
+
+# Bundles live under STATIC_ROOT/<BUNDLE_DIR>/ and are served from STATIC_URL.
+BUNDLE_DIR = 'content'
+MANIFEST_NAME = 'manifest.json'
+
+# Same 12 hex characters ManifestStaticFilesStorage uses, so WhiteNoise's
+# immutable-file test (WHITENOISE_IMMUTABLE_FILE_TEST) matches both.
+HASH_LENGTH = 12
+
+
+def _encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def build_bundles(output_dir=None, log=None):
+    """
+    Serialize every section tree into content-hashed JSON files with .gz/.br
+    siblings, then write an unhashed manifest pointing at them.
+
+    Returns the manifest dict.
+    """
+    output_dir = Path(output_dir or Path(settings.STATIC_ROOT) / BUNDLE_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    compressor = Compressor(quiet=log is None, log=log or print)
+
+    sections = Section.objects.prefetch_related('questions__checkpoints__choices')
+    entries = []
+    for section in sections:
+        body = _encode(SectionTreeSerializer(section).data)
+        digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        name = f'{section.key}.{digest}.json'
+        path = output_dir / name
+        if not path.exists():
+            path.write_bytes(body)
+            compressor.compress(str(path))
+        entries.append({
+            'key': section.key,
+            'title': section.title,
+            'hash': digest,
+            'path': f'{BUNDLE_DIR}/{name}',
+            'url': f'{settings.STATIC_URL}{BUNDLE_DIR}/{name}',
+            'bytes': len(body),
+        })
+
+    version = hashlib.sha256(''.join(entry['hash'] for entry in entries).encode()).hexdigest()[:HASH_LENGTH]
+    manifest = {'version': version, 'generatedAt': timezone.now().isoformat(), 'sections': entries}
+    # Write then rename so readers never see a partial manifest.
+    tmp_path = output_dir / f'.{MANIFEST_NAME}.tmp'
+    tmp_path.write_bytes(_encode(manifest))
+    os.replace(tmp_path, output_dir / MANIFEST_NAME)
+    return manifest
+
+
+_manifest_cache = {'mtime': None, 'data': None}
+
+
+def load_manifest():
+    """Return the current bundle manifest, re-reading it only when the file changes."""
+    path = Path(settings.STATIC_ROOT) / BUNDLE_DIR / MANIFEST_NAME
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    if _manifest_cache['mtime'] != mtime:
+        _manifest_cache['data'] = json.loads(path.read_bytes())
+        _manifest_cache['mtime'] = mtime
+    return _manifest_cache['data']
@@ -0,0 +1,89 @@
+"""WebSocket consumers for the AWFM Questionnaire (routed in questionnaire.routing)."""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .authentication import CachedJWTAuthentication
+from .permissions import care_team_access
+from .realtime import team_group, user_group
+
+
+@database_sync_to_async
+def _user_for_token(raw_token):
+    authentication = CachedJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token.encode()))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTQueryAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate WebSocket connections from an access token in `?token=`.
+
+    Browsers cannot set headers on WebSocket requests. Access tokens are
+    short-lived and sessions are not consulted, so a cross-site page cannot
+    open a socket as the user.
+    """
+
+    async def __call__(self, scope, receive, send):
+        tokens = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        scope = dict(scope, user=await _user_for_token(tokens[0]) if tokens else AnonymousUser())
+        return await super().__call__(scope, receive, send)
+
+
+class CareTeamConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live comments, reactions and affirmations for care teams.
+
+    Clients send {"action": "subscribe" | "unsubscribe", "team": <owner id>}
+    and receive {"type": "events", "events": [...]} batches. Subscriptions
+    are checked against the same access sets as the REST API.
+    """
+
+    async def connect(self):
+        self.user = self.scope['user']
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+        self.teams = set()
+        await self.channel_layer.group_add(user_group(self.user.pk), self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if not self.user.is_authenticated:
+            return
+        for group in [user_group(self.user.pk)] + [team_group(team) for team in self.teams]:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action, team = content.get('action'), str(content.get('team', ''))
+        if action == 'subscribe':
+            access = await database_sync_to_async(care_team_access)(self.user)
+            if team not in {str(owner_id) for owner_id in access['view']}:
+                await self.send_json({'type': 'error', 'team': team, 'detail': 'Not a member of this care team.'})
+                return
+            self.teams.add(team)
+            await self.channel_layer.group_add(team_group(team), self.channel_name)
+            await self.send_json({'type': 'subscribed', 'team': team})
+        elif action == 'unsubscribe' and team in self.teams:
+            self.teams.discard(team)
+            await self.channel_layer.group_discard(team_group(team), self.channel_name)
+            await self.send_json({'type': 'unsubscribed', 'team': team})
+        else:
+            await self.send_json({'type': 'error', 'detail': 'Unknown action.'})
+
+    async def team_events(self, message):
+        # Already encoded once by the publisher for every subscriber.
+        await self.send(text_data=message['text'])
+
+    async def team_revoked(self, message):
+        team = message['team']
+        if team in self.teams:
+            self.teams.discard(team)
+            await self.channel_layer.group_discard(team_group(team), self.channel_name)
+            await self.send_json({'type': 'unsubscribed', 'team': team})
@@ -0,0 +1,348 @@
+"""
+Erasure of all of a user's data (HIPAA deletion requests).
+
+User.delete() collects every dependent row into memory and sends a signal
+per row, which for a long-standing user can run for minutes while holding
+locks. erase() instead walks the model graph from the user once, and
+deletes each dependent table bottom-up, leaves first. Every batch is one
+`DELETE ... WHERE pk IN (SELECT ... LIMIT n)` in its own short transaction.
+SET_NULL relations are cleared the same way. Only the user's memberships
+(which other people's caches, sockets and sync clients depend on) and the
+user row itself go through the ORM, once the heavy tables are empty.
+
+Media files are recorded as MediaDeletion rows before anything is deleted
+and removed from storage afterwards, with retries. An ErasureRequest can be
+run again at any point and resumes where it stopped. Once no row matches
+the user and every file is gone, a report with per-table counts and its
+SHA-256 digest is stored on the request.
+"""
+import hashlib
+import logging
+import re
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from . import audit
+from .backfill import legacy_ids_of
+from .models import (
+    User, Explanation, TeamMembership, PeerNeighbor, ChangeLogEntry, LegacyResponse,
+    ErasureRequest, MediaDeletion,
+)
+from .similarity import mark_users_dirty
+from .snapshots import canonical
+
+logger = logging.getLogger(__name__)
+
+# https://res.cloudinary.com/<cloud>/<resource type>/<type>/[transformations/][v<version>/]<public id>.<format>
+CLOUDINARY_URL_RE = re.compile(
+    r'^https?://res\.cloudinary\.com/[^/]+/(?P<resource_type>image|video|raw)/(?P<type>[^/]+)/'
+    r'(?:[a-z]{1,3}_[^/]*/)*(?:v\d+/)?(?P<public_id>[^.]+)(?P<extension>\.[^/]*)?$'
+)
+
+
+def _label(model):
+    return model._meta.label
+
+
+# =============================================================================
+# PLAN
+# =============================================================================
+
+def erasure_plan(model, lookup, ancestors=()):
+    """
+    Return the steps that clear every row depending on `model` rows matching
+    `lookup`, children before parents: ('delete', model, lookup) or
+    ('null', model, lookup, field). Includes hidden relations (related_name
+    '+', auto-created M2M tables) and other apps' tables, like the ORM's
+    collector. Raises for PROTECT/RESTRICT relations.
+    """
+    steps = []
+    for rel in model._meta.get_fields(include_hidden=True):
+        if not (rel.auto_created and not rel.concrete and (rel.one_to_many or rel.one_to_one)):
+            continue
+        child, path = rel.related_model, f'{rel.field.name}__{lookup}'
+        if rel.on_delete is models.CASCADE:
+            if child in ancestors:
+                continue
+            steps.extend(erasure_plan(child, path, ancestors + (model,)))
+            steps.append(('delete', child, path))
+        elif rel.on_delete is models.SET_NULL:
+            steps.append(('null', child, path, rel.field))
+        elif rel.on_delete in (models.PROTECT, models.RESTRICT):
+            raise ValueError(f'{_label(child)}.{rel.field.name} protects {_label(model)} rows from erasure.')
+        # DO_NOTHING and SET_DEFAULT/SET(...) are left to the database, as the ORM would.
+    return steps
+
+
+def legacy_ids(user_id):
+    """The legacy user_id strings that may hold `user_id`'s rows; needs the User row, for placeholder users."""
+    username = User.objects.filter(pk=user_id).values_list('username', flat=True).first()
+    return legacy_ids_of(user_id, username)
+
+
+def _roots(user_id, legacy_user_ids):
+    """(model, lookup, values) of the rows holding the user's data that have no foreign key to the user."""
+    return [
+        (LegacyResponse, 'user_id', list(legacy_user_ids)),
+        (ChangeLogEntry, 'audience', [user_id]),
+    ]
+
+
+# =============================================================================
+# DELETION
+# =============================================================================
+
+def _batch_sql(model, lookup, values, batch_size):
+    matching = model._base_manager.filter(**{f'{lookup}__in': values}).order_by().values('pk')[:batch_size]
+    inner, params = matching.query.sql_with_params()
+    quote = connection.ops.quote_name
+    return quote(model._meta.db_table), quote(model._meta.pk.column), inner, params
+
+
+def delete_batch(model, lookup, values, batch_size):
+    """Delete up to `batch_size` rows of `model` matching `lookup`; returns the number deleted."""
+    table, pk, inner, params = _batch_sql(model, lookup, values, batch_size)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({inner})', params)
+        return cursor.rowcount
+
+
+def null_batch(model, lookup, values, field, batch_size):
+    """Clear `field` on up to `batch_size` rows matching `lookup`; returns the number updated."""
+    table, pk, inner, params = _batch_sql(model, lookup, values, batch_size)
+    column = connection.ops.quote_name(field.column)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {table} SET {column} = NULL WHERE {pk} IN ({inner})', params)
+        return cursor.rowcount
+
+
+def _run_step(erasure, step, values, config):
+    action, model, lookup = step[:3]
+    total = 0
+    while True:
+        if action == 'delete':
+            count = delete_batch(model, lookup, values, config['BATCH_SIZE'])
+        else:
+            count = null_batch(model, lookup, values, step[3], config['BATCH_SIZE'])
+        total += count
+        if count < config['BATCH_SIZE']:
+            break
+        time.sleep(config['PAUSE_SECONDS'])
+    if total and action == 'delete':
+        erasure.deleted[_label(model)] = erasure.deleted.get(_label(model), 0) + total
+        erasure.save(update_fields=['deleted'])
+
+
+def _schedule_media(erasure, user_id):
+    resources = set()
+    explanations = Explanation.objects.filter(
+        models.Q(user_id=user_id) | models.Q(question_response__user_id=user_id),
+    ).values_list(Cast('media_file', models.CharField()), 'media_url', 'thumbnail_url')  # Stored value, unparsed
+    for row in explanations.iterator():
+        resources.update(value for value in row if value)
+    avatar = User.objects.filter(pk=user_id).values_list('avatar', flat=True).first()
+    if avatar:
+        resources.add(avatar)
+    MediaDeletion.objects.bulk_create(
+        [MediaDeletion(erasure=erasure, resource=resource) for resource in resources], ignore_conflicts=True,
+    )
+
+
+def erase(erasure):
+    """Delete every row of `erasure`'s user, then their media. Safe to run again after a failure."""
+    config = settings.ERASURE
+    user_id = erasure.user_id
+    ErasureRequest.objects.filter(pk=erasure.pk).update(status='running', started_at=erasure.started_at or timezone.now())
+    erasure.refresh_from_db()
+    try:
+        if not erasure.legacy_user_ids:
+            # Kept on the request: once the user row is gone, a placeholder's client id can't be found again.
+            erasure.legacy_user_ids = legacy_ids(user_id)
+            ErasureRequest.objects.filter(pk=erasure.pk).update(legacy_user_ids=erasure.legacy_user_ids)
+        _schedule_media(erasure, user_id)
+
+        # Peers who had this user as a neighbor get a fresh list on the next refresh.
+        mark_users_dirty(list(PeerNeighbor.objects.filter(neighbor_id=user_id).values_list('user_id', flat=True)))
+        # Few rows, and their signals revoke access caches and sockets and send sync tombstones.
+        with transaction.atomic():
+            memberships = TeamMembership.objects.filter(models.Q(user_id=user_id) | models.Q(care_team__owner_id=user_id))
+            deleted = memberships.delete()[1].get(_label(TeamMembership), 0)
+        if deleted:
+            erasure.deleted[_label(TeamMembership)] = erasure.deleted.get(_label(TeamMembership), 0) + deleted
+
+        for step in erasure_plan(User, 'pk'):
+            _run_step(erasure, step, [user_id], config)
+        for model, lookup, values in _roots(user_id, erasure.legacy_user_ids):
+            for step in erasure_plan(model, lookup) + [('delete', model, lookup)]:
+                _run_step(erasure, step, values, config)
+        with transaction.atomic():
+            # The dependents are gone, so the collector finds nothing left; signals still run.
+            if User.objects.filter(pk=user_id).delete()[0]:
+                erasure.deleted[_label(User)] = 1
+
+        ErasureRequest.objects.filter(pk=erasure.pk).update(status='media', deleted=erasure.deleted, error='')
+        audit.record(None, 'phi_deleted', 'user', user_id, owner=user_id, actor=erasure.requested_by_id)
+    except Exception as exc:
+        ErasureRequest.objects.filter(pk=erasure.pk).update(status='failed', deleted=erasure.deleted, error=repr(exc))
+        raise
+    delete_media(erasure_ids=[erasure.pk])
+
+
+# =============================================================================
+# MEDIA
+# =============================================================================
+
+def delete_resource(resource):
+    """Delete one stored file; returns False for references outside our storage."""
+    from cloudinary import uploader
+
+    if resource.startswith(('http://', 'https://')):
+        match = CLOUDINARY_URL_RE.match(resource)
+        if match is None:
+            return False
+        public_id, resource_type, upload_type = match['public_id'], match['resource_type'], match['type']
+        if resource_type == 'raw':
+            public_id += match['extension'] or ''  # Raw files keep their extension in the public id
+    else:
+        parsed = Explanation._meta.get_field('media_file').parse_cloudinary_resource(resource)
+        public_id, resource_type, upload_type = parsed.public_id, parsed.resource_type, parsed.type
+    result = uploader.destroy(public_id, resource_type=resource_type, type=upload_type, invalidate=True)
+    if result.get('result') not in ('ok', 'not found'):
+        raise RuntimeError(f'Storage refused to delete {public_id}: {result}')
+    return True
+
+
+def delete_media(erasure_ids=None, limit=None):
+    """Delete pending media, then finish the erasures with none left. Returns the number of files handled."""
+    config = settings.ERASURE
+    pending = MediaDeletion.objects.filter(
+        deleted_at__isnull=True, attempts__lt=config['MEDIA_MAX_ATTEMPTS'], erasure__status='media',
+    )
+    if erasure_ids is not None:
+        pending = pending.filter(erasure_id__in=erasure_ids)
+    handled = 0
+    for media in pending.order_by('id')[:limit or config['MEDIA_BATCH_SIZE']]:
+        try:
+            if not delete_resource(media.resource):
+                media.last_error = 'Not in our storage; nothing to delete.'
+            media.deleted_at = timezone.now()
+            handled += 1
+        except Exception as exc:
+            logger.warning('Could not delete erased media %s', media.pk, exc_info=True)
+            media.last_error = repr(exc)
+        media.attempts += 1
+        media.save(update_fields=['attempts', 'last_error', 'deleted_at'])
+
+    waiting = ErasureRequest.objects.filter(status='media')
+    if erasure_ids is not None:
+        waiting = waiting.filter(pk__in=erasure_ids)
+    undeleted = MediaDeletion.objects.filter(deleted_at__isnull=True)
+    waiting.filter(pk__in=undeleted.filter(attempts__gte=config['MEDIA_MAX_ATTEMPTS']).values('erasure_id')).update(
+        status='failed', error='Some media could not be deleted; see its last errors.',
+    )
+    for erasure in waiting.exclude(pk__in=undeleted.values('erasure_id')):
+        complete(erasure)
+    return handled
+
+
+# =============================================================================
+# REPORT
+# =============================================================================
+
+def remaining_rows(user_id, legacy_user_ids=None):
+    """
+    {"app_label.Model": rows} still referencing `user_id` (empty once erased).
+    Pass the request's legacy_user_ids once the user row may be gone.
+    """
+    remaining = {}
+    if legacy_user_ids is None:
+        legacy_user_ids = legacy_ids(user_id)
+    checks = [(step[1], step[2], [user_id]) for step in erasure_plan(User, 'pk') if step[0] == 'delete']
+    checks.append((User, 'pk', [user_id]))
+    for model, lookup, values in _roots(user_id, legacy_user_ids):
+        checks.extend((step[1], step[2], values) for step in erasure_plan(model, lookup) if step[0] == 'delete')
+        checks.append((model, lookup, values))
+    # A row reachable along several paths is counted once.
+    matches = {}
+    for model, lookup, values in checks:
+        match = models.Q(pk__in=model._base_manager.filter(**{f'{lookup}__in': values}).values('pk'))
+        matches[model] = matches[model] | match if model in matches else match
+    for model, match in matches.items():
+        count = model._base_manager.filter(match).count()
+        if count:
+            remaining[_label(model)] = count
+    return remaining
+
+
+def complete(erasure):
+    """Verify nothing is left and store the report; returns it, or None if rows or media remain."""
+    remaining = remaining_rows(erasure.user_id, erasure.legacy_user_ids or None)
+    media = erasure.media.aggregate(
+        scheduled=models.Count('id'), deleted=models.Count('id', filter=models.Q(deleted_at__isnull=False)),
+    )
+    if remaining or media['scheduled'] != media['deleted']:
+        ErasureRequest.objects.filter(pk=erasure.pk).update(
+            status='failed', error=f'Still present after erasure: {remaining or media}',
+        )
+        return None
+    completed_at = timezone.now()
+    report = {
+        'erasure': erasure.pk,
+        'user': str(erasure.user_id),
+        'requested_at': erasure.created_at.isoformat(),
+        'completed_at': completed_at.isoformat(),
+        'deleted': dict(sorted(erasure.deleted.items())),
+        'media_deleted': media['deleted'],
+        'remaining': remaining,
+    }
+    ErasureRequest.objects.filter(pk=erasure.pk).update(
+        status='done', report=report, report_digest=hashlib.sha256(canonical(report)).hexdigest(),
+        completed_at=completed_at, error='',
+    )
+    return report
+
+
+def verify_report(erasure):
+    """True if the stored report is unaltered and still nothing references the user."""
+    return (
+        erasure.report is not None
+        and hashlib.sha256(canonical(erasure.report)).hexdigest() == erasure.report_digest
+        and not remaining_rows(erasure.user_id, erasure.legacy_user_ids or None)
+    )
+
+
+def request_erasure(user, requested_by=None):
+    """
+    Record a deletion request for `user`; returns the ErasureRequest. Web
+    processes cannot queue tasks, so start_erasures picks it up within
+    ERASURE['POLL_SECONDS'].
+    """
+    return ErasureRequest.objects.create(user_id=user.pk, requested_by=requested_by)
+
+
+def claim_new_requests(now=None):
+    """
+    Ids of requests nobody has started, marked started so that later polls
+    skip them. A claim whose task never ran (status still pending after
+    ERASURE['CLAIM_TIMEOUT_SECONDS']) is taken again.
+    """
+    now = now or timezone.now()
+    claimed = []
+    unclaimed = models.Q(started_at__isnull=True) | models.Q(
+        started_at__lt=now - timedelta(seconds=settings.ERASURE['CLAIM_TIMEOUT_SECONDS'])
+    )
+    new = ErasureRequest.objects.filter(unclaimed, status='pending')
+    for erasure_id, started_at in new.values_list('pk', 'started_at'):
+        if ErasureRequest.objects.filter(pk=erasure_id, status='pending', started_at=started_at).update(started_at=now):
+            claimed.append(erasure_id)
+    return claimed
+
+
+def release_claim(erasure_id):
+    """Give a claimed request back to the next poll, e.g. when its task could not be queued."""
+    ErasureRequest.objects.filter(pk=erasure_id, status='pending').update(started_at=None)
@@ -0,0 +1,241 @@
+"""Streaming exports: a user's care plan (JSON/HTML) and anonymized research dumps."""
+import csv
+import hashlib
+import hmac
+import uuid
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.html import escape
+
+from .models import CheckpointResponse
+from .plans import plan_queryset, media_link
+
+# Rows fetched per round trip; each chunk gets its own prefetch queries.
+EXPORT_CHUNK_SIZE = 50
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+def plan_responses(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterate over a user's question responses with everything the export needs.
+
+    Uses iterator(chunk_size=...) so prefetching happens per chunk and memory
+    stays bounded no matter how many questions the user has answered.
+    """
+    return plan_queryset(user).iterator(chunk_size=chunk_size)
+
+
+def serialize_response(response):
+    """Build the export dict for a single QuestionResponse (already prefetched)."""
+    question = response.main_question
+    return {
+        'section': question.section.title,
+        'question': question.key,
+        'title': question.title,
+        'subtitle': question.subtitle,
+        'isComplete': response.is_complete,
+        'updatedAt': response.updated_at,
+        'checkpoints': [
+            {
+                'number': cp_response.checkpoint.checkpoint_number,
+                'type': cp_response.checkpoint.checkpoint_type,
+                'title': cp_response.checkpoint.title,
+                'selectedChoices': [
+                    {
+                        'key': choice.key,
+                        'title': choice.title,
+                        'subtitle': choice.subtitle,
+                        'description': choice.description,
+                    }
+                    for choice in cp_response.selected_choices.all()
+                ],
+            }
+            for cp_response in response.checkpoint_responses.all()
+        ],
+        'explanations': [
+            {
+                'type': explanation.explanation_type,
+                'text': explanation.text_content,
+                'description': explanation.description,
+                'mediaUrl': media_link(explanation),
+                'thumbnailUrl': explanation.thumbnail_url,
+                'durationSeconds': explanation.duration_seconds,
+                'visibility': explanation.visibility,
+                'createdAt': explanation.created_at,
+            }
+            for explanation in response.explanations.all()
+        ],
+    }
+
+
+def iter_plan_json(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the plan as a JSON document, one question response at a time."""
+    header = {
+        'user': {'id': user.pk, 'email': user.email, 'name': user.get_full_name()},
+        'generatedAt': timezone.now(),
+    }
+    # Open the document by hand so the responses array can be streamed.
+    yield _encoder.encode(header)[:-1] + ', "responses": ['
+    for index, response in enumerate(plan_responses(user, chunk_size)):
+        yield (',' if index else '') + _encoder.encode(serialize_response(response))
+    yield ']}'
+
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Advance Care Plan - {name}</title>
+<style>
+body {{ font-family: Georgia, serif; max-width: 48rem; margin: 2rem auto; color: #222; }}
+h1 {{ margin-bottom: 0; }}
+section {{ page-break-inside: avoid; border-top: 1px solid #ccc; padding-top: 1rem; }}
+.meta {{ color: #666; font-size: 0.9rem; }}
+@media print {{ body {{ margin: 0; }} }}
+</style>
+</head>
+<body>
+<h1>Advance Care Plan</h1>
+<p class="meta">{name} &middot; generated {generated}</p>
+"""
+
+
+def _render_response_html(data):
+    parts = [
+        '<section>',
+        f'<p class="meta">{escape(data["section"])} &middot; {escape(data["subtitle"])}</p>',
+        f'<h2>{escape(data["title"])}</h2>',
+    ]
+    for checkpoint in data['checkpoints']:
+        parts.append(f'<h3>{escape(checkpoint["title"])}</h3><ul>')
+        for choice in checkpoint['selectedChoices']:
+            parts.append(f'<li><strong>{escape(choice["title"])}</strong><br>{escape(choice["description"])}</li>')
+        parts.append('</ul>')
+    for explanation in data['explanations']:
+        parts.append(f'<h3>My explanation ({escape(explanation["type"])})</h3>')
+        if explanation['text']:
+            parts.append(f'<p>{escape(explanation["text"])}</p>')
+        if explanation['mediaUrl']:
+            link = escape(explanation['mediaUrl'])
+            parts.append(f'<p><a href="{link}">{link}</a></p>')
+    parts.append('</section>\n')
+    return ''.join(parts)
+
+
+def iter_plan_html(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a printable HTML rendering of the plan (use the browser's print-to-PDF)."""
+    yield _HTML_HEAD.format(
+        name=escape(user.get_full_name() or user.email),
+        generated=timezone.now().strftime('%Y-%m-%d %H:%M UTC'),
+    )
+    for response in plan_responses(user, chunk_size):
+        yield _render_response_html(serialize_response(response))
+    yield '</body>\n</html>\n'
+
+
+# =============================================================================
+# ANONYMIZED RESEARCH EXPORT
+# =============================================================================
+
+RESEARCH_COLUMNS = [
+    'participant', 'section', 'question', 'checkpoint', 'checkpoint_type',
+    'choices', 'question_complete', 'answered',
+]
+
+
+def pseudonymize(user_id, key):
+    """Keyed hash of a user id; stable per key, irreversible without it."""
+    digest = hmac.new(key.encode(), str(user_id).encode(), hashlib.sha256)
+    return digest.hexdigest()[:32]
+
+
+def uuid_shard_bounds(shard, shards):
+    """Return the [low, high) UUID range for shard number `shard` of `shards`."""
+    span = (1 << 128) // shards
+    low = uuid.UUID(int=shard * span)
+    high = None if shard == shards - 1 else uuid.UUID(int=(shard + 1) * span)
+    return low, high
+
+
+def iter_research_rows(key, chunk_size=2000, shard=None, date_precision='year'):
+    """
+    Yield one anonymized row per checkpoint response, ordered by participant.
+
+    Reads flat values through iterator(chunk_size=...), which uses a server-side
+    cursor on PostgreSQL, and groups the LEFT JOINed choice keys back into one
+    row per checkpoint response, so memory does not grow with table size.
+    """
+    queryset = CheckpointResponse.objects.all()
+    if shard is not None:
+        low, high = shard
+        queryset = queryset.filter(user_id__gte=low)
+        if high is not None:
+            queryset = queryset.filter(user_id__lt=high)
+
+    rows = queryset.order_by('user_id', 'id', 'selected_choices__key').values_list(
+        'id',
+        'user_id',
+        'question_response__main_question__section__key',
+        'question_response__main_question__key',
+        'checkpoint__checkpoint_number',
+        'checkpoint__checkpoint_type',
+        'selected_choices__key',
+        'question_response__is_complete',
+        'updated_at',
+    ).iterator(chunk_size=chunk_size)
+
+    date_format = '%Y' if date_precision == 'year' else '%Y-%m-%d'
+    pseudonyms = {}
+    for _, group in groupby(rows, key=itemgetter(0)):
+        first = next(group)
+        user_id = first[1]
+        if user_id not in pseudonyms:
+            # Rows arrive ordered by user, so only the current user is kept.
+            pseudonyms = {user_id: pseudonymize(user_id, key)}
+        choices = [first[6]] + [row[6] for row in group]
+        yield (
+            pseudonyms[user_id], first[2], first[3], first[4], first[5],
+            '|'.join(choice for choice in choices if choice),
+            first[7], first[8].strftime(date_format),
+        )
+
+
+def write_research_csv(rows, path):
+    """Write rows to a CSV file, returning the number of rows written."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(RESEARCH_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_research_parquet(rows, path, row_group_size=50000):
+    """Write rows to a Parquet file one row group at a time (requires pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('participant', pa.string()), ('section', pa.string()), ('question', pa.string()),
+        ('checkpoint', pa.int16()), ('checkpoint_type', pa.string()), ('choices', pa.string()),
+        ('question_complete', pa.bool_()), ('answered', pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist([dict(zip(RESEARCH_COLUMNS, r)) for r in batch], schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist([dict(zip(RESEARCH_COLUMNS, r)) for r in batch], schema))
+            count += len(batch)
+    return count
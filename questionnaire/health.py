@@ -0,0 +1,76 @@
+"""
+Readiness checks behind /api/ready/.
+
+Each dependency is probed in a worker thread with a short timeout, and the
+combined result is kept in-process for READINESS['CACHE_SECONDS'] so that
+frequent probes from the platform cannot pile load onto the database.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+
+PROBE_KEY = 'ready-probe'
+
+
+def check_database():
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def check_cache():
+    cache.set(PROBE_KEY, 1, 30)
+    if cache.get(PROBE_KEY) != 1:
+        raise RuntimeError('cache did not return the probe value')
+
+
+def check_storage():
+    default_storage.exists(PROBE_KEY)
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'storage': check_storage,
+}
+
+_executor = ThreadPoolExecutor(max_workers=len(CHECKS), thread_name_prefix='ready')
+_pending = {}
+_result = None
+_expires = 0.0
+_lock = threading.Lock()
+
+
+def _run_checks(names, timeout):
+    deadline = time.monotonic() + timeout
+    for name in names:
+        # A check still stuck from an earlier probe is not started again.
+        if name not in _pending or _pending[name].done():
+            _pending[name] = _executor.submit(CHECKS[name])
+    results = {}
+    for name in names:
+        try:
+            _pending[name].result(timeout=max(deadline - time.monotonic(), 0))
+            results[name] = 'ok'
+        except TimeoutError:
+            results[name] = 'timeout'
+        except Exception as exc:
+            results[name] = f'error: {type(exc).__name__}'
+    return results
+
+
+def readiness():
+    """Return (ready, {check: 'ok' | 'timeout' | 'error: ...'}), cached for a few seconds."""
+    global _result, _expires
+    config = settings.READINESS
+    with _lock:
+        if _result is None or time.monotonic() >= _expires:
+            checks = _run_checks(config['CHECKS'], config['TIMEOUT'])
+            _result = (all(state == 'ok' for state in checks.values()), checks)
+            _expires = time.monotonic() + config['CACHE_SECONDS']
+        return _result
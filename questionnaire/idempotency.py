@@ -0,0 +1,81 @@
+"""
+Idempotency-Key support for write endpoints.
+
+The first request with a key claims it in the cache (Redis in production)
+with a short-lived pending record, runs, and replaces the record with its
+response for AUTOSAVE['IDEMPOTENCY_TTL']. A retry with the same key gets
+that response back without running again. A retry while the first request
+still runs gets 409, and reusing a key for a different body gets 422. Keys
+are scoped per user. If the cache is down, requests run unprotected.
+"""
+import functools
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response as DRFResponse
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+
+
+def _fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def idempotent(method):
+    """Decorate an APIView handler to require an Idempotency-Key and replay its response."""
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER, '').strip()
+        if not key or len(key) > 255:
+            return DRFResponse({'detail': f'An {HEADER} header (up to 255 characters) is required.'},
+                               status=status.HTTP_400_BAD_REQUEST)
+        config = settings.AUTOSAVE
+        cache_key = f'idem:{request.user.pk}:{hashlib.sha256(key.encode()).hexdigest()}'
+        fingerprint = _fingerprint(request.data)
+
+        try:
+            claimed = cache.add(cache_key, {'fingerprint': fingerprint, 'done': False}, config['PENDING_TTL'])
+            # None if claimed, or if the record expired between add() and get().
+            record = None if claimed else cache.get(cache_key)
+        except Exception:
+            logger.warning('Idempotency cache unavailable; running request without a key', exc_info=True)
+            return method(self, request, *args, **kwargs)
+
+        if record is not None:
+            if record['fingerprint'] != fingerprint:
+                return DRFResponse({'detail': f'This {HEADER} was used for a different request.'},
+                                   status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if not record['done']:
+                return DRFResponse({'detail': 'A request with this key is in progress.'},
+                                   status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+            return DRFResponse(record['data'], status=record['status'], headers={'Idempotent-Replayed': 'true'})
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            _release(cache_key)
+            raise
+        if response.status_code >= 500:
+            _release(cache_key)
+        else:
+            try:
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint, 'done': True, 'status': response.status_code, 'data': response.data,
+                }, config['IDEMPOTENCY_TTL'])
+            except Exception:
+                logger.warning('Could not store idempotent response', exc_info=True)
+        return response
+    return wrapper
+
+
+def _release(cache_key):
+    """Let the client retry a failed request with the same key."""
+    try:
+        cache.delete(cache_key)
+    except Exception:
+        logger.warning('Could not release idempotency key', exc_info=True)
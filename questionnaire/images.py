@@ -0,0 +1,302 @@
+"""
+Responsive variants of content images (Choice.image).
+
+Every image URL gets an ImageAsset. process() fetches the source once
+through the configured fetcher and keeps it in the `images` storage. It
+then writes each of IMAGES['FORMATS'] at each of IMAGES['WIDTHS'], never
+wider than the source. Variant URLs (/api/images/<digest>/<width>.<format>)
+contain a digest of the source and the encoding settings. A URL therefore
+never changes content, and image_variant serves it as immutable.
+
+Choice serializers call image_fields(): `image` becomes the default variant
+and `imageSrcset` gives srcset strings per format. Until an image is ready,
+the source URL is served as before.
+"""
+import hashlib
+import io
+import logging
+import threading
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Choice, ImageAsset, LegacyChoice
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+SOURCE_DIR = 'sources'
+
+
+class FetchError(Exception):
+    pass
+
+
+# =============================================================================
+# FETCHERS
+# =============================================================================
+
+class HTTPFetcher:
+    """Download sources over HTTP(S), up to `max_bytes`."""
+
+    def __init__(self, timeout=10, max_bytes=20 * 1024 * 1024, **kwargs):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+    def fetch(self, url):
+        if urlsplit(url).scheme not in ('http', 'https'):
+            raise FetchError(f'Not an HTTP(S) URL: {url}')
+        request = Request(url, headers={'User-Agent': 'awfm-image-fetcher', 'Accept': 'image/*'})
+        with urlopen(request, timeout=self.timeout) as response:
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.startswith('image/'):
+                raise FetchError(f'{url} is {content_type or "untyped"}, not an image')
+            data = response.read(self.max_bytes + 1)
+        if len(data) > self.max_bytes:
+            raise FetchError(f'{url} is larger than {self.max_bytes} bytes')
+        return data
+
+
+class LocalFileFetcher:
+    """
+    Read sources from a directory instead of the network (offline development
+    and tests). file:// URLs are read as is. Otherwise the file is named after
+    the URL's last path segment, with or without an extension.
+    """
+
+    def __init__(self, root, **kwargs):
+        self.root = Path(root)
+
+    def fetch(self, url):
+        parts = urlsplit(url)
+        if parts.scheme == 'file':
+            path = Path(unquote(parts.path))
+        else:
+            name = Path(unquote(parts.path)).name
+            path = self.root / name
+            if not path.is_file():
+                path = next(self.root.glob(f'{name}.*'), path)
+        if not path.is_file():
+            raise FetchError(f'No local file for {url} ({path})')
+        return path.read_bytes()
+
+
+_fetcher = None
+
+
+def get_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        config = dict(settings.IMAGES['FETCHER'])
+        _fetcher = import_string(config.pop('BACKEND'))(**{key.lower(): value for key, value in config.items()})
+    return _fetcher
+
+
+def get_storage():
+    return storages['images']
+
+
+# =============================================================================
+# PROCESSING
+# =============================================================================
+
+def register(urls):
+    """Ensure an ImageAsset per URL. Returns the ids of the ones created."""
+    urls = {url for url in urls if url}
+    if not urls:
+        return []
+    known = set(ImageAsset.objects.filter(source_url__in=urls).values_list('source_url', flat=True))
+    ImageAsset.objects.bulk_create([ImageAsset(source_url=url) for url in urls - known], ignore_conflicts=True)
+    return list(ImageAsset.objects.filter(source_url__in=urls - known).values_list('pk', flat=True))
+
+
+def register_choice_image(sender, instance, raw=False, **kwargs):
+    """post_save handler for Choice and LegacyChoice: new image URLs wait for process_pending_images."""
+    if not raw and instance.image:
+        register([instance.image])
+
+
+def content_image_urls():
+    """Every image URL the questionnaire content uses."""
+    return (
+        set(Choice.objects.exclude(image='').values_list('image', flat=True))
+        | set(LegacyChoice.objects.exclude(image='').values_list('image', flat=True))
+    )
+
+
+def encoding_digest(source_hash):
+    config = settings.IMAGES
+    settings_key = repr((output_formats(), config['WIDTHS'], sorted(config['QUALITY'].items())))
+    return hashlib.sha256(f'{source_hash}:{settings_key}'.encode()).hexdigest()[:12]
+
+
+def output_formats():
+    """IMAGES['FORMATS'] this Pillow build can write."""
+    from PIL import features
+
+    return [fmt for fmt in settings.IMAGES['FORMATS'] if features.check(fmt)]
+
+
+def target_widths(source_width):
+    """Configured widths up to the source's, plus the source width itself when narrower than the largest."""
+    widths = {width for width in settings.IMAGES['WIDTHS'] if width <= source_width}
+    if source_width < max(settings.IMAGES['WIDTHS']):
+        widths.add(source_width)
+    return sorted(widths)
+
+
+def _source_bytes(asset, storage):
+    """The original: from storage when it was fetched before, else fetched now and stored."""
+    if asset.source_name:
+        with storage.open(asset.source_name) as stored:
+            return stored.read()
+    data = get_fetcher().fetch(asset.source_url)
+    source_hash = hashlib.sha256(data).hexdigest()
+    asset.source_name = storage.save(f'{SOURCE_DIR}/{source_hash}', ContentFile(data))
+    asset.source_hash = source_hash
+    return data
+
+
+def _encode_variants(asset, data, storage):
+    from PIL import Image, ImageOps
+
+    config = settings.IMAGES
+    digest = encoding_digest(asset.source_hash)
+    # Variants of an earlier run with the same digest are identical; keep them.
+    existing = {}
+    if asset.digest == digest:
+        existing = {(variant['format'], variant['width']): variant for variant in asset.variants}
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width * image.height > config['MAX_PIXELS']:
+            raise ValueError(f'{image.width}x{image.height} is more than {config["MAX_PIXELS"]} pixels')
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        variants = []
+        for width in target_widths(image.width):
+            resized = None
+            for fmt in output_formats():
+                if (fmt, width) in existing:
+                    variants.append(existing[(fmt, width)])
+                    continue
+                if resized is None:
+                    height = max(1, round(image.height * width / image.width))
+                    resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+                encoded = io.BytesIO()
+                resized.save(encoded, format=fmt.upper(), quality=config['QUALITY'][fmt])
+                body = encoded.getvalue()
+                name = storage.save(f'{digest}/{width}.{fmt}', ContentFile(body))
+                variants.append({'format': fmt, 'width': width, 'name': name, 'bytes': len(body)})
+        return digest, image.width, image.height, variants
+
+
+def process(asset):
+    """
+    Fetch (once) and encode one asset. Failures are recorded on the asset and
+    retried by process_pending until IMAGES['MAX_ATTEMPTS']. Returns True once
+    the asset is ready.
+    """
+    from .sync import record_bulk_change  # sync -> serializers -> images
+
+    storage = get_storage()
+    asset.attempts += 1
+    try:
+        data = _source_bytes(asset, storage)
+        digest, width, height, variants = _encode_variants(asset, data, storage)
+    except Exception as exc:
+        logger.warning('Could not process image %s', asset.source_url, exc_info=True)
+        asset.last_error = f'{type(exc).__name__}: {exc}'
+        if asset.status == 'pending' and asset.attempts >= settings.IMAGES['MAX_ATTEMPTS']:
+            asset.status = 'failed'  # A ready asset keeps serving the variants it has
+        asset.save(update_fields=['attempts', 'last_error', 'status', 'source_name', 'source_hash'])
+        return False
+
+    with transaction.atomic():
+        asset.status, asset.digest, asset.width, asset.height, asset.variants = 'ready', digest, width, height, variants
+        asset.last_error, asset.processed_at = '', timezone.now()
+        asset.save()
+        # Choice payloads now point at the variants; let synced clients refetch them.
+        record_bulk_change(Choice.objects.filter(image=asset.source_url))
+    return True
+
+
+def process_pending(limit=None):
+    """Process pending assets, oldest first (new ones and retries). Returns (ready, not ready)."""
+    ready = failed = 0
+    assets = ImageAsset.objects.filter(status='pending').order_by('id')
+    for asset in assets[:limit] if limit else assets:
+        if process(asset):
+            ready += 1
+        else:
+            failed += 1
+    return ready, failed
+
+
+# =============================================================================
+# PAYLOADS AND SERVING
+# =============================================================================
+
+_ready = {'loaded_at': None, 'by_url': {}, 'by_digest': {}}
+_ready_lock = threading.Lock()
+
+
+def _payload(asset):
+    config = settings.IMAGES
+    by_format = {}
+    for variant in sorted(asset.variants, key=lambda variant: variant['width']):
+        url = reverse('image-variant', args=[asset.digest, f'{variant["width"]}.{variant["format"]}'])
+        by_format.setdefault(variant['format'], []).append((variant['width'], url))
+    fallback = by_format.get(config['DEFAULT_FORMAT']) or next(iter(by_format.values()))
+    default = [url for width, url in fallback if width <= config['DEFAULT_WIDTH']] or [fallback[0][1]]
+    return {
+        'image': default[-1],
+        'imageSrcset': {
+            fmt: ', '.join(f'{url} {width}w' for width, url in by_format[fmt])
+            for fmt in config['FORMATS'] if fmt in by_format
+        },
+    }
+
+
+def _ready_images():
+    """Ready assets by source URL and by digest, reloaded every IMAGES['LOOKUP_SECONDS'] per process."""
+    now = time.monotonic()
+    if _ready['loaded_at'] is None or now - _ready['loaded_at'] >= settings.IMAGES['LOOKUP_SECONDS']:
+        with _ready_lock:
+            if _ready['loaded_at'] is None or now - _ready['loaded_at'] >= settings.IMAGES['LOOKUP_SECONDS']:
+                assets = ImageAsset.objects.filter(status='ready').exclude(variants=[]).only(
+                    'source_url', 'digest', 'variants',
+                )
+                by_url, by_digest = {}, {}
+                for asset in assets:
+                    by_url[asset.source_url] = _payload(asset)
+                    by_digest[asset.digest] = _variant_names(asset.variants)
+                _ready.update(loaded_at=now, by_url=by_url, by_digest=by_digest)
+    return _ready
+
+
+def _variant_names(variants):
+    return {f'{variant["width"]}.{variant["format"]}': variant['name'] for variant in variants}
+
+
+def image_fields(url):
+    """`image` and `imageSrcset` for a choice payload whose image is `url`."""
+    return _ready_images()['by_url'].get(url) or {'image': url, 'imageSrcset': {}}
+
+
+def variant_name(digest, name):
+    """Stored name of variant `name` ("640.webp") of `digest`, or None."""
+    names = _ready_images()['by_digest'].get(digest)
+    if names is None:
+        # Processed since this process last loaded the list.
+        variants = ImageAsset.objects.filter(digest=digest, status='ready').values_list('variants', flat=True).first()
+        names = _variant_names(variants or [])
+    return names.get(name)
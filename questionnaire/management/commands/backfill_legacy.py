@@ -0,0 +1,68 @@
+"""Management command to copy legacy responses into the current response tables."""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from questionnaire.backfill import LegacyMapping, LegacyResponseBackfill
+from questionnaire.models import MainQuestion
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies legacy Response rows into QuestionResponse/CheckpointResponse in throttled chunks, '
+        'resuming from the last checkpoint; --verify compares both sides'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Rows in the first chunk (adapted as the run goes)')
+        parser.add_argument('--max-load', type=float,
+                            help='Share of wall time spent copying, 0-1 (the rest is spent sleeping)')
+        parser.add_argument('--target-seconds', type=float, help='Chunk duration to size chunks toward')
+        parser.add_argument('--max-chunks', type=int, help='Stop after this many chunks (resume later)')
+        parser.add_argument('--verify', action='store_true', help='Verify the copied rows instead of copying')
+        parser.add_argument('--reset', action='store_true', help='Start again from the first row')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['max_load'] is not None and not 0 < options['max_load'] <= 1:
+            raise CommandError('--max-load must be in (0, 1].')
+        try:
+            mapping = LegacyMapping()
+        except MainQuestion.DoesNotExist:
+            raise CommandError(f'Main question {settings.LEGACY_BACKFILL["MAIN_QUESTION"]!r} does not exist; run seed_data.')
+
+        backfill = LegacyResponseBackfill(
+            chunk_size=options['chunk_size'], max_load=options['max_load'],
+            target_seconds=options['target_seconds'], progress=self.report, mapping=mapping,
+        )
+        if options['verify']:
+            self.verify(backfill)
+            return
+        if options['reset']:
+            backfill.reset()
+
+        checkpoint = backfill.checkpoint()
+        self.stdout.write(f'Resuming after id {checkpoint.last_id} ({checkpoint.rows_copied} rows copied)')
+        finished = backfill.run(max_chunks=options['max_chunks'])
+        checkpoint.refresh_from_db()
+        summary = f'{checkpoint.rows_copied} rows copied in {checkpoint.chunks} chunks, last id {checkpoint.last_id}'
+        if finished:
+            self.stdout.write(self.style.SUCCESS(f'Finished: {summary}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Stopped: {summary}; run again to resume'))
+
+    def report(self, copied, size, elapsed):
+        if self.verbosity > 1:
+            self.stdout.write(f'  {copied}/{size} rows in {elapsed * 1000:.0f} ms')
+
+    def verify(self, backfill):
+        result = backfill.verify()
+        self.stdout.write(
+            f'{result["source_rows"]} legacy rows, {result["target_rows"]} copies found, '
+            f'{result["skipped"]} unmapped, {result["superseded"]} changed since'
+        )
+        self.stdout.write(f'Checksums: legacy {result["source_checksum"]}, copies {result["target_checksum"]}')
+        if result['mismatches']:
+            for key in result['examples']:
+                self.stdout.write(f'  mismatch: user {key[0]}, checkpoint {key[1]}')
+            raise CommandError(f'{result["mismatches"]} rows do not match.')
+        self.stdout.write(self.style.SUCCESS('All copied rows match.'))
@@ -0,0 +1,71 @@
+"""Management command to compare JSON rendering time and bytes on the wire per endpoint."""
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import resolve
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from questionnaire.renderers import FastJSONRenderer
+from questionnaire.synthetic import generate_users
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+DEFAULT_PATHS = ['/api/sync/', '/api/content/manifest/']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks stdlib vs orjson rendering and raw/gzip/brotli sizes for API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user_id = generate_users(1)[0]
+                self._run(user_id, options['paths'], options['iterations'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, user_id, paths, iterations):
+        from questionnaire.models import User
+
+        user = User.objects.get(pk=user_id)
+        factory = APIRequestFactory()
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        self.stdout.write(f'{"endpoint":<28} {"stdlib ms":>10} {"orjson ms":>10} {"raw KiB":>8} {"gzip":>7} {"br":>7}')
+        for path in paths:
+            match = resolve(path)
+            request = factory.get(path)
+            force_authenticate(request, user)
+            response = match.func(request, *match.args, **match.kwargs)
+            data = getattr(response, 'data', None)
+            if data is None:
+                self.stdout.write(f'{path:<28} skipped (not a DRF response)')
+                continue
+
+            timings = []
+            for renderer in (stdlib, fast):
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    body = renderer.render(data)
+                timings.append((time.perf_counter() - started) * 1000 / iterations)
+
+            gzipped = len(gzip.compress(body, compresslevel=6))
+            brotlied = f'{len(brotli.compress(body, quality=5)) / 1024:7.1f}' if brotli else '    n/a'
+            self.stdout.write(
+                f'{path:<28} {timings[0]:10.3f} {timings[1]:10.3f} '
+                f'{len(body) / 1024:8.1f} {gzipped / 1024:7.1f} {brotlied}'
+            )
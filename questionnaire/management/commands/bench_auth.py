@@ -0,0 +1,53 @@
+"""Management command to compare per-request overhead of JWT and session authentication."""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from questionnaire.authentication import user_cache
+from questionnaire.models import User
+from questionnaire.synthetic import generate_users
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Times authenticated API requests with JWT (cached user) vs session auth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--path', default='/api/content/manifest/')
+
+    def handle(self, *args, **options):
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+        try:
+            # Throttling would otherwise reject most of the benchmark's requests.
+            with transaction.atomic(), override_settings(THROTTLE_BUCKETS={}):
+                user = User.objects.get(pk=generate_users(1, answered=0, explanations=False)[0])
+                session_client = Client(HTTP_HOST=host)
+                session_client.force_login(user)
+                jwt_client = Client(HTTP_HOST=host, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+                user_cache.clear()
+                for label, client in (('session', session_client), ('jwt', jwt_client)):
+                    self._run(label, client, options['path'], options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, label, client, path, count):
+        client.get(path)  # Warm up (and fill the JWT user cache)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(count):
+                client.get(path)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:>8}: {elapsed * 1000 / count:.3f} ms/request, '
+            f'{len(queries) / count:.2f} queries/request'
+        )
@@ -0,0 +1,97 @@
+"""Management command to benchmark user erasure against User.delete() on a heavy synthetic history."""
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from questionnaire.erasure import erase, remaining_rows
+from questionnaire.models import (
+    User, Explanation, CareTeam, TeamMembership, Reaction, Comment, AIInteraction, ErasureRequest,
+)
+from questionnaire.synthetic import BATCH_SIZE, generate_questions, generate_users
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Gives two synthetic users the same heavy history, deletes one with User.delete() and erases the '
+        'other, and compares time, queries and peak memory (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=300, help='Extra synthetic questions each user answered')
+        parser.add_argument('--ai-interactions', type=int, default=20000)
+        parser.add_argument('--peers', type=int, default=50, help='Care-team members commenting and reacting')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds between DELETE batches (production uses ERASURE["PAUSE_SECONDS"])')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                generate_questions(options['questions'])
+                rng = random.Random(options['seed'])
+                peers = User.objects.filter(pk__in=generate_users(options['peers'], answered=0, seed=options['seed']))
+                users = User.objects.filter(pk__in=generate_users(2, seed=options['seed'] + 1))
+                for user in users:
+                    self._history(user, list(peers), rng, options['ai_interactions'])
+                self.stdout.write(f'Generated two histories in {time.perf_counter() - started:.1f}s')
+
+                orm_user, erased_user = users
+                rows = sum(remaining_rows(orm_user.pk).values())
+                self.stdout.write(f'{rows:,} rows per user')
+                self._run('User.delete()', lambda: orm_user.delete())
+                erasure = ErasureRequest.objects.create(user_id=erased_user.pk)
+                with override_settings(ERASURE={**settings.ERASURE, 'PAUSE_SECONDS': options['pause']}):
+                    self._run('erase()', lambda: erase(erasure))
+                erasure.refresh_from_db()
+                self.stdout.write(
+                    f'erasure status {erasure.status}, {sum(erasure.deleted.values()):,} rows reported, '
+                    f'{sum(remaining_rows(erased_user.pk).values())} left'
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _history(self, user, peers, rng, interactions):
+        team = CareTeam.objects.create(owner=user)
+        TeamMembership.objects.bulk_create([TeamMembership(care_team=team, user=peer) for peer in peers])
+        explanations = list(Explanation.objects.filter(user=user).values_list('pk', flat=True))
+        Reaction.objects.bulk_create([
+            Reaction(user=peer, explanation_id=explanation_id, reaction_type='support')
+            for explanation_id in explanations for peer in rng.sample(peers, min(3, len(peers)))
+        ], batch_size=BATCH_SIZE)
+        Comment.objects.bulk_create([
+            Comment(user=peer, explanation_id=explanation_id, content='Synthetic comment ' * 5)
+            for explanation_id in explanations for peer in rng.sample(peers, min(2, len(peers)))
+        ], batch_size=BATCH_SIZE)
+        created = AIInteraction.objects.bulk_create([
+            AIInteraction(user=user, explanation_id=rng.choice(explanations), interaction_type='summarize',
+                          prompt='Synthetic prompt ' * 10, response='Synthetic response ' * 40, tokens_used=300)
+            for _ in range(interactions)
+        ], batch_size=BATCH_SIZE)
+        through = AIInteraction.compared_explanations.through
+        through.objects.bulk_create([
+            through(aiinteraction_id=interaction.pk, explanation_id=explanation_id)
+            for interaction in created for explanation_id in rng.sample(explanations, 2)
+        ], batch_size=BATCH_SIZE)
+
+    def _run(self, label, delete):
+        tracemalloc.start()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            delete()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{label:>14}: {elapsed:7.2f}s, {len(queries):6,} queries, peak Python memory {peak / 2 ** 20:,.1f} MiB'
+        )
@@ -0,0 +1,58 @@
+"""Management command to benchmark the research export on generated data."""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from questionnaire.export import iter_research_rows, write_research_csv, write_research_parquet
+from questionnaire.synthetic import generate_users
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measures export_responses throughput and peak memory on synthetic users (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                generate_users(options['users'], explanations=False)
+                self.stdout.write(f'Generated {options["users"]} users in {time.perf_counter() - started:.1f}s')
+                self._run('csv', write_research_csv, options['chunk_size'])
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError:
+                    self.stdout.write('  parquet: skipped (pyarrow not installed)')
+                else:
+                    self._run('parquet', write_research_parquet, options['chunk_size'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, label, writer, chunk_size):
+        handle, path = tempfile.mkstemp(suffix=f'.{label}')
+        os.close(handle)
+        try:
+            tracemalloc.start()
+            started = time.perf_counter()
+            count = writer(iter_research_rows('benchmark-key', chunk_size=chunk_size), path)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f'  {label}: {count} rows in {elapsed:.2f}s '
+                f'({count / elapsed:,.0f} rows/s), peak Python memory {peak / 1024:,.0f} KiB, '
+                f'{os.path.getsize(path) / 1024:,.0f} KiB on disk'
+            )
+        finally:
+            os.unlink(path)
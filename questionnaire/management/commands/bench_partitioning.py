@@ -0,0 +1,115 @@
+"""Management command to benchmark per-user reads and vacuum on a plain vs a hash-partitioned response table."""
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+PLAIN = 'bench_responses_plain'
+HASHED = 'bench_responses_hashed'
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills two scratch tables shaped like the selected choices table with the same generated rows, one plain '
+        'and one hash-partitioned by user, and compares per-user reads and VACUUM after updates (PostgreSQL; '
+        'the tables are dropped afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000)
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--partitions', type=int, default=settings.RESPONSE_PARTITIONS['PARTITIONS'])
+        parser.add_argument('--reads', type=int, default=2000, help='Users whose rows are read, per table')
+        parser.add_argument('--updated-users', type=int, default=5000,
+                            help='Users whose rows are all updated before the VACUUM')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark needs PostgreSQL.')
+        rng = random.Random(options['seed'])
+        try:
+            with connection.cursor() as cursor:
+                self._create(cursor, options)
+                for table in (PLAIN, HASHED):
+                    cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+                    self.stdout.write(f'{table}: {cursor.fetchone()[0] / 2 ** 20:,.0f} MiB with indexes')
+
+                readers = rng.sample(range(options['users']), min(options['reads'], options['users']))
+                self._reads(cursor, readers)
+                updated = rng.sample(range(options['users']), min(options['updated_users'], options['users']))
+                self._vacuum(cursor, updated, options['partitions'])
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {PLAIN}, {HASHED}')
+
+    def _create(self, cursor, options):
+        columns = (
+            'id bigint NOT NULL, user_id uuid NOT NULL, response_id bigint NOT NULL, choice_id bigint NOT NULL, '
+            'updated_at timestamptz NOT NULL'
+        )
+        cursor.execute(f'DROP TABLE IF EXISTS {PLAIN}, {HASHED}')
+        cursor.execute(f'CREATE TABLE {PLAIN} ({columns})')
+        cursor.execute(f'CREATE TABLE {HASHED} ({columns}) PARTITION BY HASH (user_id)')
+        for remainder in range(options['partitions']):
+            cursor.execute(
+                f'CREATE TABLE {HASHED}_p{remainder:02d} PARTITION OF {HASHED} '
+                f'FOR VALUES WITH (MODULUS {options["partitions"]:d}, REMAINDER {remainder:d})'
+            )
+        # Users answer over time, so one user's rows are spread through the plain table's heap.
+        for table in (PLAIN, HASHED):
+            started = time.perf_counter()
+            cursor.execute(
+                f'INSERT INTO {table} SELECT g, md5((g %% %s)::text)::uuid, g / 4, g %% 50, now() '
+                f'FROM generate_series(1, %s) g', [options['users'], options['rows']],
+            )
+            key = 'id' if table == PLAIN else 'id, user_id'
+            cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY ({key})')
+            cursor.execute(f'CREATE UNIQUE INDEX ON {table} (user_id, response_id, choice_id)')
+            cursor.execute(f'VACUUM ANALYZE {table}')
+            self.stdout.write(f'Loaded {options["rows"]:,} rows into {table} in {time.perf_counter() - started:.1f}s')
+
+    def _reads(self, cursor, users):
+        timings = {PLAIN: [], HASHED: []}
+        for number, user in enumerate(users):
+            # Alternate which table goes first so neither always finds the other's pages cached.
+            for table in (PLAIN, HASHED) if number % 2 else (HASHED, PLAIN):
+                started = time.perf_counter()
+                cursor.execute(
+                    f'SELECT response_id, choice_id FROM {table} WHERE user_id = md5(%s::text)::uuid', [user],
+                )
+                cursor.fetchall()
+                timings[table].append((time.perf_counter() - started) * 1000)
+        for table, values in timings.items():
+            values.sort()
+            self.stdout.write(
+                f'{table} per-user reads: mean {statistics.mean(values):.2f} ms, '
+                f'p50 {values[len(values) // 2]:.2f} ms, p95 {values[int(len(values) * 0.95)]:.2f} ms'
+            )
+
+    def _vacuum(self, cursor, users, partitions):
+        for table in (PLAIN, HASHED):
+            started = time.perf_counter()
+            cursor.execute(
+                f'UPDATE {table} SET updated_at = now() '
+                f'WHERE user_id = ANY(ARRAY(SELECT md5(u::text)::uuid FROM unnest(%s::int[]) u))', [users],
+            )
+            self.stdout.write(f'{table}: updated {cursor.rowcount:,} rows in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        cursor.execute(f'VACUUM {PLAIN}')
+        self.stdout.write(f'{PLAIN}: VACUUM {time.perf_counter() - started:.2f}s (one table-wide pass)')
+
+        # Autovacuum works on each partition on its own, so the longest single pass is what a table pays.
+        passes = []
+        for remainder in range(partitions):
+            started = time.perf_counter()
+            cursor.execute(f'VACUUM {HASHED}_p{remainder:02d}')
+            passes.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'{HASHED}: VACUUM {sum(passes):.2f}s over {partitions} partitions, '
+            f'longest pass {max(passes):.2f}s'
+        )
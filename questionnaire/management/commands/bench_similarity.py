@@ -0,0 +1,82 @@
+"""Management command to benchmark the peer-similarity engine on synthetic choice vectors."""
+import random
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from questionnaire.similarity import pack, top_neighbors, unpack
+
+
+def naive_top(query, candidates, k):
+    """Pure-Python Jaccard top-k, the per-pair work a SQL self-join does."""
+    scores = []
+    for index, candidate in enumerate(candidates):
+        union = len(query | candidate)
+        if union:
+            scores.append((len(query & candidate) / union, index))
+    return sorted(scores, reverse=True)[:k]
+
+
+class Command(BaseCommand):
+    help = 'Times packing, blocked top-k scoring and single-user refreshes for N synthetic users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--choices', type=int, default=84, help='Choice ids in the content (21 checkpoints x 4)')
+        parser.add_argument('--selected', type=int, default=30, help='Choices selected per user (at most)')
+        parser.add_argument('--candidate-share', type=float, default=0.3,
+                            help='Share of users with public explanations')
+        parser.add_argument('--metric', choices=['jaccard', 'cosine'], default=settings.SIMILARITY['METRIC'])
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        k, count = settings.SIMILARITY['NEIGHBORS'], options['users']
+        choice_sets = [
+            set(rng.sample(range(1, options['choices'] + 1), rng.randint(1, options['selected'])))
+            for _ in range(count)
+        ]
+        candidate_rows = [index for index in range(count) if rng.random() < options['candidate_share']]
+
+        started = time.perf_counter()
+        packed = [pack(choices) for choices in choice_sets]
+        self._report('pack', started, f'{sum(map(len, packed)) / count:.1f} bytes/user')
+
+        started = time.perf_counter()
+        width = max(map(len, packed))
+        queries = unpack(packed, width)
+        candidates = unpack([packed[index] for index in candidate_rows], width)
+        self._report('unpack', started, f'{candidates.nbytes / 2 ** 20:.1f} MiB candidate matrix')
+
+        started = time.perf_counter()
+        results = list(top_neighbors(queries, candidates, k, options['metric'], range(count), candidate_rows))
+        elapsed = time.perf_counter() - started
+        self._report(
+            f'top-{k} all', started,
+            f'{len(queries)} x {len(candidates)} pairs, {count / elapsed:,.0f} users/s',
+        )
+
+        started = time.perf_counter()
+        for index in range(100):
+            list(top_neighbors(queries[index:index + 1], candidates, k, options['metric']))
+        self._report('refresh x100', started, 'one dirty user at a time')
+
+        if options['metric'] == 'jaccard':
+            candidate_sets = [choice_sets[index] for index in candidate_rows]
+            sample, mismatches = 20, 0
+            started = time.perf_counter()
+            for index in range(sample):
+                expected = naive_top(choice_sets[index], candidate_sets, k + 1)
+                expected = [score for score, column in expected if candidate_rows[column] != index][:k]
+                # Scores only: ties may be broken differently.
+                mismatches += not np.allclose(results[index][2], expected, atol=1e-6)
+            naive = (time.perf_counter() - started) / sample
+            self.stdout.write(
+                f'{"naive python":>14}: {naive * 1000:9.1f} ms/user  '
+                f'(~{naive * count / 60:,.0f} min for all users; {mismatches}/{sample} results differ)'
+            )
+
+    def _report(self, label, started, detail):
+        self.stdout.write(f'{label:>14}: {(time.perf_counter() - started) * 1000:9.1f} ms  ({detail})')
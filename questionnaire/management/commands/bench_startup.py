@@ -0,0 +1,124 @@
+"""Management command to measure import time and worker boot, cold vs forked from a preloaded master."""
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+COLD_BOOT = '''
+import json, os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'awfm.settings')
+from awfm.wsgi import application
+from questionnaire.management.commands.bench_startup import serve_one
+print(json.dumps(serve_one(application, sys.argv[1], sys.argv[2])))
+'''
+
+IMPORT_ALL = "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'awfm.settings'); import awfm.wsgi"
+
+
+def memory_kb():
+    """(rss, private) of this process in kB from /proc, or (None, None) off Linux."""
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if ' ' not in key and value:
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        return None, None
+    return fields.get('Rss', 0), fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+
+
+def serve_one(application, path, host):
+    """Run one GET through the WSGI app the way a worker's first request would."""
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'HTTP_HOST': host}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    b''.join(body)
+    if hasattr(body, 'close'):
+        body.close()
+    rss, private = memory_kb()
+    return {'status': status[0], 'rss_kb': rss, 'private_kb': private}
+
+
+class Command(BaseCommand):
+    help = 'Reports the slowest imports at startup and times worker boot with and without preloading'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--path', default='/api/health/')
+
+    def handle(self, *args, **options):
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+        self._import_time(options['top'])
+        cold = [self._cold_boot(options['path'], host) for _ in range(options['runs'])]
+
+        # Mirror gunicorn.conf.py: load everything here, then fork workers from it.
+        from awfm.wsgi import application
+        connections.close_all()
+        gc.freeze()
+        forked = [self._forked_boot(application, options['path'], host) for _ in range(options['runs'])]
+
+        for label, runs in (('cold', cold), ('preload', forked)):
+            elapsed = statistics.median(run['elapsed'] for run in runs)
+            private = runs[-1]['private_kb']
+            memory = f'{private / 1024:.1f} MB private' if private is not None else 'memory n/a'
+            self.stdout.write(
+                f'{label:>8}: first response after {elapsed * 1000:.1f} ms ({runs[-1]["status"]}), {memory}'
+            )
+
+    def _import_time(self, top):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORT_ALL],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        # Sum each module's own (not cumulative) time into its top-level package.
+        packages = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            own, _, name = line[len('import time:'):].split('|')
+            package = name.strip().split('.')[0]
+            packages[package] = packages.get(package, 0) + int(own)
+        total = sum(packages.values())
+        self.stdout.write(f'Imports: {total / 1000:.1f} ms across {len(packages)} packages')
+        for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {micros / 1000:8.1f} ms  {name}')
+
+    def _cold_boot(self, path, host):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', COLD_BOOT, path, host],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        stats = json.loads(result.stdout.splitlines()[-1])
+        stats['elapsed'] = time.perf_counter() - started
+        return stats
+
+    def _forked_boot(self, application, path, host):
+        read_fd, write_fd = os.pipe()
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                os.write(write_fd, json.dumps(serve_one(application, path, host)).encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            stats = json.loads(pipe.read())
+        stats['elapsed'] = time.perf_counter() - started
+        os.waitpid(pid, 0)
+        return stats
@@ -0,0 +1,18 @@
+"""Management command to precompile questionnaire content into static JSON bundles."""
+from django.core.management.base import BaseCommand
+
+from questionnaire.bundles import build_bundles
+
+
+class Command(BaseCommand):
+    help = 'Writes content-hashed, pre-compressed JSON bundles of every section under STATIC_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Defaults to STATIC_ROOT/content')
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 1
+        manifest = build_bundles(options['output_dir'], log=self.stdout.write if verbose else None)
+        for entry in manifest['sections']:
+            self.stdout.write(f'  {entry["key"]}: {entry["path"]} ({entry["bytes"] // 1024}K)')
+        self.stdout.write(self.style.SUCCESS(f'Content bundle version {manifest["version"]}'))
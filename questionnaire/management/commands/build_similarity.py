@@ -0,0 +1,12 @@
+"""Management command to recompute every user's choice vector and peer neighbors."""
+from django.core.management.base import BaseCommand
+
+from questionnaire.similarity import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds choice vectors and the peer-neighbor table (also run daily by the worker)'
+
+    def handle(self, *args, **options):
+        users, neighbors = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{users} users, {neighbors} neighbor rows'))
@@ -0,0 +1,60 @@
+"""Management command to erase a user's data, or to check an erasure's completion report."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questionnaire.erasure import erase, request_erasure, verify_report
+from questionnaire.models import User, ErasureRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Queues erasure of a user's data (by email or id); --now runs it here instead, "
+        '--verify checks a finished erasure against its report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', nargs='?', help='Email or id of the user to erase')
+        parser.add_argument('--now', action='store_true', help='Erase in this process instead of the worker')
+        parser.add_argument('--verify', type=int, metavar='ERASURE_ID', help='Verify a finished erasure')
+
+    def handle(self, *args, **options):
+        if options['verify'] is not None:
+            self.verify(options['verify'])
+            return
+        if not options['user']:
+            raise CommandError('Give the email or id of the user to erase.')
+        lookup = {'email__iexact': options['user']} if '@' in options['user'] else {'pk': options['user']}
+        try:
+            user = User.objects.get(**lookup)
+        except (User.DoesNotExist, ValueError):
+            raise CommandError(f'No user {options["user"]!r}.')
+
+        if not options['now']:
+            erasure = request_erasure(user)
+            self.stdout.write(self.style.SUCCESS(f'Queued erasure #{erasure.pk} of {user.pk}'))
+            return
+        erasure = ErasureRequest.objects.create(user_id=user.pk)
+        erase(erasure)
+        erasure.refresh_from_db()
+        self.stdout.write(json.dumps(erasure.deleted, indent=2, sort_keys=True))
+        if erasure.status == 'done':
+            self.stdout.write(self.style.SUCCESS(f'Erasure #{erasure.pk} done, report digest {erasure.report_digest}'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Erasure #{erasure.pk} is {erasure.status}: rows are gone, '
+                f'{erasure.media.filter(deleted_at__isnull=True).count()} media files still to delete'
+            ))
+
+    def verify(self, erasure_id):
+        try:
+            erasure = ErasureRequest.objects.get(pk=erasure_id)
+        except ErasureRequest.DoesNotExist:
+            raise CommandError(f'No erasure #{erasure_id}.')
+        if erasure.status != 'done':
+            raise CommandError(f'Erasure #{erasure_id} is {erasure.status}, not done.')
+        if not verify_report(erasure):
+            raise CommandError(f'Erasure #{erasure_id} does not match its report or data was found again.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Erasure #{erasure_id}: report intact ({erasure.report_digest}), nothing left for {erasure.user_id}'
+        ))
@@ -0,0 +1,75 @@
+"""Management command to write an anonymized dump of all responses for research."""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from questionnaire.export import (
+    iter_research_rows, uuid_shard_bounds, write_research_csv, write_research_parquet
+)
+
+WRITERS = {
+    'csv': write_research_csv,
+    'parquet': write_research_parquet,
+}
+
+
+def export_shard(path, output_format, key, chunk_size, shard, shards, date_precision):
+    """Export one user-id range to `path`."""
+    bounds = uuid_shard_bounds(shard, shards) if shards > 1 else None
+    rows = iter_research_rows(key, chunk_size=chunk_size, shard=bounds, date_precision=date_precision)
+    return WRITERS[output_format](rows, path)
+
+
+def export_shard_in_worker(*args):
+    # Connections inherited from the parent must not be shared after fork.
+    connections.close_all()
+    return export_shard(*args)
+
+
+class Command(BaseCommand):
+    help = 'Exports pseudonymized responses (user x question x checkpoint x choices) to CSV or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Output file path (shards get a .partNN suffix)')
+        parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched per server-side cursor round trip')
+        parser.add_argument('--shards', type=int, default=1,
+                            help='Split the export by user id range into this many files')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of shards exported in parallel')
+        parser.add_argument('--date-precision', choices=['year', 'day'], default='year')
+        parser.add_argument('--key', default='',
+                            help='Pseudonymization key (defaults to RESEARCH_EXPORT_KEY)')
+
+    def handle(self, *args, **options):
+        key = options['key'] or settings.RESEARCH_EXPORT_KEY
+        if not key:
+            raise CommandError('Set RESEARCH_EXPORT_KEY or pass --key; user ids are never exported unhashed.')
+        if options['format'] == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise CommandError('Parquet output requires pyarrow (pip install pyarrow).')
+
+        shards = max(options['shards'], 1)
+        output = Path(options['output'])
+        jobs = []
+        for shard in range(shards):
+            path = output if shards == 1 else output.with_suffix(f'.part{shard:02d}{output.suffix}')
+            jobs.append((str(path), options['format'], key, options['chunk_size'],
+                         shard, shards, options['date_precision']))
+
+        if options['workers'] > 1 and shards > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                counts = list(pool.map(export_shard_in_worker, *zip(*jobs)))
+        else:
+            counts = [export_shard(*job) for job in jobs]
+
+        for job, count in zip(jobs, counts):
+            self.stdout.write(f'  Wrote {count} rows to {job[0]}')
+        self.stdout.write(self.style.SUCCESS(f'Exported {sum(counts)} rows'))
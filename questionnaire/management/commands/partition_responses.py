@@ -0,0 +1,51 @@
+"""Management command to hash-partition the response tables by user (PostgreSQL)."""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from questionnaire import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds QuestionResponse, CheckpointResponse and the selected choices table as tables hash-partitioned '
+        'by user while the app keeps running, resuming an interrupted run; --status reports progress'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int,
+                            help=f'Partitions per table (default {settings.RESPONSE_PARTITIONS["PARTITIONS"]})')
+        parser.add_argument('--batch-size', type=int, help='Rows copied per transaction')
+        parser.add_argument('--status', action='store_true', help='Report the state of each table and stop')
+        parser.add_argument('--drop-old', action='store_true',
+                            help='Drop the unpartitioned tables a finished conversion left behind')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['partitions'] is not None and options['partitions'] < 2:
+            raise CommandError('--partitions must be at least 2.')
+        try:
+            if options['status']:
+                for row in partitioning.status():
+                    old = ', _old table kept' if row['old_table'] else ''
+                    self.stdout.write(
+                        f'{row["table"]}: {row["state"]}, {row["partitions"]} partitions, '
+                        f'{row["rows_copied"]:,} rows copied{old}'
+                    )
+                return
+            if options['drop_old']:
+                dropped = partitioning.drop_old()
+                self.stdout.write(self.style.SUCCESS(f'Dropped {", ".join(dropped) or "nothing"}'))
+                return
+            converted = partitioning.convert(options['partitions'], options['batch_size'], progress=self.report)
+        except partitioning.PartitioningError as exc:
+            raise CommandError(str(exc))
+        if converted:
+            self.stdout.write(self.style.SUCCESS(
+                f'Partitioned {", ".join(converted)}; check them, then run again with --drop-old'
+            ))
+        else:
+            self.stdout.write('All response tables are already partitioned')
+
+    def report(self, table, last_id, copied, elapsed):
+        if self.verbosity > 1:
+            self.stdout.write(f'  {table}: {copied} rows up to id {last_id} in {elapsed * 1000:.0f} ms')
@@ -0,0 +1,33 @@
+"""Management command to fetch and encode the questionnaire's content images."""
+from django.core.management.base import BaseCommand
+
+from questionnaire.images import content_image_urls, process, process_pending, register
+from questionnaire.models import ImageAsset
+
+
+class Command(BaseCommand):
+    help = (
+        'Registers every choice image and fetches and encodes the pending ones in this process '
+        '(run before build_content_bundle so bundles point at the variants)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also try images that failed too often')
+        parser.add_argument('--all', action='store_true',
+                            help='Re-encode ready images too, e.g. after changing IMAGES widths or formats')
+
+    def handle(self, *args, **options):
+        created = register(content_image_urls())
+        if options['retry_failed']:
+            ImageAsset.objects.filter(status='failed').update(status='pending', attempts=0, last_error='')
+        ready, failed = process_pending()
+        if options['all']:
+            # Ready images keep serving their current variants until the new ones are written.
+            for asset in ImageAsset.objects.filter(status='ready').order_by('id'):
+                if process(asset):
+                    ready += 1
+                else:
+                    failed += 1
+        self.stdout.write(f'{len(created)} new images, {ready} encoded, {failed} failed')
+        for asset in ImageAsset.objects.exclude(status='ready').exclude(last_error=''):
+            self.stdout.write(self.style.WARNING(f'{asset.source_url} ({asset.status}): {asset.last_error}'))
@@ -0,0 +1,29 @@
+"""Management command to check the audit log's hash chain."""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from questionnaire import audit
+from questionnaire.models import AuditEvent
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the audit log hash chain and reports the first altered or missing event'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, default=0, metavar='EVENT_ID',
+                            help='Trust the chain up to this event and check only what follows')
+        parser.add_argument('--drain', action='store_true',
+                            help='First move events queued in Redis into the table')
+
+    def handle(self, *args, **options):
+        audit.get_buffer().flush()
+        sink = audit.get_buffer().sink
+        if options['drain'] and isinstance(sink, audit.RedisAuditSink):
+            self.stdout.write(f'Drained {sink.drain(settings.AUDIT["DRAIN_BATCH_SIZE"]):,} queued events')
+        try:
+            checked, bad_id = audit.verify_chain(after_id=options['after'])
+        except AuditEvent.DoesNotExist:
+            raise CommandError(f'No audit event #{options["after"]}.')
+        if bad_id is not None:
+            raise CommandError(f'Audit chain broken at event #{bad_id} after {checked:,} intact events.')
+        self.stdout.write(self.style.SUCCESS(f'{checked:,} audit events checked, chain intact'))
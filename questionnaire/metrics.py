@@ -0,0 +1,80 @@
+"""
+Prometheus metrics behind /api/metrics/.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR is set (see gunicorn.conf.py) and
+every worker writes its samples to memory-mapped files there; a scrape of
+any worker aggregates all of them. Without it (runserver, management
+commands) the process-local default registry is used.
+"""
+import os
+import threading
+
+from django.conf import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    'awfm_request_duration_seconds', 'Time spent handling a request, by view.',
+    ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter('awfm_requests_total', 'Requests handled, by view and status code.', ['view', 'method', 'status'])
+DB_QUERIES = Counter('awfm_db_queries_total', 'Database queries run while handling requests.', ['view'])
+DB_QUERY_SECONDS = Counter('awfm_db_query_seconds_total', 'Time spent in database queries.', ['view'])
+CACHE_REQUESTS = Counter('awfm_cache_requests_total', 'Lookups in application caches.', ['cache', 'result'])
+AI_TOKENS = Counter('awfm_ai_tokens_total', 'Tokens used by AI interactions.', ['model', 'interaction_type'])
+AUDIT_EVENTS = Counter('awfm_audit_events_total', 'Audit events by outcome (buffered, flushed, dropped).', ['result'])
+
+
+def observe_cache(name, hit):
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def record_ai_tokens(sender, instance, created=False, raw=False, **kwargs):
+    """Count tokens of newly stored AI interactions (connected in signals)."""
+    if created and not raw and instance.tokens_used:
+        AI_TOKENS.labels(instance.model_used, instance.interaction_type).inc(instance.tokens_used)
+
+
+class CeleryQueueCollector:
+    """Reports the length of each Celery queue in the Redis broker at scrape time."""
+
+    _client = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def client(cls):
+        with cls._lock:
+            if cls._client is None:
+                import redis
+
+                cls._client = redis.Redis.from_url(
+                    settings.METRICS['CELERY_BROKER_URL'], socket_timeout=0.5, socket_connect_timeout=0.5,
+                )
+            return cls._client
+
+    def collect(self):
+        if not settings.METRICS['CELERY_BROKER_URL']:
+            return
+        gauge = GaugeMetricFamily('awfm_celery_queue_length', 'Tasks waiting in each Celery queue.', labels=['queue'])
+        try:
+            client = self.client()
+            for queue in settings.METRICS['CELERY_QUEUES']:
+                gauge.add_metric([queue], client.llen(queue))
+        except Exception:
+            # A broker outage should not break the scrape; /api/ready/ reports it instead.
+            return
+        yield gauge
+
+
+def render_metrics():
+    """Return (body, content type) for a scrape."""
+    registry = CollectorRegistry()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(CeleryQueueCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,180 @@
+"""Middleware for the AWFM API."""
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli is in requirements.txt
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+
+
+def is_json(response):
+    """True for application/json and +json (e.g. application/problem+json) responses."""
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type == 'application/json' or content_type.endswith('+json')
+
+
+class APICompressionMiddleware(GZipMiddleware):
+    """
+    Compress API responses above API_COMPRESSION_MIN_SIZE bytes.
+
+    Uses Brotli when the client accepts it (buffered JSON responses only)
+    and gzip otherwise. Non-API paths are left alone: static files are
+    already pre-compressed by WhiteNoise, and HTML pages carry CSRF tokens.
+    API HTML (the browsable API, which also embeds the CSRF token) goes to
+    Django's gzip, whose random filename padding mitigates BREACH.
+    """
+
+    def process_response(self, request, response):
+        if not request.path.startswith(settings.API_COMPRESSION_PREFIX):
+            return response
+        if not response.streaming and len(response.content) < settings.API_COMPRESSION_MIN_SIZE:
+            return response
+        if response.has_header('Content-Encoding') or response.get('Content-Type', '').startswith('image/'):
+            return response  # Already compressed
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (brotli is None or response.streaming or not is_json(response)
+                or not re_accepts_br.search(accept_encoding)):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # Low quality levels keep CPU cost close to gzip for dynamic content.
+        compressed = brotli.compress(response.content, mode=brotli.MODE_TEXT, quality=settings.API_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+def request_queue_seconds(request):
+    """
+    Time the request waited before reaching Django, from the router's
+    X-Request-Start header (seconds, milliseconds or microseconds; "t=" prefix allowed).
+    """
+    header = request.META.get('HTTP_X_REQUEST_START', '')
+    try:
+        started = float(header.removeprefix('t='))
+    except ValueError:
+        return 0.0
+    while started > 1e11:  # Scale ms/us timestamps down to seconds
+        started /= 1000
+    return max(0.0, time.time() - started)
+
+
+class LoadSheddingMiddleware(MiddlewareMixin):
+    """
+    Reject low-priority requests with 503 while this worker is overloaded.
+
+    A worker counts as overloaded when requests queue in front of it longer
+    than LOAD_SHEDDING['MAX_QUEUE_SECONDS'], or when its moving-average
+    latency exceeds LOAD_SHEDDING['MAX_LATENCY_SECONDS']. Low priority means
+    a view whose throttle_scope is in LOW_PRIORITY_SCOPES (AI by default) or
+    a path under LOW_PRIORITY_PREFIXES.
+    """
+    smoothing = 0.1
+    # Shed requests are not measured, so the average also halves every
+    # `half_life` seconds; otherwise one slow spell could shed them forever.
+    half_life = 10.0
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.config = settings.LOAD_SHEDDING
+        self.latency = 0.0
+        self.measured_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def current_latency(self, now=None):
+        now = time.monotonic() if now is None else now
+        return self.latency * 0.5 ** (max(0.0, now - self.measured_at) / self.half_life)
+
+    def overloaded(self, request):
+        return (request_queue_seconds(request) > self.config['MAX_QUEUE_SECONDS']
+                or self.current_latency() > self.config['MAX_LATENCY_SECONDS'])
+
+    def is_low_priority(self, request, view_func):
+        scope = getattr(getattr(view_func, 'cls', None), 'throttle_scope', None)
+        if scope in self.config['LOW_PRIORITY_SCOPES']:
+            return True
+        return request.path.startswith(tuple(self.config['LOW_PRIORITY_PREFIXES']))
+
+    def process_request(self, request):
+        request._shedding_started = time.monotonic()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.config['ENABLED']:
+            return None
+        if self.is_low_priority(request, view_func) and self.overloaded(request):
+            response = JsonResponse({'detail': 'Server is busy, please retry shortly.'}, status=503)
+            response['Retry-After'] = str(self.config['RETRY_AFTER'])
+            return response
+        return None
+
+    def process_response(self, request, response):
+        started = getattr(request, '_shedding_started', None)
+        if started is not None and response.status_code != 503:
+            now = time.monotonic()
+            with self.lock:
+                latency = self.current_latency(now)
+                self.latency = latency + self.smoothing * (now - started - latency)
+                self.measured_at = now
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status and database work per view for /api/metrics/.
+
+    Views are labelled by URL name, so label values stay bounded however
+    many distinct paths are requested.
+    """
+    methods = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = {'count': 0, 'seconds': 0.0}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries['count'] += 1
+                queries['seconds'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match and match.view_name else 'unresolved'
+        method = request.method if request.method in self.methods else 'other'
+        metrics.REQUEST_LATENCY.labels(view, method).observe(elapsed)
+        metrics.REQUESTS.labels(view, method, str(response.status_code)).inc()
+        if queries['count']:
+            metrics.DB_QUERIES.labels(view).inc(queries['count'])
+            metrics.DB_QUERY_SECONDS.labels(view).inc(queries['seconds'])
+        return response
@@ -0,0 +1,131 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Rename the 0001_initial models to Legacy* in the migration state only.
+
+    Their tables keep their names (db_table) so the legacy API keeps reading
+    and writing them while questionnaire.backfill copies responses to the
+    new schema; nothing is renamed or rewritten in the database.
+    """
+
+    dependencies = [
+        ('questionnaire', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(name='Response'),
+                migrations.DeleteModel(name='Choice'),
+                migrations.DeleteModel(name='Question'),
+                migrations.DeleteModel(name='TeamMember'),
+                migrations.DeleteModel(name='MainScreenQuestion'),
+                migrations.CreateModel(
+                    name='LegacyMainScreenQuestion',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('title', models.CharField(max_length=500)),
+                        ('subtitle', models.CharField(max_length=200)),
+                        ('section_label', models.CharField(max_length=200)),
+                    ],
+                    options={
+                        'verbose_name': 'Main Screen Question',
+                        'verbose_name_plural': 'Main Screen Question',
+                        'db_table': 'questionnaire_mainscreenquestion',
+                    },
+                ),
+                migrations.CreateModel(
+                    name='LegacyQuestion',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('key', models.CharField(max_length=10, unique=True)),
+                        ('title', models.CharField(max_length=500)),
+                        ('subtitle', models.CharField(max_length=200)),
+                        ('checkpoint_label', models.CharField(max_length=200)),
+                        ('instruction', models.TextField(blank=True)),
+                        ('order', models.PositiveIntegerField(default=0)),
+                    ],
+                    options={
+                        'ordering': ['order'],
+                        'db_table': 'questionnaire_question',
+                    },
+                ),
+                migrations.CreateModel(
+                    name='LegacyTeamMember',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('name', models.CharField(max_length=200)),
+                        ('avatar', models.URLField(blank=True)),
+                        ('affirmed', models.BooleanField(default=False)),
+                        ('order', models.PositiveIntegerField(default=0)),
+                    ],
+                    options={
+                        'ordering': ['order'],
+                        'db_table': 'questionnaire_teammember',
+                    },
+                ),
+                migrations.CreateModel(
+                    name='LegacyChoice',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('choice_id', models.CharField(max_length=20)),
+                        ('title', models.CharField(max_length=500)),
+                        ('subtitle', models.CharField(max_length=500)),
+                        ('image', models.URLField(blank=True)),
+                        ('description', models.TextField()),
+                        ('why_this_matters', models.TextField(blank=True)),
+                        ('research_evidence', models.TextField(blank=True)),
+                        ('decision_impact', models.TextField(blank=True)),
+                        ('what_you_are_fighting_for', models.TextField(blank=True)),
+                        ('cooperative_learning', models.TextField(blank=True)),
+                        ('barriers_to_access', models.TextField(blank=True)),
+                        ('care_team_affirmation', models.TextField(blank=True)),
+                        ('interdependency_at_work', models.TextField(blank=True)),
+                        ('reflection_guidance', models.TextField(blank=True)),
+                        ('order', models.PositiveIntegerField(default=0)),
+                        ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='choices', to='questionnaire.legacyquestion')),
+                    ],
+                    options={
+                        'ordering': ['order'],
+                        'unique_together': {('question', 'choice_id')},
+                        'db_table': 'questionnaire_choice',
+                    },
+                ),
+                migrations.CreateModel(
+                    name='LegacyResponse',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('user_id', models.CharField(max_length=100)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='questionnaire.legacyquestion')),
+                    ],
+                    options={
+                        'ordering': ['-created_at'],
+                        'unique_together': {('user_id', 'question')},
+                        'db_table': 'questionnaire_response',
+                    },
+                ),
+                migrations.CreateModel(
+                    name='LegacyResponseChoice',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('response', models.ForeignKey(db_column='response_id', on_delete=django.db.models.deletion.CASCADE, to='questionnaire.legacyresponse')),
+                        ('choice', models.ForeignKey(db_column='choice_id', on_delete=django.db.models.deletion.CASCADE, to='questionnaire.legacychoice')),
+                    ],
+                    options={
+                        'unique_together': {('response', 'choice')},
+                        'db_table': 'questionnaire_response_selected_choices',
+                    },
+                ),
+                migrations.AddField(
+                    model_name='legacyresponse',
+                    name='selected_choices',
+                    field=models.ManyToManyField(blank=True, through='questionnaire.LegacyResponseChoice', to='questionnaire.legacychoice'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,283 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:51
+
+import cloudinary.models
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('questionnaire', '0002_legacy_models'),
+    ]
+    # AUTH_USER_MODEL is questionnaire.User, which admin's LogEntry refers to.
+    run_before = [
+        ('admin', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Checkpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkpoint_number', models.PositiveIntegerField()),
+                ('checkpoint_type', models.CharField(choices=[('position', 'Your Position'), ('challenges', 'Your Challenges'), ('change', 'What Would Change Your Mind')], max_length=20)),
+                ('title', models.CharField(max_length=500)),
+                ('subtitle', models.CharField(blank=True, max_length=300)),
+                ('instruction', models.TextField(blank=True)),
+                ('order', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MainQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=20, unique=True)),
+                ('title', models.CharField(max_length=500)),
+                ('subtitle', models.CharField(blank=True, max_length=300)),
+                ('description', models.TextField(blank=True)),
+                ('order', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Main Question',
+                'verbose_name_plural': 'Main Questions',
+                'ordering': ['order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Section',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=20, unique=True)),
+                ('title', models.CharField(max_length=300)),
+                ('description', models.TextField(blank=True)),
+                ('order', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('avatar', models.URLField(blank=True)),
+                ('bio', models.TextField(blank=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CareTeam',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(default='My Care Team', max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='owned_care_team', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Choice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=30)),
+                ('title', models.CharField(max_length=500)),
+                ('subtitle', models.CharField(blank=True, max_length=500)),
+                ('image', models.URLField(blank=True)),
+                ('description', models.TextField(blank=True)),
+                ('why_this_matters', models.TextField(blank=True)),
+                ('research_evidence', models.TextField(blank=True)),
+                ('decision_impact', models.TextField(blank=True)),
+                ('what_you_are_fighting_for', models.TextField(blank=True)),
+                ('cooperative_learning', models.TextField(blank=True)),
+                ('barriers_to_access', models.TextField(blank=True)),
+                ('care_team_affirmation', models.TextField(blank=True)),
+                ('interdependency_at_work', models.TextField(blank=True)),
+                ('reflection_guidance', models.TextField(blank=True)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='choices', to='questionnaire.checkpoint')),
+            ],
+            options={
+                'db_table': 'questionnaire_checkpointchoice',
+                'ordering': ['order'],
+                'unique_together': {('checkpoint', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Explanation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('explanation_type', models.CharField(choices=[('video', 'Video'), ('audio', 'Audio'), ('text', 'Text')], max_length=10)),
+                ('text_content', models.TextField(blank=True)),
+                ('media_file', cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True, verbose_name='media')),
+                ('media_url', models.URLField(blank=True)),
+                ('thumbnail_url', models.URLField(blank=True)),
+                ('duration_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('description', models.CharField(blank=True, max_length=150)),
+                ('visibility', models.CharField(choices=[('private', 'Only Me'), ('care_team', 'Care Team'), ('public', 'Public')], default='care_team', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='explanations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to=settings.AUTH_USER_MODEL)),
+                ('explanation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='questionnaire.explanation')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AIInteraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interaction_type', models.CharField(choices=[('summarize', 'Summarize'), ('compare', 'Compare'), ('clarify', 'Clarify'), ('suggest', 'Suggest Questions'), ('themes', 'Extract Themes')], max_length=20)),
+                ('prompt', models.TextField()),
+                ('response', models.TextField()),
+                ('model_used', models.CharField(default='gpt-4', max_length=50)),
+                ('tokens_used', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_interactions', to=settings.AUTH_USER_MODEL)),
+                ('compared_explanations', models.ManyToManyField(blank=True, related_name='compared_in', to='questionnaire.explanation')),
+                ('explanation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ai_interactions', to='questionnaire.explanation')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='checkpoint',
+            name='main_question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='questionnaire.mainquestion'),
+        ),
+        migrations.CreateModel(
+            name='QuestionResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_complete', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('main_question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='questionnaire.mainquestion')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_responses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('user', 'main_question')},
+            },
+        ),
+        migrations.AddField(
+            model_name='explanation',
+            name='question_response',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='explanations', to='questionnaire.questionresponse'),
+        ),
+        migrations.AddField(
+            model_name='mainquestion',
+            name='section',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='questionnaire.section'),
+        ),
+        migrations.CreateModel(
+            name='TeamInvitation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('email', models.EmailField(max_length=254)),
+                ('token', models.CharField(max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('declined', 'Declined'), ('expired', 'Expired')], default='pending', max_length=20)),
+                ('message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('responded_at', models.DateTimeField(blank=True, null=True)),
+                ('care_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invitations', to='questionnaire.careteam')),
+                ('invited_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sent_invitations', to=settings.AUTH_USER_MODEL)),
+                ('invited_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_invitations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='checkpoint',
+            unique_together={('main_question', 'checkpoint_number')},
+        ),
+        migrations.CreateModel(
+            name='CheckpointResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='questionnaire.checkpoint')),
+                ('selected_choices', models.ManyToManyField(blank=True, to='questionnaire.choice')),
+                ('question_response', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_responses', to='questionnaire.questionresponse')),
+            ],
+            options={
+                'ordering': ['checkpoint__order'],
+                'unique_together': {('question_response', 'checkpoint')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reaction_type', models.CharField(choices=[('like', '👍'), ('love', '❤️'), ('support', '🤗'), ('insightful', '💡'), ('grateful', '🙏')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('explanation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='questionnaire.explanation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'explanation')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('member', 'Member'), ('viewer', 'Viewer')], default='member', max_length=20)),
+                ('has_affirmed', models.BooleanField(default=False)),
+                ('affirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('care_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='questionnaire.careteam')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('care_team', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0004_change_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aiinteraction',
+            index=models.Index(fields=['created_at'], name='aiinteraction_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkpointresponse',
+            index=models.Index(fields=['created_at'], name='checkpointresp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at'], name='comment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='explanation',
+            index=models.Index(fields=['created_at'], name='explanation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='questionresponse',
+            index=models.Index(fields=['created_at'], name='questionresponse_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['created_at'], name='reaction_created_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0007_backfill_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIInteractionArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('compared_explanation_ids', models.JSONField(blank=True, default=list)),
+                ('interaction_type', models.CharField(choices=[('summarize', 'Summarize'), ('compare', 'Compare'), ('clarify', 'Clarify'), ('suggest', 'Suggest Questions'), ('themes', 'Extract Themes')], max_length=20)),
+                ('payload', models.BinaryField()),
+                ('model_used', models.CharField(max_length=50)),
+                ('tokens_used', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AIUsageTotal',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ai_usage_total', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('interactions', models.PositiveIntegerField(default=0)),
+                ('tokens_used', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='aiinteraction',
+            index=models.Index(fields=['user', '-created_at'], name='aiinteraction_user_idx'),
+        ),
+        migrations.AddField(
+            model_name='aiinteractionarchive',
+            name='explanation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_ai_interactions', to='questionnaire.explanation'),
+        ),
+        migrations.AddField(
+            model_name='aiinteractionarchive',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_ai_interactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='aiinteractionarchive',
+            index=models.Index(fields=['user', '-created_at'], name='aiarchive_user_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0009_peer_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('digest', models.CharField(max_length=64)),
+                ('manifest', models.JSONField()),
+                ('sync_token', models.BigIntegerField()),
+                ('reason', models.CharField(choices=[('change', 'Plan changed'), ('affirmation', 'Affirmed')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', '-version'],
+                'unique_together': {('user', 'version')},
+            },
+        ),
+        migrations.AddField(
+            model_name='teammembership',
+            name='affirmed_snapshot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='affirmations', to='questionnaire.plansnapshot'),
+        ),
+        migrations.CreateModel(
+            name='PlanBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_blobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'digest')},
+            },
+        ),
+    ]
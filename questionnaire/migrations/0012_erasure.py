@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0011_autosave_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErasureRequest',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.UUIDField(db_index=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Deleting rows'), ('media', 'Deleting media'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('deleted', models.JSONField(default=dict)),
+                ('report', models.JSONField(blank=True, null=True)),
+                ('report_digest', models.CharField(blank=True, max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MediaDeletion',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('resource', models.CharField(max_length=500)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('erasure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media', to='questionnaire.erasurerequest')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['erasure'], name='mediadeletion_pending_idx')],
+                'unique_together': {('erasure', 'resource')},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+AUDIT_TABLE = 'questionnaire_auditevent'
+
+
+def partition_audit_table(apps, schema_editor):
+    """
+    On PostgreSQL, recreate the (empty) audit table partitioned by month of
+    occurred_at, with a default partition so inserts never fail, and refuse
+    UPDATE and DELETE on it (row triggers on partitioned tables need PostgreSQL 13+).
+    Monthly partitions are added by audit.ensure_partitions().
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    AuditEvent = apps.get_model('questionnaire', 'AuditEvent')
+    schema_editor.execute(f'ALTER TABLE {AUDIT_TABLE} RENAME TO {AUDIT_TABLE}_plain')
+    schema_editor.execute(
+        f'CREATE TABLE {AUDIT_TABLE} (LIKE {AUDIT_TABLE}_plain INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        'PARTITION BY RANGE (occurred_at)'
+    )
+    # The partition key must be part of the primary key.
+    schema_editor.execute(f'ALTER TABLE {AUDIT_TABLE} ADD PRIMARY KEY (id, occurred_at)')
+    schema_editor.execute(f'DROP TABLE {AUDIT_TABLE}_plain')
+    for index in AuditEvent._meta.indexes:
+        schema_editor.add_index(AuditEvent, index)
+    schema_editor.execute(f'CREATE TABLE {AUDIT_TABLE}_default PARTITION OF {AUDIT_TABLE} DEFAULT')
+    schema_editor.execute(
+        "CREATE FUNCTION questionnaire_audit_append_only() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN RAISE EXCEPTION 'audit events are append-only'; END $$"
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER audit_append_only BEFORE UPDATE OR DELETE ON {AUDIT_TABLE} '
+        'FOR EACH ROW EXECUTE FUNCTION questionnaire_audit_append_only()'
+    )
+
+
+def unpartition_audit_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # Reversing CreateModel then drops the partitioned table with its partitions.
+        schema_editor.execute('DROP FUNCTION questionnaire_audit_append_only() CASCADE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0012_erasure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditChain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('last_hash', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('occurred_at', models.DateTimeField()),
+                ('actor', models.UUIDField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('phi_viewed', 'Viewed health data'), ('phi_created', 'Created health data'), ('phi_updated', 'Updated health data'), ('phi_deleted', 'Deleted health data'), ('phi_exported', 'Exported health data'), ('explanation_viewed', 'Viewed an explanation')], max_length=20)),
+                ('object_type', models.CharField(max_length=30)),
+                ('object_id', models.CharField(max_length=64)),
+                ('owner', models.UUIDField(blank=True, null=True)),
+                ('ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('event_id', models.UUIDField()),
+                ('hash', models.CharField(max_length=64)),
+                ('written_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'occurred_at'], name='auditevent_owner_idx'), models.Index(fields=['actor', 'occurred_at'], name='auditevent_actor_idx'), models.Index(fields=['event_id'], name='auditevent_event_idx')],
+            },
+        ),
+        migrations.RunPython(partition_audit_table, unpartition_audit_table),
+    ]
@@ -0,0 +1,155 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 10000
+KEYED_TABLES = ('questionnaire_checkpointresponse', 'questionnaire_checkpointresponse_selected_choices')
+
+
+class AlterUniqueTogetherOnline(migrations.AlterUniqueTogether):
+    """
+    On PostgreSQL, build the new unique index CONCURRENTLY and attach it as
+    the constraint, then drop the old one, instead of an ADD CONSTRAINT that
+    locks the table for the whole index build.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        old_model = from_state.apps.get_model(app_label, self.name)
+        new_model = to_state.apps.get_model(app_label, self.name)
+        table = new_model._meta.db_table
+        quote = schema_editor.quote_name
+
+        def columns(model, fields):
+            return [model._meta.get_field(field).column for field in fields]
+
+        old = {tuple(fields) for fields in old_model._meta.unique_together}
+        new = {tuple(fields) for fields in new_model._meta.unique_together}
+        for fields in new - old:
+            cols = columns(new_model, fields)
+            name = schema_editor._create_index_name(table, cols, suffix='_uniq')
+            schema_editor.execute(
+                f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} '
+                f'ON {quote(table)} ({", ".join(quote(col) for col in cols)})'
+            )
+            schema_editor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} UNIQUE USING INDEX {quote(name)}')
+        for fields in old - new:
+            for name in schema_editor._constraint_names(old_model, columns(old_model, fields), unique=True, primary_key=False):
+                schema_editor.execute(f'ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(name)}')
+
+
+def _copy_keys(model, user_id):
+    """Set user_id in pk ranges of BATCH_SIZE rows; each UPDATE commits on its own (non-atomic migration)."""
+    last_id = 0
+    while True:
+        ids = list(model.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        model.objects.filter(pk__gte=ids[0], pk__lte=ids[-1], user__isnull=True).update(user_id=user_id)
+        last_id = ids[-1]
+
+
+def copy_partition_keys(apps, schema_editor):
+    QuestionResponse = apps.get_model('questionnaire', 'QuestionResponse')
+    CheckpointResponse = apps.get_model('questionnaire', 'CheckpointResponse')
+    SelectedChoice = apps.get_model('questionnaire', 'SelectedChoice')
+    _copy_keys(CheckpointResponse, Subquery(
+        QuestionResponse.objects.filter(pk=OuterRef('question_response_id')).values('user_id')[:1]
+    ))
+    _copy_keys(SelectedChoice, Subquery(
+        CheckpointResponse.objects.filter(pk=OuterRef('checkpointresponse_id')).values('user_id')[:1]
+    ))
+
+
+def check_not_null(apps, schema_editor):
+    """
+    On PostgreSQL, prove user_id NOT NULL with a validated CHECK first: the
+    validation scans without blocking writes, and SET NOT NULL then skips its
+    own scan under the exclusive lock.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in KEYED_TABLES:
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table[:40]}_user_nn CHECK (user_id IS NOT NULL) NOT VALID')
+        schema_editor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table[:40]}_user_nn')
+
+
+def drop_not_null_checks(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in KEYED_TABLES:
+        schema_editor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table[:40]}_user_nn')
+
+
+class Migration(migrations.Migration):
+    """
+    Give CheckpointResponse and its selected_choices table a user_id, the key
+    partition_responses hash-partitions them by. The auto-created M2M table
+    becomes the SelectedChoice model without touching the table. Existing
+    rows are filled in batches outside a single transaction.
+    """
+    atomic = False
+
+    dependencies = [
+        ('questionnaire', '0014_image_asset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='SelectedChoice',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('checkpointresponse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questionnaire.checkpointresponse')),
+                        ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questionnaire.choice')),
+                    ],
+                    options={
+                        'db_table': 'questionnaire_checkpointresponse_selected_choices',
+                        'unique_together': {('checkpointresponse', 'choice')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='checkpointresponse',
+                    name='selected_choices',
+                    field=models.ManyToManyField(blank=True, through='questionnaire.SelectedChoice', to='questionnaire.choice'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='checkpointresponse',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_responses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='selectedchoice',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(copy_partition_keys, migrations.RunPython.noop),
+        migrations.RunPython(check_not_null, drop_not_null_checks),
+        migrations.AlterField(
+            model_name='checkpointresponse',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_responses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='selectedchoice',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(drop_not_null_checks, check_not_null),
+        AlterUniqueTogetherOnline(
+            name='checkpointresponse',
+            unique_together={('user', 'question_response', 'checkpoint')},
+        ),
+        AlterUniqueTogetherOnline(
+            name='selectedchoice',
+            unique_together={('user', 'checkpointresponse', 'choice')},
+        ),
+    ]
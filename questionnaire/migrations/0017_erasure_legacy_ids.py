@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:23
+
+import uuid
+
+from django.db import migrations, models
+
+LEGACY_USER_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'awfm:legacy-user')
+
+
+def rename_placeholder_users(apps, schema_editor):
+    """legacy:<uuid5 hex> becomes legacy:<client id>, so erasure can find a placeholder's legacy rows."""
+    User = apps.get_model('questionnaire', 'User')
+    LegacyResponse = apps.get_model('questionnaire', 'LegacyResponse')
+    for legacy_id in LegacyResponse.objects.values_list('user_id', flat=True).distinct().iterator():
+        try:
+            uuid.UUID(legacy_id)
+            continue
+        except ValueError:
+            user_id = uuid.uuid5(LEGACY_USER_NAMESPACE, legacy_id)
+        User.objects.filter(pk=user_id, username=f'legacy:{user_id.hex}').update(username=f'legacy:{legacy_id}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0016_notification_digest_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='erasurerequest',
+            name='legacy_user_ids',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(rename_placeholder_users, migrations.RunPython.noop),
+    ]
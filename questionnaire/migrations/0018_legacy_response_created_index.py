@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0017_erasure_legacy_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='legacyresponse',
+            index=models.Index(fields=['created_at'], name='legacyresponse_created_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 """Models for the AWFM Questionnaire application."""
 import uuid
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from cloudinary.models import CloudinaryField
@@ -120,6 +121,7 @@ class Choice(models.Model):
     class Meta:
         ordering = ['order']
         unique_together = ['checkpoint', 'key']
+        db_table = 'questionnaire_checkpointchoice'  # questionnaire_choice still holds LegacyChoice
 
     def __str__(self):
         return f"{self.checkpoint} - {self.title[:30]}"
@@ -140,6 +142,7 @@ class QuestionResponse(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'main_question']
+        indexes = [models.Index(fields=['created_at'], name='questionresponse_created_idx')]
 
     def __str__(self):
         return f"{self.user.email} - {self.main_question.key}"
@@ -148,18 +151,63 @@ class QuestionResponse(models.Model):
 class CheckpointResponse(models.Model):
     """User's selected choices for a specific checkpoint."""
     question_response = models.ForeignKey(QuestionResponse, on_delete=models.CASCADE, related_name='checkpoint_responses')
+    # Copy of question_response.user: the partition key (see partition_responses). Indexed by unique_together.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkpoint_responses', db_index=False)
     checkpoint = models.ForeignKey(Checkpoint, on_delete=models.CASCADE, related_name='responses')
-    selected_choices = models.ManyToManyField(Choice, blank=True)
+    selected_choices = models.ManyToManyField(Choice, blank=True, through='SelectedChoice')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['checkpoint__order']
-        unique_together = ['question_response', 'checkpoint']
+        unique_together = ['user', 'question_response', 'checkpoint']
+        indexes = [models.Index(fields=['created_at'], name='checkpointresp_created_idx')]
 
     def __str__(self):
         return f"{self.question_response.user.email} - {self.checkpoint}"
 
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.question_response_id is not None:
+            self.user_id = self.question_response.user_id
+        super().save(*args, **kwargs)
+
+
+class SelectedChoice(models.Model):
+    """
+    A choice selected in a CheckpointResponse (the selected_choices table).
+    Adding through the manager needs the user: add(choice, through_defaults={'user': user}).
+    """
+    checkpointresponse = models.ForeignKey(CheckpointResponse, on_delete=models.CASCADE)
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    # Copy of checkpointresponse.user: the partition key (see partition_responses). Indexed by unique_together.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        db_table = 'questionnaire_checkpointresponse_selected_choices'
+        unique_together = ['user', 'checkpointresponse', 'choice']
+
+    def __str__(self):
+        return f"{self.checkpointresponse_id} -> {self.choice_id}"
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.checkpointresponse_id is not None:
+            self.user_id = self.checkpointresponse.user_id
+        super().save(*args, **kwargs)
+
+
+class AutosaveCursor(models.Model):
+    """Highest client sequence number applied through /api/responses/ops/, per user and client."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='autosave_cursors')
+    client = models.CharField(max_length=64)  # Client-generated install/session id
+    last_seq = models.BigIntegerField(default=-1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'client']
+
+    def __str__(self):
+        return f"{self.user_id}/{self.client} @ {self.last_seq}"
+
 
 class Explanation(models.Model):
     """
@@ -200,10 +248,23 @@ class Explanation(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'], name='explanation_created_idx')]
 
     def __str__(self):
         return f"{self.user.email} - {self.explanation_type} for {self.question_response.main_question.key}"
 
+    def clean(self):
+        # Once the response tables are partitioned, the foreign key to the
+        # response is (question_response_id, user_id) and rejects a mismatch.
+        if (self.user_id is not None and self.question_response_id is not None
+                and self.question_response.user_id != self.user_id):
+            raise ValidationError({'question_response': 'This response belongs to another user.'})
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.question_response_id is not None:
+            self.user_id = self.question_response.user_id
+        super().save(*args, **kwargs)
+
 
 # =============================================================================
 # CARE TEAM
@@ -235,6 +296,10 @@ class TeamMembership(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='member')
     has_affirmed = models.BooleanField(default=False)  # Affirmed the care plan
     affirmed_at = models.DateTimeField(null=True, blank=True)
+    # The plan version affirmed (set by questionnaire.snapshots)
+    affirmed_snapshot = models.ForeignKey(
+        'PlanSnapshot', on_delete=models.SET_NULL, null=True, blank=True, related_name='affirmations',
+    )
     joined_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -274,6 +339,50 @@ class TeamInvitation(models.Model):
         return f"Invitation to {self.email} for {self.care_team}"
 
 
+# =============================================================================
+# PLAN SNAPSHOTS
+# =============================================================================
+
+class PlanBlob(models.Model):
+    """
+    Canonical JSON of one answered question of a user's plan, stored once per
+    distinct content and shared by every snapshot it appears in. Never updated.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='plan_blobs')
+    digest = models.CharField(max_length=64)  # SHA-256 of data
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'digest']
+
+    def __str__(self):
+        return f"{self.user_id}:{self.digest[:12]}"
+
+
+class PlanSnapshot(models.Model):
+    """An immutable version of a user's care plan: a manifest of question key -> PlanBlob digest."""
+    REASON_CHOICES = [
+        ('change', 'Plan changed'),
+        ('affirmation', 'Affirmed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='plan_snapshots')
+    version = models.PositiveIntegerField()
+    digest = models.CharField(max_length=64)  # SHA-256 of the canonical manifest
+    manifest = models.JSONField()
+    sync_token = models.BigIntegerField()  # Change log position the plan was read at
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['user', '-version']
+        unique_together = ['user', 'version']
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
 # =============================================================================
 # SOCIAL INTERACTIONS
 # =============================================================================
@@ -295,6 +404,7 @@ class Reaction(models.Model):
 
     class Meta:
         unique_together = ['user', 'explanation']  # One reaction per user per explanation
+        indexes = [models.Index(fields=['created_at'], name='reaction_created_idx')]
 
     def __str__(self):
         return f"{self.user.email} - {self.reaction_type} on {self.explanation.id}"
@@ -310,6 +420,7 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['created_at'], name='comment_created_idx')]
 
     def __str__(self):
         return f"{self.user.email} comment on {self.explanation.id}"
@@ -346,15 +457,469 @@ class AIInteraction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='aiinteraction_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='aiinteraction_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.interaction_type} by {self.user.email}"
 
 
+class AIInteractionArchive(models.Model):
+    """
+    An AIInteraction older than the hot window (moved by questionnaire.retention).
+    Prompt and response are stored zlib-compressed; rows keep their original id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_ai_interactions')
+    explanation = models.ForeignKey(
+        Explanation, on_delete=models.CASCADE, related_name='archived_ai_interactions', null=True, blank=True,
+    )
+    compared_explanation_ids = models.JSONField(default=list, blank=True)
+    interaction_type = models.CharField(max_length=20, choices=AIInteraction.INTERACTION_TYPES)
+    payload = models.BinaryField()  # zlib-compressed JSON: {"prompt": ..., "response": ...}
+    model_used = models.CharField(max_length=50)
+    tokens_used = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', '-created_at'], name='aiarchive_user_idx')]
+
+    def __str__(self):
+        return f"{self.interaction_type} by {self.user_id} (archived)"
+
+
+class AIUsageTotal(models.Model):
+    """Per-user totals of archived AI interactions, so usage sums only scan the hot table."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='ai_usage_total')
+    interactions = models.PositiveIntegerField(default=0)
+    tokens_used = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.tokens_used} tokens archived"
+
+
+# =============================================================================
+# SYNC
+# =============================================================================
+
+class ChangeLogEntry(models.Model):
+    """
+    Append-only log of row changes used by the delta-sync API.
+
+    The auto-increment id is the sync token. Content rows are logged with no
+    audience; user data is logged once per user who should receive it.
+    """
+    ACTION_CHOICES = [
+        ('upsert', 'Created or Updated'),
+        ('delete', 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    audience = models.UUIDField(null=True, blank=True)  # User id, not a FK so tombstones outlive the user
+    model = models.CharField(max_length=50)  # Sync collection name, e.g. 'choices'
+    object_id = models.CharField(max_length=64)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['audience', 'id'], name='changelog_audience_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model}:{self.object_id}"
+
+
+# =============================================================================
+# NOTIFICATIONS
+# =============================================================================
+
+class NotificationPreference(models.Model):
+    """How often a user wants care-team digests, and about what. Users without a row get the defaults."""
+    FREQUENCY_CHOICES = [
+        ('hourly', 'Hourly'),
+        ('daily', 'Daily'),
+        ('off', 'Off'),
+    ]
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_preference')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='hourly')
+    explanations = models.BooleanField(default=True)  # Teammate shared an explanation
+    affirmations = models.BooleanField(default=True)  # Teammate affirmed the care plan
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.email}: {self.frequency}"
+
+
+class NotificationEvent(models.Model):
+    """
+    One care-team event waiting to be fanned out to recipients.
+
+    Written once per event in the request path; recipients are worked out
+    later by the notification tasks.
+    """
+    KIND_CHOICES = [
+        ('explanation', 'Explanation shared'),
+        ('affirmation', 'Plan affirmed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    care_team = models.ForeignKey(CareTeam, on_delete=models.CASCADE, related_name='notification_events')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    object_id = models.CharField(max_length=64)
+    fanned_out = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(fanned_out=False), name='notifevent_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} in {self.care_team_id}"
+
+
+class NotificationDigest(models.Model):
+    """One email summarising a recipient's notifications over their window."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_digests')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    event_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)  # When a worker took it for sending
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Digest #{self.id} for {self.recipient_id} ({self.status})"
+
+
+class Notification(models.Model):
+    """A recipient's copy of an event, until it has been sent in a digest."""
+    id = models.BigAutoField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    event = models.ForeignKey(NotificationEvent, on_delete=models.CASCADE, related_name='notifications')
+    digest = models.ForeignKey(NotificationDigest, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['recipient', 'event']  # Fan-out can safely run twice
+        indexes = [
+            models.Index(fields=['digest', 'recipient'], name='notification_digest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} for {self.recipient_id}"
+
+
+# =============================================================================
+# PEER SIMILARITY
+# =============================================================================
+
+class UserChoiceVector(models.Model):
+    """A user's selected choices as a bit set (bit n = Choice id n), kept by questionnaire.similarity."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='choice_vector')
+    bits = models.BinaryField(default=bytes)  # numpy.packbits, big-endian bit order
+    choice_count = models.PositiveIntegerField(default=0)
+    dirty = models.BooleanField(default=True)  # Answers changed since the vector and neighbors were computed
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user'], condition=models.Q(dirty=True), name='choicevector_dirty_idx')]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.choice_count} choices"
+
+
+class PeerNeighbor(models.Model):
+    """One of a user's most similar peers among users with public explanations."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='peer_neighbors')
+    neighbor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['user', 'rank']
+        unique_together = ['user', 'rank']
+
+    def __str__(self):
+        return f"{self.user_id} ~ {self.neighbor_id} ({self.score:.2f})"
+
+
+# =============================================================================
+# BACKFILL
+# =============================================================================
+
+class BackfillCheckpoint(models.Model):
+    """Progress of a questionnaire.backfill job, advanced in the same transaction as each chunk."""
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)  # Highest source pk copied
+    rows_copied = models.PositiveBigIntegerField(default=0)
+    chunks = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)  # Last run that reached the end of the source
+    verified_at = models.DateTimeField(null=True, blank=True)
+    mismatches = models.PositiveIntegerField(null=True, blank=True)  # Found by the last verification
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+# =============================================================================
+# ERASURE
+# =============================================================================
+
+class ErasureRequest(models.Model):
+    """
+    A request to erase all of a user's data, carried out by questionnaire.erasure.
+
+    Kept after the user is gone as the record that the request was honored:
+    user_id is not a foreign key, and the report lists rows deleted per table.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Deleting rows'),
+        ('media', 'Deleting media'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user_id = models.UUIDField(db_index=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    deleted = models.JSONField(default=dict)  # {"app_label.Model": rows deleted}, kept across resumed runs
+    legacy_user_ids = models.JSONField(default=list)  # LegacyResponse.user_id values of the user, found before it is deleted
+    report = models.JSONField(null=True, blank=True)  # Written once everything, media included, is gone
+    report_digest = models.CharField(max_length=64, blank=True)  # SHA-256 of the canonical report
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Erasure #{self.id} of {self.user_id} ({self.status})"
+
+
+class MediaDeletion(models.Model):
+    """A stored media file of an erased user, deleted from storage after its rows are gone."""
+    id = models.BigAutoField(primary_key=True)
+    erasure = models.ForeignKey(ErasureRequest, on_delete=models.CASCADE, related_name='media')
+    resource = models.CharField(max_length=500)  # CloudinaryField value or media URL
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)  # Also set for URLs outside our storage
+
+    class Meta:
+        unique_together = ['erasure', 'resource']
+        indexes = [models.Index(fields=['erasure'], condition=models.Q(deleted_at__isnull=True),
+                                name='mediadeletion_pending_idx')]
+
+    def __str__(self):
+        return f"{self.resource} ({'deleted' if self.deleted_at else 'pending'})"
+
+
+# =============================================================================
+# AUDIT
+# =============================================================================
+
+class AuditEvent(models.Model):
+    """
+    One read or write of health data, appended by questionnaire.audit.
+
+    Rows are never updated or deleted. On PostgreSQL the table is
+    partitioned by month of occurred_at (migration 0013) and refuses UPDATE
+    and DELETE. `id` is the position in the hash chain and `hash` is
+    SHA-256(previous hash + this event), so a changed, removed or inserted
+    row breaks every hash after it.
+    """
+    ACTION_CHOICES = [
+        ('phi_viewed', 'Viewed health data'),
+        ('phi_created', 'Created health data'),
+        ('phi_updated', 'Updated health data'),
+        ('phi_deleted', 'Deleted health data'),
+        ('phi_exported', 'Exported health data'),
+        ('explanation_viewed', 'Viewed an explanation'),
+    ]
+
+    id = models.BigIntegerField(primary_key=True)  # Chain position, assigned by questionnaire.audit
+    occurred_at = models.DateTimeField()
+    actor = models.UUIDField(null=True, blank=True)  # User id, not a FK: events outlive erased users
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    object_type = models.CharField(max_length=30)  # e.g. 'explanation', 'plan'
+    object_id = models.CharField(max_length=64)
+    owner = models.UUIDField(null=True, blank=True)  # Whose health data it is
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    event_id = models.UUIDField()  # Set when recorded; makes redelivered events detectable
+    hash = models.CharField(max_length=64)
+    written_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'occurred_at'], name='auditevent_owner_idx'),
+            models.Index(fields=['actor', 'occurred_at'], name='auditevent_actor_idx'),
+            models.Index(fields=['event_id'], name='auditevent_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.actor} {self.action} {self.object_type}:{self.object_id}"
+
+
+class AuditChain(models.Model):
+    """The head of the audit hash chain (a single row), locked while events are appended."""
+    last_id = models.BigIntegerField(default=0)
+    last_hash = models.CharField(max_length=64, default='0' * 64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"#{self.last_id} {self.last_hash[:12]}"
+
+
+# =============================================================================
+# IMAGES
+# =============================================================================
+
+class ImageAsset(models.Model):
+    """
+    A content image URL (Choice.image), fetched once into the `images`
+    storage and re-encoded at several widths by questionnaire.images.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    source_url = models.URLField(max_length=1000, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    source_name = models.CharField(max_length=255, blank=True)  # Stored original; later runs never refetch
+    source_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the original
+    # Names the variant set: original plus encoding settings, so variant URLs never change content
+    digest = models.CharField(max_length=12, blank=True, db_index=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=list)  # [{"format": "webp", "width": 320, "name": stored name, "bytes": n}]
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['id'], condition=models.Q(status='pending'), name='imageasset_pending_idx')]
+
+    def __str__(self):
+        return f"{self.source_url} ({self.status})"
+
+
 # =============================================================================
 # LEGACY SUPPORT (for existing frontend compatibility)
 # =============================================================================
 
+# Tables created by 0001_initial, kept under their old names so the legacy
+# API keeps working while questionnaire.backfill copies responses across.
+
+class LegacyMainScreenQuestion(models.Model):
+    """Legacy single main-screen question."""
+    title = models.CharField(max_length=500)
+    subtitle = models.CharField(max_length=200)
+    section_label = models.CharField(max_length=200)
+
+    class Meta:
+        db_table = 'questionnaire_mainscreenquestion'
+        verbose_name = 'Main Screen Question'
+        verbose_name_plural = 'Main Screen Question'
+
+    def __str__(self):
+        return self.title
+
+
+class LegacyQuestion(models.Model):
+    """Legacy checkpoint question (q1, q2, q3) of the main-screen question."""
+    key = models.CharField(max_length=10, unique=True)
+    title = models.CharField(max_length=500)
+    subtitle = models.CharField(max_length=200)
+    checkpoint_label = models.CharField(max_length=200)
+    instruction = models.TextField(blank=True)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order']
+        db_table = 'questionnaire_question'
+
+    def __str__(self):
+        return self.key
+
+
+class LegacyChoice(models.Model):
+    """Legacy choice of a LegacyQuestion."""
+    question = models.ForeignKey(LegacyQuestion, on_delete=models.CASCADE, related_name='choices')
+    choice_id = models.CharField(max_length=20)
+    title = models.CharField(max_length=500)
+    subtitle = models.CharField(max_length=500)
+    image = models.URLField(blank=True)
+    description = models.TextField()
+    why_this_matters = models.TextField(blank=True)
+    research_evidence = models.TextField(blank=True)
+    decision_impact = models.TextField(blank=True)
+    what_you_are_fighting_for = models.TextField(blank=True)
+    cooperative_learning = models.TextField(blank=True)
+    barriers_to_access = models.TextField(blank=True)
+    care_team_affirmation = models.TextField(blank=True)
+    interdependency_at_work = models.TextField(blank=True)
+    reflection_guidance = models.TextField(blank=True)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order']
+        unique_together = ['question', 'choice_id']
+        db_table = 'questionnaire_choice'
+
+    def __str__(self):
+        return f"{self.question.key} - {self.choice_id}"
+
+
+class LegacyResponse(models.Model):
+    """Legacy anonymous response to one LegacyQuestion."""
+    user_id = models.CharField(max_length=100)  # Client-generated id, not a User
+    question = models.ForeignKey(LegacyQuestion, on_delete=models.CASCADE, related_name='responses')
+    selected_choices = models.ManyToManyField(LegacyChoice, blank=True, through='LegacyResponseChoice')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['user_id', 'question']
+        db_table = 'questionnaire_response'
+        indexes = [models.Index(fields=['created_at'], name='legacyresponse_created_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.question_id}"
+
+
+class LegacyResponseChoice(models.Model):
+    """The legacy response/choice join table, with its original column names."""
+    response = models.ForeignKey(LegacyResponse, on_delete=models.CASCADE, db_column='response_id')
+    choice = models.ForeignKey(LegacyChoice, on_delete=models.CASCADE, db_column='choice_id')
+
+    class Meta:
+        unique_together = ['response', 'choice']
+        db_table = 'questionnaire_response_selected_choices'
+
+
 class LegacyTeamMember(models.Model):
     """
     Legacy team member model for backward compatibility.
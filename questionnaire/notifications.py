@@ -0,0 +1,208 @@
+"""
+Care-team notification digests.
+
+The request path only records a NotificationEvent (a single INSERT). The
+process_notifications task then fans new events out into per-recipient
+Notification rows according to each recipient's preferences, closes a
+digest for every recipient whose oldest waiting notification is older than
+their window, and sends digests in batches over one email connection.
+
+Every step can be re-run safely: fan-out ignores rows that already exist,
+and digests are claimed in a short transaction (status 'sending'), sent
+outside it and marked sent one by one as they go out.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import (
+    CareTeam, TeamMembership, NotificationPreference, NotificationEvent, NotificationDigest, Notification,
+)
+
+# Preference field that enables each event kind.
+KIND_PREFERENCES = {
+    'explanation': 'explanations',
+    'affirmation': 'affirmations',
+}
+
+# Pending digests older than this, and digests claimed this long ago, were
+# lost by a worker and are sent again.
+STALLED_AFTER = timedelta(hours=1)
+SENT_DIGEST_RETENTION = timedelta(days=30)
+
+
+def _preference(preferences, user_id):
+    return preferences.get(user_id) or NotificationPreference(user_id=user_id)
+
+
+def enqueue(kind, care_team_id, actor_id, object_id):
+    NotificationEvent.objects.create(kind=kind, care_team_id=care_team_id, actor_id=actor_id, object_id=str(object_id))
+
+
+# =============================================================================
+# SIGNAL HANDLERS (connected in signals)
+# =============================================================================
+
+def notify_explanation(sender, instance, created=False, raw=False, **kwargs):
+    if not created or raw or instance.visibility == 'private':
+        return
+    care_team_id = CareTeam.objects.filter(owner_id=instance.user_id).values_list('id', flat=True).first()
+    if care_team_id:
+        enqueue('explanation', care_team_id, instance.user_id, instance.pk)
+
+
+def notify_affirmation(sender, instance, raw=False, **kwargs):
+    # _was_affirmed is set in pre_save by realtime.remember_affirmation.
+    if raw or not instance.has_affirmed or getattr(instance, '_was_affirmed', False):
+        return
+    enqueue('affirmation', instance.care_team_id, instance.user_id, instance.pk)
+
+
+# =============================================================================
+# PROCESSING (called from questionnaire.tasks)
+# =============================================================================
+
+def fan_out(limit=None):
+    """Create Notification rows for up to `limit` new events. Returns the number of events handled."""
+    limit = limit or settings.NOTIFICATIONS['FAN_OUT_LIMIT']
+    with transaction.atomic():
+        events = list(
+            NotificationEvent.objects.select_for_update(skip_locked=True)
+            .filter(fanned_out=False).order_by('id')[:limit]
+        )
+        if not events:
+            return 0
+
+        team_ids = {event.care_team_id for event in events}
+        members = defaultdict(set)
+        for team_id, user_id in TeamMembership.objects.filter(care_team_id__in=team_ids).values_list('care_team_id', 'user_id'):
+            members[team_id].add(user_id)
+        for team_id, owner_id in CareTeam.objects.filter(id__in=team_ids).values_list('id', 'owner_id'):
+            members[team_id].add(owner_id)
+        preferences = NotificationPreference.objects.in_bulk(set().union(*members.values()))
+
+        notifications = []
+        for event in events:
+            for user_id in members[event.care_team_id] - {event.actor_id}:
+                preference = _preference(preferences, user_id)
+                if preference.frequency != 'off' and getattr(preference, KIND_PREFERENCES[event.kind]):
+                    notifications.append(Notification(recipient_id=user_id, event=event))
+        Notification.objects.bulk_create(notifications, batch_size=1000, ignore_conflicts=True)
+        NotificationEvent.objects.filter(id__in=[event.id for event in events]).update(fanned_out=True)
+    return len(events)
+
+
+def collect_due(now=None):
+    """Close a digest for each recipient whose window has elapsed. Returns the new digest ids."""
+    now = now or timezone.now()
+    windows = settings.NOTIFICATIONS['WINDOWS']
+    waiting = dict(
+        Notification.objects.filter(digest=None).values('recipient')
+        .annotate(oldest=Min('created_at')).values_list('recipient', 'oldest')
+    )
+    preferences = NotificationPreference.objects.in_bulk(waiting)
+
+    digest_ids, muted = [], []
+    for user_id, oldest in waiting.items():
+        frequency = _preference(preferences, user_id).frequency
+        if frequency == 'off':
+            muted.append(user_id)
+        elif oldest <= now - timedelta(seconds=windows[frequency]):
+            with transaction.atomic():
+                digest = NotificationDigest.objects.create(recipient_id=user_id)
+                # Concurrent runs cannot both claim a row: the loser's digest stays empty.
+                count = Notification.objects.filter(recipient_id=user_id, digest=None).update(digest=digest)
+                if count:
+                    NotificationDigest.objects.filter(pk=digest.pk).update(event_count=count)
+                    digest_ids.append(digest.pk)
+                else:
+                    digest.delete()
+    if muted:
+        Notification.objects.filter(recipient_id__in=muted, digest=None).delete()
+    return digest_ids
+
+
+def stalled_digest_ids(now=None):
+    now = now or timezone.now()
+    # The worker that claimed these died mid-batch; at most the one being sent then goes out twice.
+    lost = NotificationDigest.objects.filter(status='sending', claimed_at__lt=now - STALLED_AFTER)
+    lost_ids = list(lost.values_list('id', flat=True))
+    NotificationDigest.objects.filter(id__in=lost_ids, status='sending').update(status='pending', claimed_at=None)
+    return lost_ids + list(
+        NotificationDigest.objects.filter(status='pending', created_at__lt=now - STALLED_AFTER)
+        .exclude(id__in=lost_ids).values_list('id', flat=True)
+    )
+
+
+def describe(event):
+    name = event.actor.get_full_name() or event.actor.email
+    if event.kind == 'affirmation':
+        return f'{name} affirmed the care plan.'
+    return f'{name} shared a new explanation.'
+
+
+def build_message(digest, notifications):
+    lines = [f'- {describe(notification.event)}' for notification in notifications]
+    subject = f'{len(lines)} new update{"s" if len(lines) != 1 else ""} from your care team'
+    body = 'Here is what happened in your care team:\n\n' + '\n'.join(lines)
+    message = EmailMessage(subject, body, to=[digest.recipient.email])
+    # Anymail reports these back in ESP webhooks; other backends ignore them.
+    message.tags = ['care-team-digest']
+    message.metadata = {'digest_id': digest.pk}
+    return message
+
+
+def deliver(digest_ids):
+    """
+    Send the pending digests among `digest_ids` over one connection.
+
+    The digests are claimed in a short transaction and sent outside it, so
+    no row locks are held while talking to the mail server. Each digest is
+    marked sent as soon as its email is accepted; on a failure the unsent
+    ones go back to pending for a retry.
+    """
+    with transaction.atomic():
+        digests = list(
+            NotificationDigest.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(id__in=digest_ids, status='pending').select_related('recipient').order_by('id')
+        )
+        if not digests:
+            return 0
+        NotificationDigest.objects.filter(id__in=[digest.pk for digest in digests]).update(
+            status='sending', claimed_at=timezone.now(),
+        )
+
+    notifications = (
+        Notification.objects.filter(digest__in=digests)
+        .select_related('event__actor').order_by('digest_id', 'event_id')
+    )
+    by_digest = {digest_id: list(items) for digest_id, items in groupby(notifications, key=lambda n: n.digest_id)}
+    sent = 0
+    try:
+        with get_connection() as connection:
+            for digest in digests:
+                items = by_digest.get(digest.pk)
+                if items:
+                    connection.send_messages([build_message(digest, items)])
+                with transaction.atomic():
+                    NotificationDigest.objects.filter(pk=digest.pk).update(status='sent', sent_at=timezone.now())
+                    Notification.objects.filter(digest_id=digest.pk).delete()
+                sent += 1
+    finally:
+        NotificationDigest.objects.filter(id__in=[digest.pk for digest in digests[sent:]], status='sending').update(
+            status='pending', claimed_at=None,
+        )
+    return sent
+
+
+def prune(now=None):
+    """Drop events every recipient has been sent (or that had none), and old sent digests."""
+    now = now or timezone.now()
+    NotificationEvent.objects.filter(fanned_out=True, notifications__isnull=True).delete()
+    NotificationDigest.objects.filter(status='sent', sent_at__lt=now - SENT_DIGEST_RETENTION).delete()
@@ -0,0 +1,147 @@
+"""
+The care-team owner's dashboard behind /api/care-team/overview/.
+
+Every member's role, affirmation status and questionnaire progress is
+computed in three aggregate queries whatever the team's size: one over the
+memberships (affirmed version, an `Exists` for plan changes logged after
+the affirmed snapshot's sync token, visible explanation counts), one over the members' QuestionResponse rows grouped by user and
+section (conditional counts of completed questions), and one for the
+question totals per section.
+
+The result is cached per team together with the sync token it was read at.
+Membership, response and explanation writes, including the owner's plan
+edits, all append to the sync change log, bulk writes included, so a hit
+costs one indexed check for newer entries of the owner or the members.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .metrics import observe_cache
+from .models import CareTeam, ChangeLogEntry, Explanation, QuestionResponse, Section, TeamMembership
+from .permissions import visible_explanations
+from .snapshots import PLAN_COLLECTIONS
+from .sync import current_token
+
+CACHE_PREFIX = 'care-team-overview:'
+# Names and emails are not in the change log; they refresh at least this often.
+CACHE_TIMEOUT = 10 * 60
+
+# Sync collections whose changes alter the overview (plan edits make affirmations out of date).
+OVERVIEW_COLLECTIONS = ('team_memberships',) + PLAN_COLLECTIONS
+
+
+def _cache_key(team_id):
+    return f'{CACHE_PREFIX}{team_id}'
+
+
+def _changed_since(token, audience):
+    return ChangeLogEntry.objects.filter(audience__in=audience, id__gt=token, model__in=OVERVIEW_COLLECTIONS).exists()
+
+
+def team_overview(owner):
+    """The overview of `owner`'s care team, or None if they have none."""
+    team = CareTeam.objects.filter(owner=owner).values('id', 'name').first()
+    if team is None:
+        return None
+    key = _cache_key(team['id'])
+    cached = cache.get(key)
+    hit = cached is not None and not _changed_since(cached['token'], cached['audience'])
+    observe_cache('care_team_overview', hit)
+    if hit:
+        return cached['data']
+
+    # Read the token first: anything written while the overview loads is after it.
+    token = current_token()
+    data = build_overview(owner, team)
+    audience = [owner.pk] + [member['user'] for member in data['members']]
+    cache.set(key, {'token': token, 'audience': audience, 'data': data}, CACHE_TIMEOUT)
+    return data
+
+
+def build_overview(owner, team):
+    explanation_counts = (
+        visible_explanations(Explanation.objects.filter(user_id=OuterRef('user_id')), owner)
+        .order_by().values('user_id').annotate(count=Count('pk')).values('count')
+    )
+    memberships = list(
+        TeamMembership.objects.filter(care_team_id=team['id'])
+        .annotate(
+            affirmed_version=F('affirmed_snapshot__version'),
+            # Snapshots are only taken on demand, so compare with the change log, not the latest one.
+            newer_plan=Exists(ChangeLogEntry.objects.filter(
+                audience=owner.pk, model__in=PLAN_COLLECTIONS, id__gt=OuterRef('affirmed_snapshot__sync_token'),
+            )),
+            explanations=Coalesce(Subquery(explanation_counts, output_field=IntegerField()), Value(0)),
+        )
+        .values(
+            'id', 'user_id', 'user__email', 'user__first_name', 'user__last_name', 'role', 'joined_at',
+            'has_affirmed', 'affirmed_at', 'affirmed_version', 'newer_plan', 'explanations',
+        )
+        .order_by('joined_at', 'id')
+    )
+
+    progress = {}
+    rows = (
+        QuestionResponse.objects.filter(user_id__in=[membership['user_id'] for membership in memberships])
+        .values('user_id', 'main_question__section__key')
+        .annotate(answered=Count('id'), completed=Count('id', filter=Q(is_complete=True)))
+        .order_by()
+    )
+    for row in rows:
+        progress.setdefault(row['user_id'], {})[row['main_question__section__key']] = {
+            'answered': row['answered'], 'completed': row['completed'],
+        }
+
+    sections = list(
+        Section.objects.annotate(question_count=Count('questions')).values('key', 'title', 'question_count')
+        .order_by('order')
+    )
+    total = sum(section['question_count'] for section in sections)
+
+    members = []
+    for membership in memberships:
+        by_section = progress.get(membership['user_id'], {})
+        completed = sum(counts['completed'] for counts in by_section.values())
+        name = f"{membership['user__first_name']} {membership['user__last_name']}".strip()
+        members.append({
+            'membership': membership['id'],
+            'user': str(membership['user_id']),
+            'name': name or membership['user__email'],
+            'role': membership['role'],
+            'joinedAt': membership['joined_at'],
+            'hasAffirmed': membership['has_affirmed'],
+            'affirmedAt': membership['affirmed_at'],
+            # Affirmations from before versions were kept have no known version.
+            'affirmedVersion': membership['affirmed_version'],
+            'affirmedLatest': (
+                membership['has_affirmed'] and membership['affirmed_version'] is not None
+                and not membership['newer_plan']
+            ),
+            'progress': {
+                'answered': sum(counts['answered'] for counts in by_section.values()),
+                'completed': completed,
+                'explanations': membership['explanations'],
+                'sections': {
+                    section['key']: by_section.get(section['key'], {'answered': 0, 'completed': 0})
+                    for section in sections
+                },
+            },
+            'finished': total > 0 and completed >= total,
+        })
+
+    return {
+        'team': {'id': str(team['id']), 'name': team['name']},
+        'questions': total,
+        'sections': [
+            {'key': section['key'], 'title': section['title'], 'questions': section['question_count']}
+            for section in sections
+        ],
+        'members': members,
+        'summary': {
+            'members': len(members),
+            'affirmed': sum(member['hasAffirmed'] for member in members),
+            'affirmedLatest': sum(member['affirmedLatest'] for member in members),
+            'finished': sum(member['finished'] for member in members),
+        },
+    }
@@ -0,0 +1,369 @@
+"""
+Hash partitioning of the response tables by user (PostgreSQL).
+
+QuestionResponse, CheckpointResponse and SelectedChoice grow with users x
+questions x checkpoints, and nearly every read is one user's. convert()
+rebuilds each of them as a table PARTITION BY HASH (user_id) while the app
+keeps reading and writing:
+
+1. prepare(): a shadow table LIKE the original, with RESPONSE_PARTITIONS
+   ['PARTITIONS'] partitions, its own id sequence, the original's unique
+   constraints, indexes and foreign keys, and a primary key of (id, user_id)
+   (every unique constraint of a partitioned table must contain the
+   partition key, which is why all three tables carry user_id). A trigger on
+   the original mirrors each write to the shadow from then on. It refuses to
+   start while a row referencing the table has another user_id than the row
+   it references (an Explanation of another user's response, say); swap()
+   checks that again before it takes its lock.
+2. copy(): the existing rows in pk order, BATCH_SIZE per transaction. Rows
+   are read FOR KEY SHARE, so a concurrent DELETE waits for the batch and its
+   mirrored delete then finds the copy. Progress is kept in a
+   BackfillCheckpoint, so an interrupted run resumes.
+3. swap(): one short transaction under an ACCESS EXCLUSIVE lock that gives up
+   after LOCK_TIMEOUT and is retried. The original becomes <table>_old
+   without foreign keys. The shadow takes over the table's name, index names
+   and next id. Foreign keys to the table become (column, user_id) ->
+   (id, user_id). They are added NOT VALID and validated once the lock is
+   released.
+
+Tables are converted parents first, and each one is finished before the next
+starts. The ORM needs no change since ids stay unique through the sequence,
+but queries should filter on the user so that PostgreSQL reads one partition.
+drop_old() removes the _old tables once the result has been checked.
+"""
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from .models import BackfillCheckpoint, CheckpointResponse, QuestionResponse, SelectedChoice
+
+logger = logging.getLogger(__name__)
+
+# Parents first: a table's foreign keys can only include user_id once its parent is partitioned.
+RESPONSE_MODELS = (QuestionResponse, CheckpointResponse, SelectedChoice)
+PARTITION_KEY = 'user_id'
+LOCK_NOT_AVAILABLE = '55P03'
+
+INDEX_PREFIX_RE = re.compile(r'^CREATE (UNIQUE )?INDEX \S+ ON (ONLY )?\S+ ')
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def response_tables():
+    return [model._meta.db_table for model in RESPONSE_MODELS]
+
+
+def _names(table):
+    return {
+        'shadow': f'{table}_new',
+        'old': f'{table}_old',
+        'sequence': f'{table}_pid_seq',
+        'mirror': f'{table[:48]}_mirror',
+        'checkpoint': f'partition:{table}',
+    }
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _require_postgresql():
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('Table partitioning needs PostgreSQL.')
+
+
+# =============================================================================
+# CATALOG
+# =============================================================================
+
+def _relkind(cursor, name):
+    cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [name])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _columns(cursor, table):
+    cursor.execute(
+        'SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped '
+        'ORDER BY attnum', [table],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _indexes(cursor, table):
+    """(name, definition, constraint type or None, constraint definition, unique) of each index on `table`."""
+    cursor.execute(
+        'SELECT c.relname, pg_get_indexdef(i.indexrelid), con.contype, pg_get_constraintdef(con.oid), i.indisunique '
+        'FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'LEFT JOIN pg_constraint con ON con.conindid = i.indexrelid AND con.conrelid = i.indrelid '
+        'WHERE i.indrelid = %s::regclass ORDER BY c.relname', [table],
+    )
+    return cursor.fetchall()
+
+
+def _foreign_keys(cursor, table):
+    """(name, definition) of the foreign keys from `table`."""
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f' ORDER BY conname", [table],
+    )
+    return cursor.fetchall()
+
+
+def _inbound_foreign_keys(cursor, table):
+    """(table, name, column, deferrable, deferred) of the single-column foreign keys to `table`."""
+    cursor.execute(
+        "SELECT c.relname, con.conname, a.attname, con.condeferrable, con.condeferred "
+        "FROM pg_constraint con JOIN pg_class c ON c.oid = con.conrelid "
+        "JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = con.conkey[1] "
+        "WHERE con.contype = 'f' AND con.confrelid = %s::regclass AND con.conparentid = 0 "
+        "AND array_length(con.conkey, 1) = 1 ORDER BY 1, 2", [table],
+    )
+    return cursor.fetchall()
+
+
+def _check_partition_keys(cursor, table, inbound):
+    """Raise if a row referencing `table` has another user_id than the row it references."""
+    for child, _, column, _, _ in inbound:
+        cursor.execute(
+            f'SELECT count(*) FROM {_quote(child)} c JOIN {_quote(table)} p ON p.id = c.{_quote(column)} '
+            f'WHERE c.{PARTITION_KEY} IS DISTINCT FROM p.{PARTITION_KEY}'
+        )
+        mismatched = cursor.fetchone()[0]
+        if mismatched:
+            raise PartitioningError(
+                f'{mismatched} rows of {child} have another {PARTITION_KEY} than the {table} row their '
+                f'{column} references; the foreign key on ({column}, {PARTITION_KEY}) would reject them. '
+                f'Fix them first.'
+            )
+
+
+def table_state(table):
+    """'partitioned', 'copying' (shadow table exists) or 'plain'."""
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        if _relkind(cursor, table) == 'p':
+            return 'partitioned'
+        return 'copying' if _relkind(cursor, _names(table)['shadow']) else 'plain'
+
+
+def status():
+    """Per response table: its state, partitions, rows copied so far and whether the _old table is still there."""
+    _require_postgresql()
+    result = []
+    with connection.cursor() as cursor:
+        for table in response_tables():
+            names = _names(table)
+            state = table_state(table)
+            partitioned = table if state == 'partitioned' else names['shadow'] if state == 'copying' else None
+            partitions = 0
+            if partitioned:
+                cursor.execute('SELECT count(*) FROM pg_inherits WHERE inhparent = %s::regclass', [partitioned])
+                partitions = cursor.fetchone()[0]
+            checkpoint = BackfillCheckpoint.objects.filter(name=names['checkpoint']).first()
+            result.append({
+                'table': table, 'state': state, 'partitions': partitions,
+                'rows_copied': checkpoint.rows_copied if checkpoint else 0,
+                'old_table': _relkind(cursor, names['old']) is not None,
+            })
+    return result
+
+
+# =============================================================================
+# CONVERSION
+# =============================================================================
+
+def prepare(table, partitions):
+    """Create the partitioned shadow of `table` and start mirroring writes to it."""
+    names = _names(table)
+    shadow = _quote(names['shadow'])
+    with transaction.atomic(), connection.cursor() as cursor:
+        columns = _columns(cursor, table)
+        if PARTITION_KEY not in columns:
+            raise PartitioningError(f'{table} has no {PARTITION_KEY} column; run the migrations first.')
+        inbound = _inbound_foreign_keys(cursor, table)
+        for child, name, column, _, _ in inbound:
+            if PARTITION_KEY not in _columns(cursor, child):
+                raise PartitioningError(f'{child}.{column} references {table} but {child} has no {PARTITION_KEY}.')
+        _check_partition_keys(cursor, table, inbound)
+
+        cursor.execute(
+            f'CREATE TABLE {shadow} (LIKE {_quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) '
+            f'PARTITION BY HASH ({PARTITION_KEY})'
+        )
+        for remainder in range(partitions):
+            cursor.execute(
+                f'CREATE TABLE {_quote(f"{table}_p{remainder:02d}")} PARTITION OF {shadow} '
+                f'FOR VALUES WITH (MODULUS {partitions:d}, REMAINDER {remainder:d})'
+            )
+        # The original's id is an identity column, which LIKE does not copy.
+        sequence = _quote(names['sequence'])
+        cursor.execute(f'CREATE SEQUENCE {sequence} AS bigint OWNED BY {shadow}.id')
+        cursor.execute(f"ALTER TABLE {shadow} ALTER COLUMN id SET DEFAULT nextval('{names['sequence']}')")
+
+        # Each shadow index has a temporary name; its comment holds the name it takes at the swap.
+        for number, (name, definition, constraint_type, constraint, unique) in enumerate(_indexes(cursor, table)):
+            temporary = _quote(f'{table[:48]}_new{number}')
+            if constraint_type == 'p':
+                cursor.execute(f'ALTER TABLE {shadow} ADD CONSTRAINT {temporary} PRIMARY KEY (id, {PARTITION_KEY})')
+            elif unique and PARTITION_KEY not in (constraint or definition):
+                raise PartitioningError(f'Unique index {name} on {table} does not include {PARTITION_KEY}.')
+            elif constraint_type == 'u':
+                cursor.execute(f'ALTER TABLE {shadow} ADD CONSTRAINT {temporary} {constraint}')
+            else:
+                cursor.execute(INDEX_PREFIX_RE.sub(
+                    lambda match: f'CREATE {match.group(1) or ""}INDEX {temporary} ON {shadow} ', definition,
+                ))
+            cursor.execute(f'COMMENT ON INDEX {temporary} IS %s', [name])
+        for name, definition in _foreign_keys(cursor, table):
+            cursor.execute(f'ALTER TABLE {shadow} ADD CONSTRAINT {_quote(name)} {definition}')
+
+        mirror = _quote(names['mirror'])
+        updates = ', '.join(f'{_quote(column)} = EXCLUDED.{_quote(column)}' for column in columns
+                            if column not in ('id', PARTITION_KEY))
+        cursor.execute(
+            f'CREATE FUNCTION {mirror}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN '
+            f"IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.{PARTITION_KEY} IS DISTINCT FROM NEW.{PARTITION_KEY}) THEN "
+            f'DELETE FROM {shadow} WHERE id = OLD.id AND {PARTITION_KEY} = OLD.{PARTITION_KEY}; END IF; '
+            f"IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+            f'INSERT INTO {shadow} SELECT NEW.* ON CONFLICT (id, {PARTITION_KEY}) DO UPDATE SET {updates}; END IF; '
+            f'RETURN NULL; END $$'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER {mirror} AFTER INSERT OR UPDATE OR DELETE ON {_quote(table)} '
+            f'FOR EACH ROW EXECUTE FUNCTION {mirror}()'
+        )
+        BackfillCheckpoint.objects.filter(name=names['checkpoint']).delete()
+        BackfillCheckpoint.objects.create(name=names['checkpoint'])
+
+
+def copy(table, batch_size, pause=0.0, max_batches=None, progress=None):
+    """Copy `table`'s rows into its shadow from the last checkpoint on. Returns True once every row is copied."""
+    names = _names(table)
+    source, shadow = _quote(table), _quote(names['shadow'])
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        started = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            checkpoint = BackfillCheckpoint.objects.select_for_update().get(name=names['checkpoint'])
+            cursor.execute(
+                f'SELECT max(id) FROM (SELECT id FROM {source} WHERE id > %s ORDER BY id LIMIT %s) batch',
+                [checkpoint.last_id, batch_size],
+            )
+            last_id = cursor.fetchone()[0]
+            if last_id is None:
+                now = timezone.now()
+                BackfillCheckpoint.objects.filter(pk=checkpoint.pk).update(finished_at=now, updated_at=now)
+                return True
+            cursor.execute(
+                f'WITH batch AS (SELECT * FROM {source} WHERE id > %s AND id <= %s FOR KEY SHARE) '
+                f'INSERT INTO {shadow} SELECT * FROM batch ON CONFLICT DO NOTHING',
+                [checkpoint.last_id, last_id],
+            )
+            copied = cursor.rowcount
+            BackfillCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                last_id=last_id, rows_copied=checkpoint.rows_copied + copied, chunks=checkpoint.chunks + 1,
+                updated_at=timezone.now(),
+            )
+        batches += 1
+        if progress:
+            progress(table, last_id, copied, time.perf_counter() - started)
+        time.sleep(pause)
+    return False
+
+
+def _swap(cursor, table):
+    names = _names(table)
+    source, shadow, old = _quote(table), _quote(names['shadow']), _quote(names['old'])
+    cursor.execute(f'LOCK TABLE {source} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(f'DROP TRIGGER {_quote(names["mirror"])} ON {source}')
+    cursor.execute(f'DROP FUNCTION {_quote(names["mirror"])}()')
+
+    inbound = _inbound_foreign_keys(cursor, table)
+    for child, name, _, _, _ in inbound:
+        cursor.execute(f'ALTER TABLE {_quote(child)} DROP CONSTRAINT {_quote(name)}')
+    # The old table keeps its rows for checking, but must not block deletes elsewhere.
+    for name, _ in _foreign_keys(cursor, table):
+        cursor.execute(f'ALTER TABLE {source} DROP CONSTRAINT {_quote(name)}')
+    cursor.execute(f'ALTER TABLE {source} RENAME TO {old}')
+
+    cursor.execute(
+        "SELECT c.relname, obj_description(c.oid, 'pg_class') FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        'WHERE i.indrelid = %s::regclass ORDER BY c.relname', [names['shadow']],
+    )
+    for number, (temporary, name) in enumerate(cursor.fetchall()):
+        cursor.execute(f'ALTER INDEX IF EXISTS {_quote(name)} RENAME TO {_quote(f"{table[:48]}_old{number}")}')
+        cursor.execute(f'ALTER INDEX {_quote(temporary)} RENAME TO {_quote(name)}')
+        cursor.execute(f'COMMENT ON INDEX {_quote(name)} IS NULL')
+    cursor.execute(f'ALTER TABLE {shadow} RENAME TO {source}')
+    cursor.execute(f"SELECT setval('{names['sequence']}', GREATEST((SELECT max(id) FROM {old}), 1))")
+
+    added = []
+    for child, name, column, deferrable, deferred in inbound:
+        timing = ' DEFERRABLE INITIALLY DEFERRED' if deferred else ' DEFERRABLE' if deferrable else ''
+        cursor.execute(
+            f'ALTER TABLE {_quote(child)} ADD CONSTRAINT {_quote(name)} '
+            f'FOREIGN KEY ({_quote(column)}, {PARTITION_KEY}) REFERENCES {source} (id, {PARTITION_KEY}){timing} NOT VALID'
+        )
+        added.append((child, name))
+    return added
+
+
+def swap(table, lock_timeout, attempts):
+    """Put the shadow of `table` in its place. Returns the foreign keys that were re-pointed at it."""
+    # Again for rows written since prepare(); not under the swap lock, which must stay short.
+    with connection.cursor() as cursor:
+        _check_partition_keys(cursor, table, _inbound_foreign_keys(cursor, table))
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('lock_timeout', %s, true)", [lock_timeout])
+                added = _swap(cursor, table)
+            break
+        except OperationalError as exc:
+            if getattr(exc.__cause__, 'pgcode', None) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            logger.info('Could not lock %s for the swap (attempt %d of %d)', table, attempt, attempts)
+            time.sleep(attempt)
+    with connection.cursor() as cursor:
+        # Validation scans the referencing table without blocking its writes.
+        for child, name in added:
+            cursor.execute(f'ALTER TABLE {_quote(child)} VALIDATE CONSTRAINT {_quote(name)}')
+        cursor.execute(f'ANALYZE {_quote(table)}')
+    return added
+
+
+def convert(partitions=None, batch_size=None, progress=None):
+    """Partition every response table not partitioned yet, resuming a conversion that was interrupted."""
+    _require_postgresql()
+    config = settings.RESPONSE_PARTITIONS
+    converted = []
+    for table in response_tables():
+        state = table_state(table)
+        if state == 'partitioned':
+            continue
+        if state == 'plain':
+            prepare(table, partitions or config['PARTITIONS'])
+        copy(table, batch_size or config['BATCH_SIZE'], config['PAUSE_SECONDS'], progress=progress)
+        swap(table, config['LOCK_TIMEOUT'], config['SWAP_ATTEMPTS'])
+        converted.append(table)
+    return converted
+
+
+def drop_old():
+    """Drop the original tables kept by swap(). Returns their names."""
+    _require_postgresql()
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in reversed(response_tables()):
+            old = _names(table)['old']
+            if _relkind(cursor, old):
+                cursor.execute(f'DROP TABLE {_quote(old)}')
+                dropped.append(old)
+    return dropped
@@ -0,0 +1,109 @@
+"""
+Care-team visibility rules for explanations and the content hanging off them.
+
+For each viewer we precompute the set of users ("owners") whose care-team
+content they may see, and the subset they may interact with (comment, react).
+Sets are cached per viewer and invalidated whenever one of the viewer's
+TeamMembership rows is saved or deleted, so visibility checks become an
+in-memory lookup and list filters a single IN clause.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+
+from .metrics import observe_cache
+from .models import TeamMembership
+
+# Roles that may comment on and react to a team owner's explanations.
+INTERACT_ROLES = ('owner', 'member')
+
+CACHE_PREFIX = 'perm:care-team:'
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(viewer_id):
+    return f'{CACHE_PREFIX}{viewer_id}'
+
+
+def care_team_access(viewer):
+    """
+    Return {'view': frozenset, 'interact': frozenset} of owner ids for `viewer`.
+
+    Both include the viewer's own id.
+    """
+    key = _cache_key(viewer.pk)
+    access = cache.get(key)
+    observe_cache('care_team_access', access is not None)
+    if access is None:
+        view, interact = {viewer.pk}, {viewer.pk}
+        for owner_id, role in TeamMembership.objects.filter(user=viewer).values_list('care_team__owner_id', 'role'):
+            view.add(owner_id)
+            if role in INTERACT_ROLES:
+                interact.add(owner_id)
+        access = {'view': frozenset(view), 'interact': frozenset(interact)}
+        cache.set(key, access, CACHE_TIMEOUT)
+    return access
+
+
+def invalidate_care_team_access(sender, instance, **kwargs):
+    """
+    Drop the cached sets of the membership's user once the write commits
+    (connected in signals). Dropping them earlier would let a concurrent
+    request cache the pre-commit memberships again.
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: cache.delete(_cache_key(user_id)))
+
+
+def invalidate_care_team_access_of(user_ids):
+    """Drop the cached sets of `user_ids`, for membership writes that bypass signals."""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def can_view_explanation(viewer, explanation):
+    if explanation.visibility == 'public' or explanation.user_id == viewer.pk:
+        return True
+    if explanation.visibility == 'care_team':
+        return explanation.user_id in care_team_access(viewer)['view']
+    return False
+
+
+def can_interact_with_explanation(viewer, explanation):
+    if not can_view_explanation(viewer, explanation):
+        return False
+    return explanation.user_id in care_team_access(viewer)['interact'] or explanation.visibility == 'public'
+
+
+def visible_explanations(queryset, viewer, prefix=''):
+    """
+    Filter an Explanation queryset (or a related one via `prefix`, e.g.
+    'explanation__') down to what `viewer` may see.
+    """
+    owners = care_team_access(viewer)['view']
+    return queryset.filter(
+        Q(**{f'{prefix}visibility': 'public'})
+        | Q(**{f'{prefix}user_id': viewer.pk})
+        | Q(**{f'{prefix}visibility': 'care_team', f'{prefix}user_id__in': owners})
+    )
+
+
+def _explanation_of(obj):
+    return getattr(obj, 'explanation', obj)
+
+
+class CanViewExplanation(BasePermission):
+    """Object permission for explanations and objects with an `explanation` FK."""
+
+    def has_object_permission(self, request, view, obj):
+        return can_view_explanation(request.user, _explanation_of(obj))
+
+
+class CanInteractWithExplanation(BasePermission):
+    """Read if visible; write (comment, react) only for owners/members of the author's team."""
+
+    def has_object_permission(self, request, view, obj):
+        explanation = _explanation_of(obj)
+        if request.method in SAFE_METHODS:
+            return can_view_explanation(request.user, explanation)
+        return can_interact_with_explanation(request.user, explanation)
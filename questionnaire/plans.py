@@ -0,0 +1,66 @@
+"""Querysets that load a user's whole care plan in a fixed number of queries."""
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import QuestionResponse, CheckpointResponse, Choice, Explanation, Reaction, Comment
+
+# Responses + checkpoint responses + selected choices + explanations.
+PLAN_MAX_QUERIES = 4
+
+
+def plan_queryset(user):
+    """
+    A user's question responses with questions, checkpoint responses,
+    selected choices and explanations (with reaction/comment counts) loaded.
+
+    Evaluating it costs at most PLAN_MAX_QUERIES queries regardless of how many
+    questions the user has answered; nothing downstream should touch other
+    relations.
+    """
+    checkpoint_responses = CheckpointResponse.objects.filter(user=user).select_related('checkpoint').prefetch_related(
+        selected_choices_prefetch(user, Choice.objects.only('id', 'key', 'title', 'subtitle', 'description'))
+    )
+    # Correlated counts: joining both relations would multiply the rows.
+    explanations = Explanation.objects.annotate(
+        reaction_count=_count_per_explanation(Reaction),
+        comment_count=_count_per_explanation(Comment),
+    ).order_by('created_at')
+
+    return (
+        QuestionResponse.objects
+        .filter(user=user)
+        .select_related('main_question__section')
+        .prefetch_related(
+            Prefetch('checkpoint_responses', queryset=checkpoint_responses),
+            Prefetch('explanations', queryset=explanations),
+        )
+        .order_by('main_question__section__order', 'main_question__order')
+    )
+
+
+def _count_per_explanation(model):
+    counts = (
+        model.objects.filter(explanation=OuterRef('pk'))
+        .order_by().values('explanation').annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def selected_choices_prefetch(user, queryset=None):
+    """
+    Prefetch of selected_choices for `user`'s checkpoint responses that also
+    filters the selected_choices table on its user_id, the partition key, so
+    a partitioned table is read from one partition. Django reuses the
+    prefetch's own join for the filter.
+    """
+    queryset = Choice.objects.all() if queryset is None else queryset
+    return Prefetch('selected_choices', queryset=queryset.filter(selectedchoice__user=user))
+
+
+def media_link(explanation):
+    """Best URL for an explanation's recording: the stored URL, else the uploaded file's."""
+    if explanation.media_url:
+        return explanation.media_url
+    if explanation.media_file:
+        return explanation.media_file.url
+    return ''
@@ -0,0 +1,130 @@
+"""
+Push of care-team activity (comments, reactions, affirmations) to WebSocket clients.
+
+Events go to the channel-layer group of the explanation owner's care team,
+which CareTeamConsumer subscribers join after an access check; events on
+private explanations go only to the owner's personal group. Everything
+published in one transaction is sent after commit, at most BATCH_SIZE events
+per message, encoded to JSON once so the layer fans out the same text to
+every subscriber.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import Explanation, TeamMembership
+from .renderers import FastJSONRenderer
+from .serializers import CommentSerializer, ReactionSerializer, TeamMembershipSerializer
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+
+def team_group(owner_id):
+    return f'care-team.{owner_id}'
+
+
+def user_group(user_id):
+    return f'user.{user_id}'
+
+
+def _group_send(group, message):
+    try:
+        async_to_sync(get_channel_layer().group_send)(group, message)
+    except Exception:
+        # Clients catch up through /api/sync/; a layer outage must not fail the write.
+        logger.warning('Could not push to %s', group, exc_info=True)
+
+
+class _Batch:
+    """Events queued during one transaction, keyed by group."""
+
+    def __init__(self):
+        self.events = {}
+
+    def add(self, group, event):
+        self.events.setdefault(group, []).append(event)
+
+    def flush(self):
+        renderer = FastJSONRenderer()
+        for group, events in self.events.items():
+            for start in range(0, len(events), BATCH_SIZE):
+                text = renderer.render({'type': 'events', 'events': events[start:start + BATCH_SIZE]}).decode()
+                _group_send(group, {'type': 'team.events', 'text': text})
+
+
+def publish(group, event):
+    """Queue `event` for `group`, to be sent once the current transaction commits."""
+    connection = transaction.get_connection()
+    batch = getattr(connection, '_realtime_batch', None)
+    # Start a new batch unless this transaction already has one waiting (it
+    # is gone from run_on_commit once flushed or rolled back).
+    if batch is None or not any(callback == batch.flush for _, callback, _ in connection.run_on_commit):
+        batch = _Batch()
+        connection._realtime_batch = batch
+        batch.add(group, event)
+        transaction.on_commit(batch.flush)
+    else:
+        batch.add(group, event)
+
+
+def publish_for_explanation(explanation_id, event):
+    owner = Explanation.objects.filter(pk=explanation_id).values('user_id', 'visibility').first()
+    if owner is None:
+        return
+    if owner['visibility'] == 'private':
+        publish(user_group(owner['user_id']), event)
+    else:
+        publish(team_group(owner['user_id']), event)
+
+
+# =============================================================================
+# SIGNAL HANDLERS (connected in signals)
+# =============================================================================
+
+def push_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        publish_for_explanation(instance.explanation_id, {'type': 'comment', 'data': CommentSerializer(instance).data})
+
+
+def push_comment_deleted(sender, instance, **kwargs):
+    publish_for_explanation(instance.explanation_id, {
+        'type': 'comment.deleted', 'data': {'id': instance.pk, 'explanation': instance.explanation_id},
+    })
+
+
+def push_reaction(sender, instance, raw=False, **kwargs):
+    if not raw:
+        publish_for_explanation(instance.explanation_id, {'type': 'reaction', 'data': ReactionSerializer(instance).data})
+
+
+def push_reaction_deleted(sender, instance, **kwargs):
+    publish_for_explanation(instance.explanation_id, {
+        'type': 'reaction.deleted', 'data': {'id': instance.pk, 'explanation': instance.explanation_id},
+    })
+
+
+def remember_affirmation(sender, instance, raw=False, **kwargs):
+    """pre_save: note whether the membership was already affirmed, so only new affirmations are pushed."""
+    instance._was_affirmed = bool(
+        instance.pk and not raw and instance.has_affirmed
+        and TeamMembership.objects.filter(pk=instance.pk, has_affirmed=True).exists()
+    )
+
+
+def push_affirmation(sender, instance, raw=False, **kwargs):
+    if raw or not instance.has_affirmed or getattr(instance, '_was_affirmed', False):
+        return
+    owner_id = instance.care_team.owner_id
+    publish(team_group(owner_id), {'type': 'affirmation', 'data': TeamMembershipSerializer(instance).data})
+
+
+def revoke_subscription(sender, instance, **kwargs):
+    """A removed member's open sockets leave the team's group."""
+    owner_id = instance.care_team.owner_id
+    transaction.on_commit(lambda: _group_send(
+        user_group(instance.user_id), {'type': 'team.revoked', 'team': str(owner_id)},
+    ))
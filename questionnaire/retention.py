@@ -0,0 +1,117 @@
+"""
+Retention for AI interactions.
+
+AIInteraction holds only the last HOT_DAYS of rows, so user-history queries
+and their indexes stay small. archive_ai_interactions() moves older rows in
+short batches to AIInteractionArchive, with the prompt and response
+compressed, and adds their tokens to the user's AIUsageTotal; archived rows
+are deleted for good after ARCHIVE_DAYS. Each batch is one transaction that
+locks only the rows it moves, so writers and other runs are never blocked.
+"""
+import json
+import time
+import zlib
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import AIInteraction, AIInteractionArchive, AIUsageTotal
+
+
+def compress_payload(prompt, response):
+    return zlib.compress(json.dumps({'prompt': prompt, 'response': response}).encode())
+
+
+def decompress_payload(payload):
+    """Return {'prompt': ..., 'response': ...} for an AIInteractionArchive.payload."""
+    return json.loads(zlib.decompress(bytes(payload)))
+
+
+def archive_batch(cutoff, batch_size):
+    """Move up to `batch_size` interactions created before `cutoff`. Returns the number moved."""
+    with transaction.atomic():
+        interactions = list(
+            AIInteraction.objects.select_for_update(skip_locked=True)
+            .filter(created_at__lt=cutoff).order_by('id')[:batch_size]
+        )
+        if not interactions:
+            return 0
+        ids = [interaction.pk for interaction in interactions]
+        compared = {}
+        links = AIInteraction.compared_explanations.through.objects.filter(aiinteraction_id__in=ids)
+        for interaction_id, explanation_id in links.values_list('aiinteraction_id', 'explanation_id'):
+            compared.setdefault(interaction_id, []).append(explanation_id)
+
+        AIInteractionArchive.objects.bulk_create([
+            AIInteractionArchive(
+                id=interaction.pk, user_id=interaction.user_id, explanation_id=interaction.explanation_id,
+                compared_explanation_ids=compared.get(interaction.pk, []),
+                interaction_type=interaction.interaction_type,
+                payload=compress_payload(interaction.prompt, interaction.response),
+                model_used=interaction.model_used, tokens_used=interaction.tokens_used,
+                created_at=interaction.created_at,
+            )
+            for interaction in interactions
+        ], ignore_conflicts=True)
+
+        counts, tokens = Counter(), Counter()
+        for interaction in interactions:
+            counts[interaction.user_id] += 1
+            tokens[interaction.user_id] += interaction.tokens_used
+        AIUsageTotal.objects.bulk_create([AIUsageTotal(user_id=user_id) for user_id in counts], ignore_conflicts=True)
+        for user_id, count in counts.items():
+            AIUsageTotal.objects.filter(user_id=user_id).update(
+                interactions=F('interactions') + count, tokens_used=F('tokens_used') + tokens[user_id],
+                updated_at=timezone.now(),
+            )
+
+        AIInteraction.compared_explanations.through.objects.filter(aiinteraction_id__in=ids).delete()
+        AIInteraction.objects.filter(pk__in=ids).delete()
+    return len(interactions)
+
+
+def purge_batch(cutoff, batch_size):
+    """Delete up to `batch_size` archived interactions created before `cutoff`. Returns the number deleted."""
+    ids = list(
+        AIInteractionArchive.objects.filter(created_at__lt=cutoff).order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    if ids:
+        # Totals keep counting purged interactions: they are lifetime usage.
+        AIInteractionArchive.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_ai_interactions(now=None, max_batches=None):
+    """Apply the AI_RETENTION policy in batches. Returns (archived, purged)."""
+    config = settings.AI_RETENTION
+    now = now or timezone.now()
+    totals = []
+    for step, days in ((archive_batch, config['HOT_DAYS']), (purge_batch, config['ARCHIVE_DAYS'])):
+        moved, batches = 0, 0
+        while days and (max_batches is None or batches < max_batches):
+            count = step(now - timedelta(days=days), config['BATCH_SIZE'])
+            moved += count
+            batches += 1
+            if count < config['BATCH_SIZE']:
+                break
+            time.sleep(config['PAUSE_SECONDS'])
+        totals.append(moved)
+    return tuple(totals)
+
+
+def ai_usage(user_ids):
+    """Return {user_id: {'interactions': n, 'tokens_used': n}} over hot and archived interactions."""
+    usage = {user_id: {'interactions': 0, 'tokens_used': 0} for user_id in user_ids}
+    hot = (
+        AIInteraction.objects.filter(user_id__in=user_ids).values('user_id')
+        .annotate(interactions=Count('id'), tokens=Sum('tokens_used')).values_list('user_id', 'interactions', 'tokens')
+    )
+    archived = AIUsageTotal.objects.filter(user_id__in=user_ids).values_list('user_id', 'interactions', 'tokens_used')
+    for user_id, interactions, tokens in list(hot) + list(archived):
+        usage[user_id]['interactions'] += interactions
+        usage[user_id]['tokens_used'] += tokens or 0
+    return usage
@@ -0,0 +1,8 @@
+"""WebSocket URL configuration (mounted by awfm.asgi)."""
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/care-team/', consumers.CareTeamConsumer.as_asgi()),
+]
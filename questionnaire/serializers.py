@@ -1,9 +1,25 @@
 """Serializers for the AWFM Questionnaire API."""
+from django.conf import settings
 from rest_framework import serializers
-from .models import Question, Choice, TeamMember, MainScreenQuestion, Response
+from .models import (
+    LegacyQuestion, LegacyChoice, LegacyTeamMember, LegacyMainScreenQuestion, LegacyResponse,
+    Section, Choice, MainQuestion, Checkpoint, QuestionResponse, CheckpointResponse,
+    Explanation, TeamMembership, Comment, Reaction, NotificationPreference,
+)
+from .images import image_fields
+from .plans import media_link
 
 
-class ChoiceSerializer(serializers.ModelSerializer):
+class ResponsiveImageMixin:
+    """Serve `image` as its default variant plus `imageSrcset` per format (see questionnaire.images)."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(image_fields(instance.image))
+        return data
+
+
+class ChoiceSerializer(ResponsiveImageMixin, serializers.ModelSerializer):
     """Serializer for choices - maps Django field names to camelCase for frontend."""
     id = serializers.CharField(source='choice_id')
     whyThisMatters = serializers.CharField(source='why_this_matters', allow_blank=True)
@@ -17,7 +33,7 @@ class ChoiceSerializer(serializers.ModelSerializer):
     reflectionGuidance = serializers.CharField(source='reflection_guidance', allow_blank=True)
 
     class Meta:
-        model = Choice
+        model = LegacyChoice
         fields = [
             'id', 'title', 'subtitle', 'image', 'description',
             'whyThisMatters', 'researchEvidence', 'decisionImpact',
@@ -31,13 +47,13 @@ class QuestionSerializer(serializers.ModelSerializer):
     checkpointLabel = serializers.CharField(source='checkpoint_label')
 
     class Meta:
-        model = Question
+        model = LegacyQuestion
         fields = ['title', 'subtitle', 'checkpointLabel', 'instruction']
 
 
 class TeamMemberSerializer(serializers.ModelSerializer):
     class Meta:
-        model = TeamMember
+        model = LegacyTeamMember
         fields = ['id', 'name', 'avatar', 'affirmed']
 
 
@@ -45,19 +61,222 @@ class MainScreenQuestionSerializer(serializers.ModelSerializer):
     sectionLabel = serializers.CharField(source='section_label')
 
     class Meta:
-        model = MainScreenQuestion
+        model = LegacyMainScreenQuestion
         fields = ['title', 'subtitle', 'sectionLabel']
 
 
 class ResponseSerializer(serializers.ModelSerializer):
     selected_choice_ids = serializers.PrimaryKeyRelatedField(
-        queryset=Choice.objects.all(),
+        queryset=LegacyChoice.objects.all(),
         many=True,
         source='selected_choices',
         required=False
     )
 
     class Meta:
-        model = Response
+        model = LegacyResponse
         fields = ['id', 'user_id', 'question', 'selected_choice_ids', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
+
+
+# =============================================================================
+# SECTION / MAIN QUESTION CONTENT
+# =============================================================================
+
+class SectionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Section
+        fields = ['id', 'key', 'title', 'description', 'order']
+
+
+class MainQuestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MainQuestion
+        fields = ['id', 'key', 'section', 'title', 'subtitle', 'description', 'order']
+
+
+class CheckpointSerializer(serializers.ModelSerializer):
+    mainQuestion = serializers.PrimaryKeyRelatedField(source='main_question', read_only=True)
+    checkpointNumber = serializers.IntegerField(source='checkpoint_number')
+    checkpointType = serializers.CharField(source='checkpoint_type')
+
+    class Meta:
+        model = Checkpoint
+        fields = ['id', 'mainQuestion', 'checkpointNumber', 'checkpointType', 'title', 'subtitle', 'instruction', 'order']
+
+
+class CheckpointChoiceSerializer(ResponsiveImageMixin, serializers.ModelSerializer):
+    """Serializer for checkpoint choices - camelCase extended content for frontend."""
+    whyThisMatters = serializers.CharField(source='why_this_matters', allow_blank=True)
+    researchEvidence = serializers.CharField(source='research_evidence', allow_blank=True)
+    decisionImpact = serializers.CharField(source='decision_impact', allow_blank=True)
+    whatYouAreFightingFor = serializers.CharField(source='what_you_are_fighting_for', allow_blank=True)
+    cooperativeLearning = serializers.CharField(source='cooperative_learning', allow_blank=True)
+    barriersToAccess = serializers.CharField(source='barriers_to_access', allow_blank=True)
+    careTeamAffirmation = serializers.CharField(source='care_team_affirmation', allow_blank=True)
+    interdependencyAtWork = serializers.CharField(source='interdependency_at_work', allow_blank=True)
+    reflectionGuidance = serializers.CharField(source='reflection_guidance', allow_blank=True)
+
+    class Meta:
+        model = Choice
+        fields = [
+            'id', 'key', 'checkpoint', 'title', 'subtitle', 'image', 'description',
+            'whyThisMatters', 'researchEvidence', 'decisionImpact',
+            'whatYouAreFightingFor', 'cooperativeLearning', 'barriersToAccess',
+            'careTeamAffirmation', 'interdependencyAtWork', 'reflectionGuidance', 'order'
+        ]
+
+
+class CheckpointTreeSerializer(CheckpointSerializer):
+    choices = CheckpointChoiceSerializer(many=True, read_only=True)
+
+    class Meta(CheckpointSerializer.Meta):
+        fields = CheckpointSerializer.Meta.fields + ['choices']
+
+
+class MainQuestionTreeSerializer(MainQuestionSerializer):
+    checkpoints = CheckpointTreeSerializer(many=True, read_only=True)
+
+    class Meta(MainQuestionSerializer.Meta):
+        fields = MainQuestionSerializer.Meta.fields + ['checkpoints']
+
+
+class SectionTreeSerializer(SectionSerializer):
+    """A section with its questions, checkpoints and choices nested."""
+    questions = MainQuestionTreeSerializer(many=True, read_only=True)
+
+    class Meta(SectionSerializer.Meta):
+        fields = SectionSerializer.Meta.fields + ['questions']
+
+
+# =============================================================================
+# USER DATA
+# =============================================================================
+
+class QuestionResponseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QuestionResponse
+        fields = ['id', 'main_question', 'is_complete', 'created_at', 'updated_at']
+
+
+class CheckpointResponseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CheckpointResponse
+        fields = ['id', 'question_response', 'checkpoint', 'selected_choices', 'created_at', 'updated_at']
+
+
+class ResponseOpSerializer(serializers.Serializer):
+    """One queued autosave operation: add/remove a choice (by id) or set a question complete."""
+    OPS = ['add', 'remove', 'complete']
+
+    seq = serializers.IntegerField(min_value=0)
+    op = serializers.ChoiceField(choices=OPS)
+    choice = serializers.IntegerField(required=False)
+    question = serializers.CharField(required=False, max_length=10)
+    value = serializers.BooleanField(required=False, default=True)
+
+    def validate(self, attrs):
+        field = 'question' if attrs['op'] == 'complete' else 'choice'
+        if field not in attrs:
+            raise serializers.ValidationError({field: f'Required for {attrs["op"]!r}.'})
+        return attrs
+
+
+class ResponseOpsSerializer(serializers.Serializer):
+    client = serializers.CharField(max_length=64)
+    ops = ResponseOpSerializer(many=True, allow_empty=False, max_length=settings.AUTOSAVE['MAX_OPS'])
+
+
+class ExplanationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Explanation
+        fields = [
+            'id', 'user', 'question_response', 'explanation_type', 'text_content', 'media_url',
+            'thumbnail_url', 'duration_seconds', 'description', 'visibility', 'created_at', 'updated_at'
+        ]
+
+
+class TeamMembershipSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TeamMembership
+        fields = ['id', 'care_team', 'user', 'role', 'has_affirmed', 'affirmed_at', 'joined_at']
+
+
+class CommentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Comment
+        fields = ['id', 'explanation', 'user', 'content', 'created_at', 'updated_at']
+
+
+class ReactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Reaction
+        fields = ['id', 'explanation', 'user', 'reaction_type', 'created_at']
+
+
+class NotificationPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationPreference
+        fields = ['frequency', 'explanations', 'affirmations', 'updated_at']
+        read_only_fields = ['updated_at']
+
+
+# =============================================================================
+# CARE PLAN (expects querysets from plans.plan_queryset)
+# =============================================================================
+
+class PlanChoiceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Choice
+        fields = ['id', 'key', 'title', 'subtitle']
+
+
+class PlanCheckpointResponseSerializer(serializers.ModelSerializer):
+    checkpointNumber = serializers.IntegerField(source='checkpoint.checkpoint_number')
+    checkpointType = serializers.CharField(source='checkpoint.checkpoint_type')
+    title = serializers.CharField(source='checkpoint.title')
+    selectedChoices = PlanChoiceSerializer(source='selected_choices', many=True)
+
+    class Meta:
+        model = CheckpointResponse
+        fields = ['id', 'checkpointNumber', 'checkpointType', 'title', 'selectedChoices']
+
+
+class PlanExplanationSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='explanation_type')
+    text = serializers.CharField(source='text_content')
+    mediaUrl = serializers.SerializerMethodField()
+    thumbnailUrl = serializers.CharField(source='thumbnail_url')
+    durationSeconds = serializers.IntegerField(source='duration_seconds')
+    reactionCount = serializers.IntegerField(source='reaction_count')
+    commentCount = serializers.IntegerField(source='comment_count')
+    createdAt = serializers.DateTimeField(source='created_at')
+
+    class Meta:
+        model = Explanation
+        fields = [
+            'id', 'type', 'text', 'description', 'mediaUrl', 'thumbnailUrl', 'durationSeconds',
+            'visibility', 'reactionCount', 'commentCount', 'createdAt'
+        ]
+
+    def get_mediaUrl(self, obj):
+        return media_link(obj)
+
+
+class PlanQuestionResponseSerializer(serializers.ModelSerializer):
+    """One answered question of a user's care plan with everything nested."""
+    question = serializers.CharField(source='main_question.key')
+    title = serializers.CharField(source='main_question.title')
+    subtitle = serializers.CharField(source='main_question.subtitle')
+    section = serializers.CharField(source='main_question.section.key')
+    isComplete = serializers.BooleanField(source='is_complete')
+    updatedAt = serializers.DateTimeField(source='updated_at')
+    checkpoints = PlanCheckpointResponseSerializer(source='checkpoint_responses', many=True)
+    explanations = PlanExplanationSerializer(many=True)
+
+    class Meta:
+        model = QuestionResponse
+        fields = [
+            'id', 'question', 'title', 'subtitle', 'section', 'isComplete', 'updatedAt',
+            'checkpoints', 'explanations'
+        ]
@@ -0,0 +1,100 @@
+"""Signal handlers for the questionnaire app (connected in QuestionnaireConfig.ready)."""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .backfill import invalidate_legacy_mapping
+from .metrics import record_ai_tokens
+from .images import register_choice_image
+from .models import (
+    User, MainQuestion, Checkpoint, Choice, LegacyQuestion, LegacyChoice, CheckpointResponse, TeamMembership,
+    AIInteraction, Comment, Reaction, Explanation, PeerNeighbor,
+)
+from .notifications import notify_explanation, notify_affirmation
+from .permissions import invalidate_care_team_access, invalidate_care_team_access_of
+from .snapshots import snapshot_affirmation
+from . import realtime, similarity
+from .sync import SYNCED_BY_MODEL, record_bulk_change, record_change
+
+
+def _log_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_change(instance, 'upsert')
+
+
+def _log_delete(sender, instance, **kwargs):
+    record_change(instance, 'delete')
+
+
+for _model in SYNCED_BY_MODEL:
+    post_save.connect(_log_save, sender=_model, dispatch_uid=f'sync_save_{_model.__name__}')
+    post_delete.connect(_log_delete, sender=_model, dispatch_uid=f'sync_delete_{_model.__name__}')
+
+
+@receiver(m2m_changed, sender=CheckpointResponse.selected_choices.through)
+def log_selected_choices_changed(sender, instance, action, reverse, **kwargs):
+    """Selecting or clearing choices changes the checkpoint response payload."""
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        record_change(instance, 'upsert')
+
+
+post_save.connect(forget_user, sender=User, dispatch_uid='jwt_forget_user_save')
+post_delete.connect(forget_user, sender=User, dispatch_uid='jwt_forget_user_delete')
+
+post_save.connect(invalidate_care_team_access, sender=TeamMembership, dispatch_uid='perm_membership_save')
+post_delete.connect(invalidate_care_team_access, sender=TeamMembership, dispatch_uid='perm_membership_delete')
+
+post_save.connect(record_ai_tokens, sender=AIInteraction, dispatch_uid='metrics_ai_tokens')
+
+post_save.connect(realtime.push_comment, sender=Comment, dispatch_uid='realtime_comment_save')
+post_delete.connect(realtime.push_comment_deleted, sender=Comment, dispatch_uid='realtime_comment_delete')
+post_save.connect(realtime.push_reaction, sender=Reaction, dispatch_uid='realtime_reaction_save')
+post_delete.connect(realtime.push_reaction_deleted, sender=Reaction, dispatch_uid='realtime_reaction_delete')
+# Also read by notify_affirmation and snapshot_affirmation, so it must stay connected.
+pre_save.connect(realtime.remember_affirmation, sender=TeamMembership, dispatch_uid='realtime_affirmation_pre')
+post_save.connect(realtime.push_affirmation, sender=TeamMembership, dispatch_uid='realtime_affirmation_save')
+post_delete.connect(realtime.revoke_subscription, sender=TeamMembership, dispatch_uid='realtime_membership_delete')
+
+post_save.connect(notify_explanation, sender=Explanation, dispatch_uid='notify_explanation')
+post_save.connect(notify_affirmation, sender=TeamMembership, dispatch_uid='notify_affirmation')
+post_save.connect(snapshot_affirmation, sender=TeamMembership, dispatch_uid='snapshot_affirmation')
+
+m2m_changed.connect(similarity.mark_dirty, sender=CheckpointResponse.selected_choices.through, dispatch_uid='similarity_choices')
+post_delete.connect(similarity.mark_dirty, sender=CheckpointResponse, dispatch_uid='similarity_response_delete')
+
+post_save.connect(register_choice_image, sender=Choice, dispatch_uid='images_choice')
+post_save.connect(register_choice_image, sender=LegacyChoice, dispatch_uid='images_legacy_choice')
+
+# The content LegacyMapping is built from.
+for _model in (MainQuestion, Checkpoint, Choice, LegacyQuestion, LegacyChoice):
+    post_save.connect(invalidate_legacy_mapping, sender=_model, dispatch_uid=f'backfill_mapping_save_{_model.__name__}')
+    post_delete.connect(invalidate_legacy_mapping, sender=_model, dispatch_uid=f'backfill_mapping_delete_{_model.__name__}')
+
+
+def bulk_saved(model, pks):
+    """
+    For rows of `model` changed with QuerySet.update(), which sends no
+    signals: what the post_save handlers above do, a query per kind of work
+    instead of per row. Call it in the transaction that made the change.
+    Affirmations are not pushed or notified; change has_affirmed with save().
+    """
+    rows = model.objects.filter(pk__in=pks)
+    if model in SYNCED_BY_MODEL:
+        transaction.on_commit(lambda: record_bulk_change(rows))
+    if model is TeamMembership:
+        user_ids = set(rows.values_list('user_id', flat=True))
+        transaction.on_commit(lambda: invalidate_care_team_access_of(user_ids))
+    elif model is Comment:
+        for comment in rows:
+            realtime.push_comment(model, comment)
+    elif model is Reaction:
+        for reaction in rows:
+            realtime.push_reaction(model, reaction)
+    elif model is Explanation:
+        # Only owners of public explanations are neighbor candidates, so
+        # whoever has these owners as neighbors may need a new list.
+        owners = rows.values('user_id')
+        similarity.mark_users_dirty(set(
+            PeerNeighbor.objects.filter(neighbor_id__in=owners).values_list('user_id', flat=True)
+        ))
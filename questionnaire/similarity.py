@@ -0,0 +1,222 @@
+"""
+Peer similarity: "people who answered like you".
+
+Each user's selected choices are kept as a bit set in UserChoiceVector,
+where bit n stands for Choice id n. Neighbors are found with NumPy instead
+of SQL self-joins. The vectors of the candidate users (those with public
+explanations) are unpacked once into a dense 0/1 matrix. Each block of
+query users is then multiplied by it, so one BLAS call gives every pairwise
+intersection size in the block. Jaccard or cosine scores follow from the
+row sums, and argpartition picks the top k. Blocks are sized to keep each
+score matrix under BLOCK_BYTES.
+
+An answer change only marks the user's vector dirty (one upsert from a
+signal). refresh_dirty() recomputes dirty vectors and their neighbor rows
+against the current candidates. rebuild() recomputes everything, which also
+picks up users who gained or lost their public explanations.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, FloatField, Value, When
+
+from .models import User, SelectedChoice, Explanation, UserChoiceVector, PeerNeighbor
+
+WRITE_BATCH_SIZE = 5000
+
+
+# =============================================================================
+# VECTORS & SCORING (no database access; also used by bench_similarity)
+# =============================================================================
+
+def pack(choice_ids):
+    """Bit-pack a set of choice ids (bit n = id n)."""
+    if not choice_ids:
+        return b''
+    bits = np.zeros(max(choice_ids) + 1, dtype=bool)
+    bits[list(choice_ids)] = True
+    return np.packbits(bits).tobytes()
+
+
+def unpack(rows, width=None):
+    """Stack packed rows into a dense float32 0/1 matrix `width` bytes (x 8 columns) wide."""
+    width = width if width is not None else max((len(row) for row in rows), default=0)
+    packed = np.zeros((len(rows), width), dtype=np.uint8)
+    for index, row in enumerate(rows):
+        if row:
+            packed[index, :len(row)] = np.frombuffer(row, dtype=np.uint8)
+    return np.unpackbits(packed, axis=1).astype(np.float32)
+
+
+def top_neighbors(queries, candidates, k, metric='jaccard', query_ids=None, candidate_ids=None, block_bytes=None):
+    """
+    Yield (query_index, candidate_indices, scores) with up to `k` best
+    candidates for every row of `queries`, best first. Candidates scoring 0
+    and, given ids, a query's own row are left out.
+    """
+    block_bytes = block_bytes or settings.SIMILARITY['BLOCK_BYTES']
+    if not len(queries) or not len(candidates):
+        return
+    k = min(k, len(candidates))
+    query_sizes = queries.sum(axis=1)
+    candidate_sizes = candidates.sum(axis=1)
+    own_column = None
+    if query_ids is not None and candidate_ids is not None:
+        columns = {candidate_id: column for column, candidate_id in enumerate(candidate_ids)}
+        own_column = np.array([columns.get(query_id, -1) for query_id in query_ids])
+
+    block = max(1, block_bytes // (4 * len(candidates)))
+    for start in range(0, len(queries), block):
+        stop = min(start + block, len(queries))
+        # Updated in place: each full-size temporary costs as much as the matmul.
+        scores = queries[start:stop] @ candidates.T
+        if metric == 'cosine':
+            denominators = np.sqrt(np.outer(query_sizes[start:stop], candidate_sizes))
+        else:
+            denominators = np.add.outer(query_sizes[start:stop], candidate_sizes)
+            denominators -= scores
+        np.maximum(denominators, 1, out=denominators)  # Empty vectors score 0
+        scores /= denominators
+        if own_column is not None:
+            rows = np.nonzero(own_column[start:stop] >= 0)[0]
+            scores[rows, own_column[start:stop][rows]] = 0
+
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for offset in range(stop - start):
+            keep = top_scores[offset] > 0
+            yield start + offset, top[offset][keep], top_scores[offset][keep]
+
+
+# =============================================================================
+# STORAGE
+# =============================================================================
+
+def mark_dirty(sender, instance, action=None, reverse=False, **kwargs):
+    """Flag the answering user's vector for refresh (m2m_changed/post_delete, connected in signals)."""
+    if reverse or action not in (None, 'post_add', 'post_remove', 'post_clear'):
+        return
+    origin = kwargs.get('origin')
+    if isinstance(origin, User) and origin.pk == instance.user_id:
+        return  # Cascading from User.delete(), which also deletes the vector.
+    mark_users_dirty([instance.user_id])
+
+
+def mark_users_dirty(user_ids):
+    """Flag vectors for refresh; for writes that bypass m2m_changed."""
+    UserChoiceVector.objects.bulk_create(
+        [UserChoiceVector(user_id=user_id, dirty=True) for user_id in user_ids],
+        update_conflicts=True, unique_fields=['user'], update_fields=['dirty'],
+    )
+
+
+def _selected_choices(user_ids=None):
+    links = SelectedChoice.objects.values_list('user_id', 'choice_id')
+    if user_ids is not None:
+        links = links.filter(user_id__in=user_ids)
+    selected = defaultdict(set)
+    for user_id, choice_id in links.iterator(chunk_size=WRITE_BATCH_SIZE):
+        selected[user_id].add(choice_id)
+    return selected
+
+
+def update_vectors(user_ids=None):
+    """Recompute the vectors of `user_ids` (everyone with answers by default). Returns the user ids."""
+    selected = _selected_choices(user_ids)
+    if user_ids is None:
+        # Also clears the vectors of users whose answers are all gone.
+        user_ids = UserChoiceVector.objects.values_list('user_id', flat=True)
+    users = set(selected) | set(user_ids)
+    UserChoiceVector.objects.bulk_create(
+        [
+            UserChoiceVector(user_id=user_id, bits=pack(selected.get(user_id)),
+                             choice_count=len(selected.get(user_id, ())), dirty=False)
+            for user_id in users
+        ],
+        batch_size=WRITE_BATCH_SIZE, update_conflicts=True, unique_fields=['user'],
+        update_fields=['bits', 'choice_count', 'updated_at'],  # dirty is cleared by the caller, before reading
+    )
+    return users
+
+
+def _candidates():
+    """(user ids, packed rows) of users that have answers and at least one public explanation."""
+    public = Explanation.objects.filter(visibility='public').values('user_id')
+    rows = UserChoiceVector.objects.filter(choice_count__gt=0, user_id__in=public).values_list('user_id', 'bits')
+    ids, bits = [], []
+    for user_id, row in rows.iterator(chunk_size=WRITE_BATCH_SIZE):
+        ids.append(user_id)
+        bits.append(bytes(row))
+    return ids, bits
+
+
+def update_neighbors(user_ids, candidates=None):
+    """Recompute the stored neighbors of `user_ids`. Returns the number of neighbor rows written."""
+    config = settings.SIMILARITY
+    candidate_ids, candidate_bits = candidates or _candidates()
+    queries = list(
+        UserChoiceVector.objects.filter(user_id__in=user_ids, choice_count__gt=0).values_list('user_id', 'bits')
+    )
+    query_ids = [user_id for user_id, _ in queries]
+    width = max([len(row) for _, row in queries] + [len(row) for row in candidate_bits] + [0])
+    neighbors = [
+        PeerNeighbor(user_id=query_ids[index], neighbor_id=candidate_ids[column], score=float(score), rank=rank)
+        for index, columns, scores in top_neighbors(
+            unpack([bytes(row) for _, row in queries], width), unpack(candidate_bits, width),
+            config['NEIGHBORS'], config['METRIC'], query_ids, candidate_ids,
+        )
+        for rank, (column, score) in enumerate(zip(columns, scores), start=1)
+    ]
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        for start in range(0, len(user_ids), WRITE_BATCH_SIZE):
+            PeerNeighbor.objects.filter(user_id__in=user_ids[start:start + WRITE_BATCH_SIZE]).delete()
+        PeerNeighbor.objects.bulk_create(neighbors, batch_size=WRITE_BATCH_SIZE)
+    return len(neighbors)
+
+
+def refresh_dirty(limit=None):
+    """Refresh up to `limit` dirty users' vectors and neighbors. Returns the number refreshed."""
+    limit = limit or settings.SIMILARITY['REFRESH_LIMIT']
+    user_ids = list(UserChoiceVector.objects.filter(dirty=True).values_list('user_id', flat=True)[:limit])
+    if not user_ids:
+        return 0
+    # Changes made while this runs mark the user dirty again for the next run.
+    UserChoiceVector.objects.filter(user_id__in=user_ids).update(dirty=False)
+    update_vectors(user_ids)
+    update_neighbors(user_ids)
+    return len(user_ids)
+
+
+def rebuild(block_users=20000):
+    """Recompute every vector and every user's neighbors. Returns (users, neighbor rows)."""
+    UserChoiceVector.objects.update(dirty=False)
+    users = sorted(update_vectors(), key=str)
+    candidates = _candidates()
+    written = 0
+    for start in range(0, len(users), block_users):
+        written += update_neighbors(users[start:start + block_users], candidates)
+    return len(users), written
+
+
+# =============================================================================
+# SERVING
+# =============================================================================
+
+def similar_explanations(user, question_key=None, limit=50):
+    """Public explanations by `user`'s stored neighbors, most similar first (annotated with `similarity`)."""
+    scores = dict(PeerNeighbor.objects.filter(user=user).values_list('neighbor_id', 'score'))
+    if not scores:
+        return Explanation.objects.none()
+    explanations = Explanation.objects.filter(user_id__in=scores, visibility='public').annotate(
+        similarity=Case(*[When(user_id=user_id, then=Value(score)) for user_id, score in scores.items()],
+                        output_field=FloatField()),
+    )
+    if question_key:
+        explanations = explanations.filter(question_response__main_question__key=question_key)
+    return explanations.order_by('-similarity', '-created_at')[:limit]
@@ -0,0 +1,186 @@
+"""
+Immutable, content-hashed versions of a user's care plan.
+
+A PlanSnapshot is a manifest of [question key, digest] pairs in plan order.
+Each digest is the SHA-256 of that question's canonical JSON: choices by
+key, explanations by id, with volatile counts and timestamps left out.
+Question payloads are stored once per user as PlanBlobs, so a new version
+only writes the questions that changed. Two versions are diffed by
+comparing their manifests and loading just the blobs that differ.
+
+A version is taken when a member affirms the plan and whenever the current
+version is asked for. Whether the plan changed since the latest version is
+read off the sync change log, so an unchanged plan is never walked again.
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+
+from .models import ChangeLogEntry, TeamMembership, PlanBlob, PlanSnapshot
+from .plans import plan_queryset, media_link
+from .sync import current_token
+
+# Sync collections whose changes alter the plan content.
+PLAN_COLLECTIONS = ('question_responses', 'checkpoint_responses', 'explanations')
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def question_payload(response):
+    """The canonical content of one QuestionResponse loaded by plan_queryset."""
+    return {
+        'question': response.main_question.key,
+        'isComplete': response.is_complete,
+        'checkpoints': {
+            str(cr.checkpoint.checkpoint_number): sorted(choice.key for choice in cr.selected_choices.all())
+            for cr in response.checkpoint_responses.all()
+        },
+        'explanations': {
+            str(explanation.pk): {
+                'type': explanation.explanation_type,
+                'text': explanation.text_content,
+                'description': explanation.description,
+                'mediaUrl': media_link(explanation),
+                'visibility': explanation.visibility,
+            }
+            for explanation in response.explanations.all()
+        },
+    }
+
+
+def latest_snapshot(user):
+    return PlanSnapshot.objects.filter(user=user).order_by('-version').first()
+
+
+def take_snapshot(user, reason='change'):
+    """Return the current version of `user`'s plan, writing a new one only if the plan changed."""
+    latest = latest_snapshot(user)
+    if latest is not None and not ChangeLogEntry.objects.filter(
+        audience=user.pk, id__gt=latest.sync_token, model__in=PLAN_COLLECTIONS,
+    ).exists():
+        return latest
+
+    # Read the token first: anything changed while the plan loads is after it.
+    token = current_token()
+    manifest, blobs = [], {}
+    for response in plan_queryset(user):
+        data = canonical(question_payload(response))
+        digest = _sha256(data)
+        manifest.append([response.main_question.key, digest])
+        blobs[digest] = data
+    digest = _sha256(canonical(manifest))
+    if latest is not None and latest.digest == digest:
+        # Only volatile fields changed: same version, checked up to the new token.
+        PlanSnapshot.objects.filter(pk=latest.pk).update(sync_token=token)
+        return latest
+
+    try:
+        with transaction.atomic():
+            stored = set(PlanBlob.objects.filter(user=user, digest__in=blobs).values_list('digest', flat=True))
+            PlanBlob.objects.bulk_create(
+                [PlanBlob(user=user, digest=blob_digest, data=data) for blob_digest, data in blobs.items()
+                 if blob_digest not in stored],
+                ignore_conflicts=True,
+            )
+            return PlanSnapshot.objects.create(
+                user=user, version=(latest.version if latest else 0) + 1, digest=digest,
+                manifest=manifest, sync_token=token, reason=reason,
+            )
+    except IntegrityError:
+        # A concurrent request wrote this version first.
+        return latest_snapshot(user)
+
+
+def snapshot_affirmation(sender, instance, raw=False, **kwargs):
+    """Record the plan version a member affirms (post_save on TeamMembership, connected in signals)."""
+    # _was_affirmed is set in pre_save by realtime.remember_affirmation.
+    if raw or not instance.has_affirmed or getattr(instance, '_was_affirmed', False):
+        return
+    snapshot = take_snapshot(instance.care_team.owner, reason='affirmation')
+    TeamMembership.objects.filter(pk=instance.pk).update(affirmed_snapshot=snapshot)
+    instance.affirmed_snapshot = snapshot
+
+
+# =============================================================================
+# DIFFS
+# =============================================================================
+
+def _question_diff(before, after):
+    diff = {}
+    if before['isComplete'] != after['isComplete']:
+        diff['isComplete'] = after['isComplete']
+    checkpoints = {}
+    for number in sorted(set(before['checkpoints']) | set(after['checkpoints']), key=int):
+        old, new = set(before['checkpoints'].get(number, ())), set(after['checkpoints'].get(number, ()))
+        if old != new:
+            checkpoints[number] = {'added': sorted(new - old), 'removed': sorted(old - new)}
+    if checkpoints:
+        diff['checkpoints'] = checkpoints
+    old, new = before['explanations'], after['explanations']
+    explanations = {
+        'added': sorted(int(pk) for pk in set(new) - set(old)),
+        'removed': sorted(int(pk) for pk in set(old) - set(new)),
+        'changed': sorted(int(pk) for pk in set(old) & set(new) if old[pk] != new[pk]),
+    }
+    if any(explanations.values()):
+        diff['explanations'] = explanations
+    return diff
+
+
+def diff_snapshots(old, new):
+    """Per-question changes from snapshot `old` to `new` of the same user, in `new`'s plan order."""
+    before, after = dict(old.manifest), dict(new.manifest)
+    keys = [key for key, _ in new.manifest] + [key for key, _ in old.manifest if key not in after]
+    changed = [key for key in keys if before.get(key) != after.get(key)]
+    if not changed:
+        return []
+    digests = {before.get(key) for key in changed} | {after.get(key) for key in changed}
+    blobs = {
+        digest: json.loads(bytes(data))
+        for digest, data in PlanBlob.objects.filter(user_id=new.user_id, digest__in=digests - {None})
+        .values_list('digest', 'data')
+    }
+    changes = []
+    for key in changed:
+        if key not in before:
+            changes.append({'question': key, 'status': 'added'})
+        elif key not in after:
+            changes.append({'question': key, 'status': 'removed'})
+        else:
+            changes.append({
+                'question': key, 'status': 'changed', **_question_diff(blobs[before[key]], blobs[after[key]]),
+            })
+    return changes
+
+
+def affirmation_diffs(user):
+    """The current plan version and, for each member who affirmed it, what changed since."""
+    current = take_snapshot(user)
+    memberships = (
+        TeamMembership.objects.filter(care_team__owner=user, has_affirmed=True)
+        .select_related('user', 'affirmed_snapshot').order_by('affirmed_at')
+    )
+    # Members usually affirm the same few versions: diff each version once.
+    diffs = {None: None}
+    members = []
+    for membership in memberships:
+        snapshot = membership.affirmed_snapshot
+        if snapshot is not None and snapshot.pk not in diffs:
+            diffs[snapshot.pk] = diff_snapshots(snapshot, current)
+        members.append({
+            'membership': membership.pk,
+            'user': str(membership.user_id),
+            'name': membership.user.get_full_name() or membership.user.email,
+            'affirmedAt': membership.affirmed_at,
+            # Affirmations from before versions were kept have no known version.
+            'affirmedVersion': snapshot.version if snapshot else None,
+            'changes': diffs[snapshot.pk if snapshot else None],
+        })
+    return {'version': current.version, 'digest': current.digest, 'members': members}
@@ -0,0 +1,194 @@
+"""Delta sync: change log recording and the payload builder behind /api/sync/."""
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from .models import (
+    Section, MainQuestion, Checkpoint, Choice, QuestionResponse, CheckpointResponse,
+    Explanation, TeamMembership, ChangeLogEntry,
+)
+from .serializers import (
+    SectionSerializer, MainQuestionSerializer, CheckpointSerializer, CheckpointChoiceSerializer,
+    QuestionResponseSerializer, CheckpointResponseSerializer, ExplanationSerializer,
+    TeamMembershipSerializer,
+)
+from .plans import selected_choices_prefetch
+
+# Maximum change log entries consumed per sync call; clients page with has_more.
+SYNC_PAGE_SIZE = 2000
+
+# Change log ids are the sync tokens, so entries must become visible in id
+# order: a client holding token N must never later find a new entry below N.
+# PostgreSQL hands out ids before commit, so writers hold this
+# transaction-level advisory lock from their first entry until they commit;
+# SQLite already lets one writer at a time in.
+CHANGE_LOG_LOCK = 0x6177666d_73796e63  # 'awfmsync'
+
+
+class SyncedModel:
+    """How one model is exposed through the sync API."""
+
+    def __init__(self, name, model, serializer_class, audience=None, scope=None, prefetch=(),
+                 audience_lookups=()):
+        self.name = name
+        self.model = model
+        self.serializer_class = serializer_class
+        self._audience = audience
+        self._scope = scope
+        self.prefetch = prefetch
+        # values_list() lookups giving the same audiences, for bulk updates
+        self.audience_lookups = audience_lookups
+
+    def audiences(self, instance):
+        """User ids that should receive changes to `instance` (None = everyone)."""
+        return self._audience(instance) if self._audience else [None]
+
+    def queryset(self, user):
+        queryset = self.model.objects.prefetch_related(*self.prefetch)
+        return self._scope(queryset, user) if self._scope else queryset
+
+
+SYNCED_MODELS = [
+    SyncedModel('sections', Section, SectionSerializer),
+    SyncedModel('questions', MainQuestion, MainQuestionSerializer),
+    SyncedModel('checkpoints', Checkpoint, CheckpointSerializer),
+    SyncedModel('choices', Choice, CheckpointChoiceSerializer),
+    SyncedModel(
+        'question_responses', QuestionResponse, QuestionResponseSerializer,
+        audience=lambda obj: [obj.user_id],
+        scope=lambda qs, user: qs.filter(user=user),
+        audience_lookups=('user_id',),
+    ),
+    SyncedModel(
+        'checkpoint_responses', CheckpointResponse, CheckpointResponseSerializer,
+        audience=lambda obj: [obj.user_id],
+        scope=lambda qs, user: qs.filter(user=user).prefetch_related(selected_choices_prefetch(user)),
+        audience_lookups=('user_id',),
+    ),
+    SyncedModel(
+        'explanations', Explanation, ExplanationSerializer,
+        audience=lambda obj: [obj.user_id],
+        scope=lambda qs, user: qs.filter(user=user),
+        audience_lookups=('user_id',),
+    ),
+    SyncedModel(
+        'team_memberships', TeamMembership, TeamMembershipSerializer,
+        audience=lambda obj: {obj.user_id, obj.care_team.owner_id},
+        scope=lambda qs, user: qs.filter(Q(user=user) | Q(care_team__owner=user)),
+        audience_lookups=('user_id', 'care_team__owner_id'),
+    ),
+]
+SYNCED_BY_MODEL = {synced.model: synced for synced in SYNCED_MODELS}
+
+
+def _lock_change_log():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGE_LOG_LOCK])
+
+
+def _write_entries(entries):
+    with transaction.atomic():
+        _lock_change_log()
+        ChangeLogEntry.objects.bulk_create(entries)
+
+
+def record_change(instance, action):
+    """Append change log entries for `instance` once the transaction commits."""
+    synced = SYNCED_BY_MODEL[type(instance)]
+    object_id = str(instance.pk)
+    # Resolve audiences now: after a delete commits, parent rows may be gone.
+    audiences = synced.audiences(instance)
+
+    def write():
+        _write_entries([
+            ChangeLogEntry(audience=audience, model=synced.name, object_id=object_id, action=action)
+            for audience in audiences
+        ])
+
+    # Writing after commit keeps the change log lock out of the caller's transaction.
+    transaction.on_commit(write)
+
+
+def record_bulk_change(queryset, action='upsert', chunk_size=2000):
+    """
+    Log changes for every row of `queryset`, for writes that bypass signals
+    such as QuerySet.update(). Call it after the write, in the same
+    transaction and close to its commit: other change log writers wait for
+    that commit.
+    """
+    synced = SYNCED_BY_MODEL[queryset.model]
+    lookups = synced.audience_lookups
+    batch = []
+    for row in queryset.order_by().values_list('pk', *lookups).iterator(chunk_size=chunk_size):
+        audiences = set(row[1:]) if lookups else {None}
+        batch.extend(
+            ChangeLogEntry(audience=audience, model=synced.name, object_id=str(row[0]), action=action)
+            for audience in audiences
+        )
+        if len(batch) >= chunk_size:
+            _write_entries(batch)
+            batch = []
+    if batch:
+        _write_entries(batch)
+
+
+def current_token():
+    return ChangeLogEntry.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def _serialize(synced, user, pks=None):
+    queryset = synced.queryset(user)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return synced.serializer_class(queryset, many=True).data
+
+
+def build_sync_payload(user, since=None):
+    """
+    Return everything `user` needs to catch up from token `since`.
+
+    With no token the full current state is returned. Otherwise only rows
+    with change log entries after the token are read, collapsed to their
+    latest action, and deletions are reported as tombstones.
+    """
+    if since is None:
+        # Take the token first so changes made while reading are re-sent.
+        token = current_token()
+        return {
+            'token': str(token),
+            'full': True,
+            'has_more': False,
+            'changes': {synced.name: _serialize(synced, user) for synced in SYNCED_MODELS},
+            'deleted': {},
+        }
+
+    entries = list(
+        ChangeLogEntry.objects
+        .filter(Q(audience__isnull=True) | Q(audience=user.pk), id__gt=since)
+        .order_by('id')
+        .values_list('id', 'model', 'object_id', 'action')[:SYNC_PAGE_SIZE]
+    )
+    latest = {}
+    for _, name, object_id, action in entries:
+        latest[(name, object_id)] = action
+
+    changes, deleted = {}, {}
+    for synced in SYNCED_MODELS:
+        upserted = [oid for (name, oid), action in latest.items() if name == synced.name and action == 'upsert']
+        removed = [oid for (name, oid), action in latest.items() if name == synced.name and action == 'delete']
+        if upserted:
+            rows = _serialize(synced, user, upserted)
+            changes[synced.name] = rows
+            # Rows that vanished (or left the user's scope) since being logged.
+            present = {str(row['id']) for row in rows}
+            removed += [oid for oid in upserted if oid not in present]
+        if removed:
+            deleted[synced.name] = [synced.model._meta.pk.to_python(oid) for oid in removed]
+
+    return {
+        'token': str(entries[-1][0] if entries else since),
+        'full': False,
+        'has_more': len(entries) == SYNC_PAGE_SIZE,
+        'changes': changes,
+        'deleted': deleted,
+    }
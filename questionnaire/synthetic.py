@@ -0,0 +1,89 @@
+"""Synthetic user histories for benchmark commands (never used on real data paths)."""
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import (
+    User, Section, MainQuestion, Checkpoint, Choice, QuestionResponse, CheckpointResponse, SelectedChoice, Explanation
+)
+
+BATCH_SIZE = 5000
+
+
+def generate_questions(count, choices_per_checkpoint=4):
+    """Add `count` synthetic main questions (3 checkpoints each) in a 'bench' section."""
+    section, _ = Section.objects.get_or_create(key='bench', defaults={'title': 'BENCHMARK', 'order': 999})
+    offset = MainQuestion.objects.filter(section=section).count()
+    questions = MainQuestion.objects.bulk_create([
+        MainQuestion(section=section, key=f'bench{offset + n}', title=f'Synthetic question {offset + n}',
+                     order=1000 + offset + n)
+        for n in range(count)
+    ])
+    checkpoints = Checkpoint.objects.bulk_create([
+        Checkpoint(main_question=question, checkpoint_number=number, checkpoint_type=checkpoint_type,
+                   title=f'Checkpoint {number}', order=number)
+        for question in questions
+        for number, checkpoint_type in enumerate(['position', 'challenges', 'change'], start=1)
+    ])
+    Choice.objects.bulk_create([
+        Choice(checkpoint=checkpoint, key=f'{checkpoint.main_question.key}_cp{checkpoint.checkpoint_number}_{n}',
+               title=f'Synthetic choice {n}', description='Synthetic description ' * 10, order=n)
+        for checkpoint in checkpoints
+        for n in range(1, choices_per_checkpoint + 1)
+    ], batch_size=BATCH_SIZE)
+    return questions
+
+
+def generate_users(count, answered=None, explanations=True, seed=None, prefix='bench'):
+    """
+    Bulk-create `count` users with responses to `answered` questions each
+    (all seeded questions by default). Returns the list of created user ids.
+
+    Requires seed_data to have run so there are checkpoints and choices.
+    """
+    rng = random.Random(seed)
+    questions = list(MainQuestion.objects.prefetch_related('checkpoints__choices'))
+    if answered is not None:
+        questions = questions[:answered]
+    password = make_password(None)
+
+    user_ids = []
+    with transaction.atomic():
+        for start in range(0, count, BATCH_SIZE):
+            users = []
+            for n in range(start, min(start + BATCH_SIZE, count)):
+                user_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+                users.append(User(
+                    id=user_id, email=f'{prefix}-{user_id.hex}@example.org',
+                    username=f'{prefix}-{user_id.hex}', password=password,
+                ))
+            User.objects.bulk_create(users)
+            user_ids.extend(user.id for user in users)
+
+            question_responses = QuestionResponse.objects.bulk_create([
+                QuestionResponse(user=user, main_question=question, is_complete=True)
+                for user in users for question in questions
+            ])
+            checkpoint_responses = []
+            for qr in question_responses:
+                for checkpoint in qr.main_question.checkpoints.all():
+                    checkpoint_responses.append(CheckpointResponse(question_response=qr, user=qr.user, checkpoint=checkpoint))
+            CheckpointResponse.objects.bulk_create(checkpoint_responses)
+
+            links = []
+            for cr in checkpoint_responses:
+                choices = list(cr.checkpoint.choices.all())
+                if choices:
+                    for choice in rng.sample(choices, rng.randint(1, min(2, len(choices)))):
+                        links.append(SelectedChoice(checkpointresponse_id=cr.pk, choice_id=choice.pk, user_id=cr.user_id))
+            SelectedChoice.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+            if explanations:
+                Explanation.objects.bulk_create([
+                    Explanation(user=qr.user, question_response=qr, explanation_type='text',
+                                text_content='Synthetic explanation ' * 20)
+                    for qr in question_responses
+                ], batch_size=BATCH_SIZE)
+    return user_ids
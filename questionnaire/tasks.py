@@ -0,0 +1,93 @@
+"""Celery tasks for the questionnaire app (discovered by awfm.celery)."""
+from celery import shared_task
+from django.conf import settings
+
+from . import audit, erasure, images, notifications, retention, similarity
+from .models import ErasureRequest
+
+
+@shared_task(ignore_result=True)
+def process_notifications():
+    """Fan out new events, close due digests and hand them to send_digests in batches (run by beat)."""
+    while notifications.fan_out():
+        pass
+    digest_ids = notifications.collect_due() + notifications.stalled_digest_ids()
+    size = settings.NOTIFICATIONS['BATCH_SIZE']
+    for start in range(0, len(digest_ids), size):
+        send_digests.delay(digest_ids[start:start + size])
+    notifications.prune()
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=5)
+def send_digests(self, digest_ids):
+    try:
+        notifications.deliver(digest_ids)
+    except Exception as exc:
+        raise self.retry(exc=exc, countdown=60 * 2 ** self.request.retries)
+
+
+@shared_task(ignore_result=True)
+def archive_ai_interactions():
+    """Move AI interactions past the hot window to the archive and purge expired ones (run by beat)."""
+    retention.archive_ai_interactions()
+
+
+@shared_task(ignore_result=True)
+def refresh_similarity():
+    """Recompute vectors and neighbors of users whose answers changed (run by beat)."""
+    similarity.refresh_dirty()
+
+
+@shared_task(ignore_result=True)
+def rebuild_similarity():
+    """Recompute all vectors and neighbors, picking up new and withdrawn public explanations (run by beat)."""
+    similarity.rebuild()
+
+
+@shared_task(ignore_result=True)
+def start_erasures():
+    """Hand new deletion requests to erase_user (run by beat)."""
+    for erasure_id in erasure.claim_new_requests():
+        try:
+            erase_user.delay(erasure_id)
+        except Exception:
+            erasure.release_claim(erasure_id)
+            raise
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=3)
+def erase_user(self, erasure_id):
+    """Carry out an ErasureRequest; a retry resumes where the failed run stopped."""
+    request = ErasureRequest.objects.get(pk=erasure_id)
+    if request.status == 'done':
+        return
+    try:
+        erasure.erase(request)
+    except Exception as exc:
+        raise self.retry(exc=exc, countdown=60 * 2 ** self.request.retries)
+
+
+@shared_task(ignore_result=True)
+def delete_erased_media():
+    """Retry media deletions of erased users and finish their requests (run by beat)."""
+    erasure.delete_media()
+
+
+@shared_task(ignore_result=True)
+def drain_audit_events():
+    """Move audit events buffered in Redis to the audit table (run by beat)."""
+    sink = audit.get_buffer().sink
+    if isinstance(sink, audit.RedisAuditSink):
+        sink.drain(settings.AUDIT['DRAIN_BATCH_SIZE'])
+
+
+@shared_task(ignore_result=True)
+def ensure_audit_partitions():
+    """Create the coming months' audit partitions (run by beat; PostgreSQL only)."""
+    audit.ensure_partitions()
+
+
+@shared_task(ignore_result=True)
+def process_pending_images():
+    """Fetch and encode new content images and retry failed ones (run by beat)."""
+    images.process_pending(settings.IMAGES['BATCH_SIZE'])
@@ -0,0 +1,122 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from questionnaire.admin import CreatedBeforeFilter, LegacyResponseAdmin, QuestionResponseAdmin
+from questionnaire.models import (
+    AIInteraction, AIUsageTotal, ChangeLogEntry, Explanation, LegacyChoice, LegacyMainScreenQuestion, LegacyQuestion,
+    LegacyResponse, PeerNeighbor,
+    QuestionResponse, User, UserChoiceVector,
+)
+from questionnaire.synthetic import generate_users
+
+
+# The manifest only exists after collectstatic.
+@override_settings(STORAGES={
+    **settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class AdminTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='pw')
+        cls.user_ids = generate_users(5, answered=1, seed=1, prefix='admin')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+
+class CreatedBeforeFilterTests(AdminTestCase):
+    def older_link(self, response):
+        changelist = response.context['cl']
+        spec, = [spec for spec in changelist.filter_specs if isinstance(spec, CreatedBeforeFilter)]
+        links = [choice for choice in spec.choices(changelist) if choice['display'] == 'Older than this page']
+        return links[0]['query_string'] if links else None
+
+    @mock.patch.object(QuestionResponseAdmin, 'list_per_page', 2)
+    def test_pages_follow_created_at_and_id_without_offsets(self):
+        # Equal timestamps: the id breaks the tie between pages.
+        QuestionResponse.objects.update(created_at=timezone.now())
+        seen, query = [], ''
+        for _ in range(5):
+            response = self.client.get(f'/admin/questionnaire/questionresponse/{query}')
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row.pk for row in response.context['cl'].result_list)
+            query = self.older_link(response)
+            if query is None:
+                break
+        expected = list(QuestionResponse.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_no_older_link_when_sorted_by_another_column(self):
+        with mock.patch.object(QuestionResponseAdmin, 'list_per_page', 2):
+            response = self.client.get('/admin/questionnaire/questionresponse/?o=1')
+        self.assertIsNone(self.older_link(response))
+
+
+class BulkActionTests(AdminTestCase):
+    def test_changes_are_logged_once_committed_and_peers_refreshed(self):
+        explanations = list(Explanation.objects.filter(visibility='care_team').values_list('pk', flat=True))
+        peer, owner = self.user_ids[:2]
+        PeerNeighbor.objects.create(user_id=peer, neighbor_id=owner, score=1, rank=1)
+        UserChoiceVector.objects.filter(user_id=peer).update(dirty=False)
+        before = set(ChangeLogEntry.objects.values_list('pk', flat=True))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            # Filtered on the value the action changes: the rows leave the queryset.
+            response = self.client.post('/admin/questionnaire/explanation/?visibility__exact=care_team', {
+                'action': 'make_private', '_selected_action': explanations,
+            })
+            self.assertEqual(response.status_code, 302)
+            self.assertFalse(ChangeLogEntry.objects.exclude(pk__in=before).exists())
+        for callback in callbacks:
+            callback()
+
+        logged = ChangeLogEntry.objects.exclude(pk__in=before).filter(model='explanations')
+        self.assertEqual(sorted(int(pk) for pk in logged.values_list('object_id', flat=True)), sorted(explanations))
+        self.assertFalse(Explanation.objects.filter(pk__in=explanations).exclude(visibility='private').exists())
+        self.assertTrue(UserChoiceVector.objects.get(user_id=peer).dirty)
+
+    def test_rows_already_set_are_left_alone(self):
+        Explanation.objects.update(visibility='private')
+        before = set(ChangeLogEntry.objects.values_list('pk', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/questionnaire/explanation/', {
+                'action': 'make_private', '_selected_action': list(Explanation.objects.values_list('pk', flat=True)),
+            })
+        self.assertFalse(ChangeLogEntry.objects.exclude(pk__in=before).exists())
+
+
+class LegacyAdminTests(AdminTestCase):
+    def test_legacy_changelists_and_response_pages(self):
+        question = LegacyQuestion.objects.create(key='q1', title='Q1', subtitle='', checkpoint_label='')
+        choice = LegacyChoice.objects.create(question=question, choice_id='c1', title='C1', subtitle='', description='')
+        LegacyMainScreenQuestion.objects.create(title='Main', subtitle='', section_label='')
+        for n in range(3):
+            LegacyResponse.objects.create(user_id=f'client-{n}', question=question).selected_choices.add(choice)
+        for model in ('legacymainscreenquestion', 'legacyquestion', 'legacychoice', 'legacyresponse'):
+            self.assertEqual(self.client.get(f'/admin/questionnaire/{model}/').status_code, 200, model)
+
+        with mock.patch.object(LegacyResponseAdmin, 'list_per_page', 2):
+            response = self.client.get('/admin/questionnaire/legacyresponse/')
+            changelist = response.context['cl']
+            spec, = [spec for spec in changelist.filter_specs if isinstance(spec, CreatedBeforeFilter)]
+            older, = [choice for choice in spec.choices(changelist) if choice['display'] == 'Older than this page']
+            response = self.client.get(f'/admin/questionnaire/legacyresponse/{older["query_string"]}')
+        self.assertEqual([row.user_id for row in response.context['cl'].result_list], ['client-0'])
+
+        response = self.client.get(f'/admin/questionnaire/legacyresponse/{LegacyResponse.objects.first().pk}/change/')
+        self.assertEqual(response.status_code, 200)
+
+
+class UserAdminTests(AdminTestCase):
+    def test_change_page_shows_lifetime_ai_usage(self):
+        user = User.objects.get(pk=self.user_ids[0])
+        AIUsageTotal.objects.create(user=user, interactions=2, tokens_used=1500)
+        AIInteraction.objects.create(user=user, interaction_type='summarize', prompt='p', response='r', tokens_used=40)
+        response = self.client.get(f'/admin/questionnaire/user/{user.pk}/change/')
+        self.assertContains(response, '1,540 tokens in 3 interactions')
@@ -0,0 +1,91 @@
+import uuid
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from questionnaire import audit
+from questionnaire.models import AuditEvent
+
+
+def make_event(n):
+    return {
+        'occurred_at': timezone.now().isoformat(), 'actor': str(uuid.uuid4()), 'action': 'phi_viewed',
+        'object_type': 'plan', 'object_id': str(n), 'owner': str(uuid.uuid4()), 'ip': '127.0.0.1',
+        'event_id': uuid.uuid4().hex,
+    }
+
+
+@override_settings(AUDIT={
+    **settings.AUDIT, 'ENABLED': True, 'SINK': {'BACKEND': 'questionnaire.audit.DatabaseAuditSink'},
+})
+class AuditChainTests(TestCase):
+    def setUp(self):
+        # A buffer of its own, without the events other tests left in the shared one.
+        patcher = mock.patch.object(audit, '_buffer', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.events = [make_event(n) for n in range(5)]
+        audit.append_events(self.events)
+
+    def tamper(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Dropped for this test's transaction only; see test_postgres_refuses_changes.
+                cursor.execute('ALTER TABLE questionnaire_auditevent DISABLE TRIGGER audit_append_only')
+            cursor.execute(sql, params)
+
+    def verify_command(self):
+        out = StringIO()
+        call_command('verify_audit_log', stdout=out)
+        return out.getvalue()
+
+    def test_intact_chain_verifies(self):
+        self.assertEqual(audit.verify_chain(), (5, None))
+        self.assertIn('5 audit events checked, chain intact', self.verify_command())
+
+    def test_recorded_events_are_chained_on_flush(self):
+        audit.record(None, 'phi_exported', 'plan', ['a', 'b'], owner=uuid.uuid4(), actor=uuid.uuid4())
+        audit.get_buffer().flush()
+        rows = AuditEvent.objects.filter(id__gt=5).order_by('id').values_list('id', 'object_id')
+        self.assertEqual(list(rows), [(6, 'a'), (7, 'b')])
+        self.assertEqual(audit.verify_chain(), (7, None))
+
+    def test_redelivered_events_are_skipped(self):
+        self.assertEqual(audit.append_events(self.events[3:] + [make_event(5)])[0].id, 6)
+        self.assertEqual(AuditEvent.objects.count(), 6)
+        self.assertEqual(audit.verify_chain(), (6, None))
+
+    def test_changed_row_is_reported(self):
+        self.tamper('UPDATE questionnaire_auditevent SET object_id = %s WHERE id = %s', ['tampered', 3])
+        self.assertEqual(audit.verify_chain(), (2, 3))
+        with self.assertRaisesMessage(CommandError, 'Audit chain broken at event #3 after 2 intact events.'):
+            self.verify_command()
+
+    def test_removed_row_is_reported(self):
+        self.tamper('DELETE FROM questionnaire_auditevent WHERE id = %s', [2])
+        self.assertEqual(audit.verify_chain(), (1, 2))
+        with self.assertRaisesMessage(CommandError, 'Audit chain broken at event #2'):
+            self.verify_command()
+
+    def test_removed_last_row_is_reported(self):
+        self.tamper('DELETE FROM questionnaire_auditevent WHERE id = %s', [5])
+        self.assertEqual(audit.verify_chain(), (4, 5))
+
+    def test_check_can_start_after_a_trusted_event(self):
+        self.tamper('UPDATE questionnaire_auditevent SET object_id = %s WHERE id = %s', ['tampered', 2])
+        self.assertEqual(audit.verify_chain(after_id=2), (3, None))
+        with self.assertRaisesMessage(CommandError, 'No audit event #9.'):
+            call_command('verify_audit_log', '--after', '9', stdout=StringIO())
+
+    @skipUnless(connection.vendor == 'postgresql', 'The append-only trigger is PostgreSQL-only')
+    def test_postgres_refuses_changes(self):
+        for sql in ("UPDATE questionnaire_auditevent SET object_id = 'x' WHERE id = 1",
+                    'DELETE FROM questionnaire_auditevent WHERE id = 1'):
+            with self.subTest(sql=sql), self.assertRaises(DatabaseError), transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from questionnaire.authentication import user_cache
+from questionnaire.models import User
+
+
+class TokenTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(email='member@example.com', username='member', password='pw')
+
+    def obtain(self):
+        response = self.client.post('/api/auth/token/', {'email': 'member@example.com', 'password': 'pw'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token})
+
+    def get_plan(self, access):
+        return self.client.get('/api/me/plan/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_rotated_refresh_token_is_rejected(self):
+        tokens = self.obtain()
+        rotated = self.refresh(tokens['refresh'])
+        self.assertEqual(rotated.status_code, 200)
+        self.assertNotEqual(rotated.json()['refresh'], tokens['refresh'])
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(rotated.json()['refresh']).status_code, 200)
+
+    def test_logout_revokes_both_tokens(self):
+        tokens = self.obtain()
+        self.assertEqual(self.get_plan(tokens['access']).status_code, 200)
+        response = self.client.post('/api/auth/logout/', {'refresh': tokens['refresh']},
+                                    HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_plan(tokens['access']).status_code, 401)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_tampered_token_does_not_consume_the_valid_one(self):
+        tokens = self.obtain()
+        header, payload, signature = tokens['refresh'].split('.')
+        tampered = f'{header}.{payload}.{signature[:-4]}AAAA'
+        self.assertEqual(self.refresh(tampered).status_code, 401)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 200)
+
+    def test_refused_refresh_does_not_consume_the_token(self):
+        tokens = self.obtain()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 200)
+
+    def test_deactivated_user_is_dropped_from_the_user_cache(self):
+        tokens = self.obtain()
+        self.assertEqual(self.get_plan(tokens['access']).status_code, 200)
+        self.assertIsNotNone(user_cache.get(str(self.user.pk)))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(user_cache.get(str(self.user.pk)))
+        self.assertEqual(self.get_plan(tokens['access']).status_code, 401)
+
+    def test_deleted_user_is_dropped_from_the_user_cache(self):
+        tokens = self.obtain()
+        self.get_plan(tokens['access'])
+        self.user.delete()
+        self.assertIsNone(user_cache.get(str(self.user.pk)))
+        self.assertEqual(self.get_plan(tokens['access']).status_code, 401)
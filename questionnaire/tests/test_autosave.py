@@ -0,0 +1,164 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from rest_framework import status
+from rest_framework.response import Response as DRFResponse
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.views import APIView
+
+from questionnaire import views
+from questionnaire.autosave import coalesce
+from questionnaire.idempotency import idempotent
+from questionnaire.models import Checkpoint, CheckpointResponse, QuestionResponse, SelectedChoice, User
+
+
+class ResponseOpsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.user = User.objects.create_user(email='saver@example.com', username='saver', password='pw')
+        checkpoint = Checkpoint.objects.filter(choices__isnull=False).select_related('main_question').first()
+        cls.question = checkpoint.main_question.key
+        cls.c1, cls.c2, cls.c3 = checkpoint.choices.order_by('order').values_list('pk', flat=True)[:3]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def post(self, ops, key, client='phone'):
+        return self.client.post('/api/responses/ops/', {'client': client, 'ops': ops}, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def selected(self):
+        return set(SelectedChoice.objects.filter(user=self.user).values_list('choice_id', flat=True))
+
+    def test_batch_is_coalesced_in_seq_order(self):
+        response = self.post([
+            {'seq': 3, 'op': 'remove', 'choice': self.c1},
+            {'seq': 1, 'op': 'add', 'choice': self.c1},
+            {'seq': 2, 'op': 'add', 'choice': self.c2},
+            {'seq': 4, 'op': 'complete', 'question': self.question},
+        ], 'k1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['applied'], response.data['skipped'], response.data['last_seq']), (4, 0, 4))
+        self.assertEqual(self.selected(), {self.c2})
+        self.assertTrue(QuestionResponse.objects.get(user=self.user, main_question__key=self.question).is_complete)
+        self.assertEqual(CheckpointResponse.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(response.data['checkpoint_responses'][0]['selected_choices'], [self.c2])
+
+    def test_coalesce_keeps_the_last_operation_per_target(self):
+        choices, completions = coalesce([
+            {'seq': 2, 'op': 'remove', 'choice': 1},
+            {'seq': 1, 'op': 'add', 'choice': 1},
+            {'seq': 3, 'op': 'add', 'choice': 2},
+            {'seq': 4, 'op': 'complete', 'question': 'q1', 'value': True},
+            {'seq': 5, 'op': 'complete', 'question': 'q1', 'value': False},
+        ])
+        self.assertEqual(choices, {1: False, 2: True})
+        self.assertEqual(completions, {'q1': False})
+
+    def test_operations_at_or_below_the_cursor_are_skipped(self):
+        self.post([{'seq': 1, 'op': 'add', 'choice': self.c1}, {'seq': 2, 'op': 'remove', 'choice': self.c1}], 'k1')
+        # Resent after a lost response, with one new operation.
+        response = self.post([
+            {'seq': 1, 'op': 'add', 'choice': self.c1},
+            {'seq': 2, 'op': 'remove', 'choice': self.c1},
+            {'seq': 3, 'op': 'add', 'choice': self.c2},
+        ], 'k2')
+        self.assertEqual((response.data['applied'], response.data['skipped'], response.data['last_seq']), (1, 2, 3))
+        self.assertEqual(self.selected(), {self.c2})
+
+        response = self.post([{'seq': 3, 'op': 'add', 'choice': self.c3}], 'k3')
+        self.assertEqual((response.data['applied'], response.data['skipped']), (0, 1))
+        self.assertEqual(self.selected(), {self.c2})
+
+        # Cursors are per client.
+        response = self.post([{'seq': 1, 'op': 'add', 'choice': self.c3}], 'k4', client='tablet')
+        self.assertEqual(response.data['applied'], 1)
+        self.assertEqual(self.selected(), {self.c2, self.c3})
+
+    def test_retry_with_the_same_key_replays_the_stored_response(self):
+        ops = [{'seq': 1, 'op': 'add', 'choice': self.c1}]
+        first = self.post(ops, 'k1')
+        with mock.patch.object(views, 'apply_ops') as apply_ops:
+            retry = self.post(ops, 'k1')
+        apply_ops.assert_not_called()
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+
+    def test_retry_while_the_first_request_runs_is_a_conflict(self):
+        ops = [{'seq': 1, 'op': 'add', 'choice': self.c1}]
+        retries = []
+
+        def retry_meanwhile(*args):
+            retries.append(self.post(ops, 'k1'))
+            return apply_ops(*args)
+
+        apply_ops = views.apply_ops
+        with mock.patch.object(views, 'apply_ops', side_effect=retry_meanwhile):
+            self.assertEqual(self.post(ops, 'k1').status_code, 200)
+        self.assertEqual(retries[0].status_code, 409)
+        self.assertEqual(retries[0]['Retry-After'], '1')
+
+    def test_key_reused_for_a_different_body_is_rejected(self):
+        self.post([{'seq': 1, 'op': 'add', 'choice': self.c1}], 'k1')
+        response = self.post([{'seq': 2, 'op': 'add', 'choice': self.c2}], 'k1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.selected(), {self.c1})
+
+    def test_keys_are_per_user(self):
+        ops = [{'seq': 1, 'op': 'add', 'choice': self.c1}]
+        self.post(ops, 'k1')
+        other = User.objects.create_user(email='other@example.com', username='other', password='pw')
+        self.client.force_authenticate(other)
+        response = self.post(ops, 'k1')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(set(SelectedChoice.objects.filter(user=other).values_list('choice_id', flat=True)), {self.c1})
+
+    def test_key_is_required(self):
+        response = self.client.post('/api/responses/ops/', {'client': 'phone', 'ops': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class FlakyView(APIView):
+    permission_classes = []
+    outcomes = []
+
+    @idempotent
+    def post(self, request):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return DRFResponse({'attempt': outcome}, status=outcome)
+
+
+class IdempotencyReleaseTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post(self):
+        request = APIRequestFactory().post('/flaky/', {'a': 1}, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        return FlakyView.as_view()(request)
+
+    def test_key_is_released_after_a_server_error(self):
+        FlakyView.outcomes = [status.HTTP_503_SERVICE_UNAVAILABLE, status.HTTP_201_CREATED]
+        self.assertEqual(self.post().status_code, 503)
+        retry = self.post()
+        self.assertEqual(retry.status_code, 201)
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+        self.assertEqual(self.post()['Idempotent-Replayed'], 'true')
+
+    def test_key_is_released_after_an_exception(self):
+        FlakyView.outcomes = [RuntimeError('boom'), status.HTTP_201_CREATED]
+        with self.assertRaises(RuntimeError):
+            self.post()
+        self.assertEqual(self.post().status_code, 201)
+
+    def test_client_errors_are_stored(self):
+        FlakyView.outcomes = [status.HTTP_400_BAD_REQUEST]
+        self.assertEqual(self.post().status_code, 400)
+        self.assertEqual(self.post()['Idempotent-Replayed'], 'true')
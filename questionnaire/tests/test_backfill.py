@@ -0,0 +1,201 @@
+import uuid
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from questionnaire import backfill
+from questionnaire.backfill import MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, Backfill, LegacyResponseBackfill, legacy_user_uuid
+from questionnaire.throttling import reset_backend
+from questionnaire.models import (
+    BackfillCheckpoint, CheckpointResponse, LegacyChoice, LegacyQuestion, LegacyResponse, QuestionResponse,
+    SelectedChoice, User,
+)
+
+
+class LegacyWriteThroughTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.question = LegacyQuestion.objects.create(key='q1', title='Q1', subtitle='', checkpoint_label='Checkpoint 1')
+        cls.choice = LegacyChoice.objects.create(question=cls.question, choice_id='1', title='A', subtitle='', description='')
+        cls.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+
+    def post(self, user_id):
+        return self.client.post('/api/responses/', {
+            'user_id': user_id, 'question': self.question.pk, 'selected_choice_ids': [self.choice.pk],
+        }, content_type='application/json')
+
+    def test_client_generated_id_is_mirrored_to_a_placeholder_user(self):
+        self.assertEqual(self.post('device-1').status_code, 201)
+        placeholder = User.objects.get(pk=legacy_user_uuid('device-1'))
+        self.assertFalse(placeholder.is_active)
+        self.assertTrue(placeholder.username.startswith('legacy:'))
+        self.assertEqual(CheckpointResponse.objects.filter(user=placeholder).count(), 1)
+
+    def test_uuid_user_id_is_not_written_into_that_users_plan(self):
+        for user_id in (str(self.user.pk), self.user.pk.hex):
+            self.assertEqual(self.post(user_id).status_code, 201)
+        self.assertEqual(LegacyResponse.objects.count(), 2)
+        self.assertFalse(QuestionResponse.objects.filter(user=self.user).exists())
+        self.assertFalse(CheckpointResponse.objects.filter(user=self.user).exists())
+
+    def test_id_mapping_onto_a_real_account_is_not_mirrored(self):
+        account = User.objects.create_user(
+            email='clash@example.com', username='clash', password='pw', id=uuid.uuid5(
+                uuid.uuid5(uuid.NAMESPACE_URL, 'awfm:legacy-user'), 'device-2',
+            ),
+        )
+        self.assertEqual(self.post('device-2').status_code, 201)
+        self.assertFalse(CheckpointResponse.objects.filter(user=account).exists())
+
+    def test_deleting_a_uuid_keyed_row_leaves_the_users_plan_alone(self):
+        response = self.post(str(self.user.pk)).json()
+        question_response = QuestionResponse.objects.create(user=self.user, main_question_id=1, is_complete=True)
+        self.assertEqual(self.client.delete(f'/api/responses/{response["id"]}/').status_code, 204)
+        question_response.refresh_from_db()
+        self.assertTrue(question_response.is_complete)
+
+    def test_mapping_is_rebuilt_only_after_content_changes(self):
+        with mock.patch.object(backfill, 'LegacyMapping', wraps=backfill.LegacyMapping) as mapping:
+            self.post('device-3')
+            self.post('device-4')
+            self.assertLessEqual(mapping.call_count, 1)
+            mapping.reset_mock()
+            self.choice.save()
+            self.post('device-5')
+            self.assertEqual(mapping.call_count, 1)
+        self.assertEqual(CheckpointResponse.objects.filter(user_id=legacy_user_uuid('device-5')).count(), 1)
+
+    @override_settings(THROTTLE_BUCKETS={**settings.THROTTLE_BUCKETS, 'legacy_user': {'rate': '1/hour', 'burst': 2}})
+    def test_placeholder_users_are_rate_limited(self):
+        reset_backend()
+        self.addCleanup(reset_backend)
+        for user_id in ('device-a', 'device-b', 'device-c'):
+            self.assertEqual(self.post(user_id).status_code, 201)
+        self.assertTrue(User.objects.filter(pk=legacy_user_uuid('device-b')).exists())
+        # Saved to the legacy table only, for backfill_legacy to copy later.
+        self.assertTrue(LegacyResponse.objects.filter(user_id='device-c').exists())
+        self.assertFalse(User.objects.filter(pk=legacy_user_uuid('device-c')).exists())
+        self.assertFalse(CheckpointResponse.objects.filter(user_id=legacy_user_uuid('device-c')).exists())
+
+        # Known client ids keep writing through.
+        CheckpointResponse.objects.filter(user_id=legacy_user_uuid('device-a')).delete()
+        response = LegacyResponse.objects.get(user_id='device-a')
+        self.assertEqual(self.client.patch(
+            f'/api/responses/{response.pk}/', {'selected_choice_ids': [self.choice.pk]}, content_type='application/json',
+        ).status_code, 200)
+        self.assertTrue(CheckpointResponse.objects.filter(user_id=legacy_user_uuid('device-a')).exists())
+
+
+class LegacyResponseBackfillTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.questions = [
+            LegacyQuestion.objects.create(key=f'q{n}', title=f'Q{n}', subtitle='', checkpoint_label='', order=n)
+            for n in (1, 2, 3)
+        ]
+        cls.choices = {
+            question.pk: [
+                LegacyChoice.objects.create(
+                    question=question, choice_id=str(n), title='', subtitle='', description='', order=n,
+                )
+                for n in range(2)
+            ]
+            for question in cls.questions
+        }
+        # Written straight to the legacy tables, as before the write-through existed.
+        for n in range(5):
+            for question in cls.questions:
+                LegacyResponse.objects.create(user_id=f'device-{n}', question=question).selected_choices.add(
+                    cls.choices[question.pk][n % 2],
+                )
+
+    def backfill(self, **kwargs):
+        return LegacyResponseBackfill(chunk_size=3, max_load=1, **kwargs)
+
+    def test_run_copies_every_row_with_its_choices(self):
+        self.assertTrue(self.backfill().run())
+        checkpoint = BackfillCheckpoint.objects.get(name='legacy_responses')
+        self.assertEqual(checkpoint.rows_copied, 15)
+        self.assertEqual(checkpoint.last_id, LegacyResponse.objects.order_by('pk').last().pk)
+        self.assertIsNotNone(checkpoint.finished_at)
+        placeholder = legacy_user_uuid('device-1')
+        self.assertEqual(CheckpointResponse.objects.filter(user_id=placeholder).count(), 3)
+        self.assertTrue(QuestionResponse.objects.get(user_id=placeholder).is_complete)
+        self.assertEqual(SelectedChoice.objects.filter(user_id=placeholder).count(), 3)
+
+    def test_interrupted_run_resumes_after_the_checkpoint(self):
+        self.assertFalse(self.backfill().run(max_chunks=1))
+        checkpoint = BackfillCheckpoint.objects.get(name='legacy_responses')
+        self.assertEqual((checkpoint.rows_copied, checkpoint.chunks), (3, 1))
+        self.assertEqual(checkpoint.last_id, LegacyResponse.objects.order_by('pk')[2].pk)
+        self.assertEqual(CheckpointResponse.objects.count(), 3)
+
+        progress = []
+        self.assertTrue(self.backfill(progress=lambda copied, size, elapsed: progress.append(copied)).run())
+        self.assertEqual(sum(progress), 12)
+        self.assertEqual(BackfillCheckpoint.objects.get(name='legacy_responses').rows_copied, 15)
+        self.assertEqual(CheckpointResponse.objects.count(), 15)
+
+    def test_verify_reports_a_tampered_copy(self):
+        self.backfill().run()
+        result = self.backfill().verify()
+        self.assertEqual((result['source_rows'], result['target_rows'], result['mismatches']), (15, 15, 0))
+        self.assertEqual(result['source_checksum'], result['target_checksum'])
+
+        tampered = CheckpointResponse.objects.filter(user_id=legacy_user_uuid('device-3')).first()
+        SelectedChoice.objects.filter(user_id=tampered.user_id, checkpointresponse_id=tampered.pk).delete()
+        result = self.backfill().verify()
+        self.assertEqual(result['mismatches'], 1)
+        self.assertEqual(result['examples'], [(str(tampered.user_id), tampered.checkpoint_id)])
+        self.assertNotEqual(result['source_checksum'], result['target_checksum'])
+        self.assertEqual(BackfillCheckpoint.objects.get(name='legacy_responses').mismatches, 1)
+
+    def test_command_copies_resumes_and_verifies(self):
+        out = StringIO()
+        call_command('backfill_legacy', '--max-load', '1', '--chunk-size', '4', '--max-chunks', '1', stdout=out)
+        self.assertIn('Stopped: 4 rows copied in 1 chunks', out.getvalue())
+        out = StringIO()
+        call_command('backfill_legacy', '--max-load', '1', stdout=out)
+        self.assertIn('Resuming after id', out.getvalue())
+        self.assertIn('Finished: 15 rows copied', out.getvalue())
+
+        out = StringIO()
+        call_command('backfill_legacy', '--verify', stdout=out)
+        self.assertIn('All copied rows match.', out.getvalue())
+        SelectedChoice.objects.filter(user_id=legacy_user_uuid('device-0')).delete()
+        with self.assertRaisesMessage(CommandError, '3 rows do not match.'):
+            call_command('backfill_legacy', '--verify', stdout=StringIO())
+
+    def test_command_rejects_an_invalid_max_load(self):
+        with self.assertRaisesMessage(CommandError, '--max-load must be in (0, 1].'):
+            call_command('backfill_legacy', '--max-load', '0', stdout=StringIO())
+
+
+class BackfillThrottlingTests(SimpleTestCase):
+    def backfill(self, max_load=0.25, target_seconds=0.5):
+        return Backfill(chunk_size=100, max_load=max_load, target_seconds=target_seconds)
+
+    def test_pause_keeps_the_share_of_time_at_max_load(self):
+        self.assertAlmostEqual(self.backfill(max_load=0.25).pause_for(1.0), 3.0)
+        self.assertAlmostEqual(self.backfill(max_load=0.5).pause_for(0.2), 0.2)
+        self.assertEqual(self.backfill(max_load=1).pause_for(5.0), 0)
+
+    def test_chunk_size_moves_toward_the_target_duration(self):
+        backfill = self.backfill(target_seconds=0.5)
+        self.assertEqual(backfill.next_chunk_size(1000, 0.5), 1000)
+        self.assertEqual(backfill.next_chunk_size(1000, 0.4), 1250)
+        # At most doubled or halved per chunk.
+        self.assertEqual(backfill.next_chunk_size(1000, 0.01), 2000)
+        self.assertEqual(backfill.next_chunk_size(1000, 30), 500)
+        self.assertEqual(backfill.next_chunk_size(1000, 0), 2000)
+
+    def test_chunk_size_stays_within_bounds(self):
+        backfill = self.backfill()
+        self.assertEqual(backfill.next_chunk_size(MIN_CHUNK_SIZE, 30), MIN_CHUNK_SIZE)
+        self.assertEqual(backfill.next_chunk_size(MAX_CHUNK_SIZE, 0.01), MAX_CHUNK_SIZE)
+        self.assertEqual(backfill.next_chunk_size(MAX_CHUNK_SIZE, 0), MAX_CHUNK_SIZE)
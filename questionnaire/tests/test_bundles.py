@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from questionnaire import bundles
+from questionnaire.models import Section
+
+
+class ContentBundleTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+        override = override_settings(STATIC_ROOT=self.tmp)
+        override.enable()
+        self.addCleanup(override.disable)
+        bundles._manifest_cache.update(mtime=None, data=None)
+
+    def build(self):
+        call_command('build_content_bundle', stdout=StringIO())
+        return json.loads((self.tmp / bundles.BUNDLE_DIR / bundles.MANIFEST_NAME).read_bytes())
+
+    def test_bundles_hold_every_section_under_its_content_hash(self):
+        manifest = self.build()
+        self.assertEqual([entry['key'] for entry in manifest['sections']],
+                         list(Section.objects.values_list('key', flat=True)))
+        for entry in manifest['sections']:
+            body = (self.tmp / entry['path']).read_bytes()
+            self.assertEqual(hashlib.sha256(body).hexdigest()[:bundles.HASH_LENGTH], entry['hash'])
+            self.assertEqual(entry['path'], f'content/{entry["key"]}.{entry["hash"]}.json')
+            self.assertEqual(entry['bytes'], len(body))
+            self.assertEqual(json.loads(body)['key'], entry['key'])
+            self.assertEqual(gzip.decompress((self.tmp / f'{entry["path"]}.gz').read_bytes()), body)
+
+    def test_version_changes_only_with_content(self):
+        first = self.build()
+        self.assertEqual(self.build()['version'], first['version'])
+
+        section = Section.objects.first()
+        section.title = 'Renamed'
+        section.save()
+        second = self.build()
+        self.assertNotEqual(second['version'], first['version'])
+        changed = [old['key'] for old, new in zip(first['sections'], second['sections']) if old['hash'] != new['hash']]
+        self.assertEqual(changed, [section.key])
+        # The previous files stay for clients still holding the old manifest.
+        self.assertTrue((self.tmp / first['sections'][0]['path']).exists())
+
+    def test_manifest_endpoint(self):
+        self.assertEqual(self.client.get('/api/content/manifest/').status_code, 404)
+        manifest = self.build()
+        response = self.client.get('/api/content/manifest/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{manifest["version"]}"')
+        self.assertEqual(response.json()['sections'], manifest['sections'])
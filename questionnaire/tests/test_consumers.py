@@ -0,0 +1,61 @@
+from unittest import mock
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from awfm.asgi import application
+from questionnaire.models import CareTeam, TeamMembership, User
+from questionnaire.realtime import team_group
+
+ORIGIN = [(b'origin', b'http://localhost:3000')]
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class CareTeamConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.member = User.objects.create_user(email='member@example.com', username='member', password='pw')
+        self.stranger = User.objects.create_user(email='stranger@example.com', username='stranger', password='pw')
+        TeamMembership.objects.create(care_team=CareTeam.objects.create(owner=self.owner), user=self.member)
+        origins = ['localhost', 'http://localhost:3000']
+        patcher = mock.patch.object(application.application_mapping['websocket'], 'allowed_origins', origins)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def communicator(self, user=None, headers=ORIGIN):
+        path = '/ws/care-team/'
+        if user is not None:
+            path += f'?token={AccessToken.for_user(user)}'
+        return WebsocketCommunicator(application, path, headers=headers)
+
+    async def test_member_receives_events_of_a_subscribed_team(self):
+        communicator = self.communicator(self.member)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.send_json_to({'action': 'subscribe', 'team': str(self.owner.pk)})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'subscribed', 'team': str(self.owner.pk)})
+
+        text = '{"type": "events", "events": []}'
+        await get_channel_layer().group_send(team_group(self.owner.pk), {'type': 'team.events', 'text': text})
+        self.assertEqual(await communicator.receive_from(), text)
+        await communicator.disconnect()
+
+    async def test_subscribing_to_someone_elses_team_is_refused(self):
+        communicator = self.communicator(self.stranger)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.send_json_to({'action': 'subscribe', 'team': str(self.owner.pk)})
+        reply = await communicator.receive_json_from()
+        self.assertEqual(reply['type'], 'error')
+        await communicator.disconnect()
+
+    async def test_connection_without_a_token_is_closed(self):
+        connected, _ = await self.communicator().connect()
+        self.assertFalse(connected)
+
+    async def test_connection_from_another_origin_is_denied(self):
+        communicator = self.communicator(self.member, headers=[(b'origin', b'https://evil.example')])
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
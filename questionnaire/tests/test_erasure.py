@@ -0,0 +1,81 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from questionnaire import erasure
+from questionnaire.backfill import legacy_user_uuid
+from questionnaire.models import ErasureRequest, LegacyChoice, LegacyQuestion, LegacyResponse, User
+
+
+class LegacyRowErasureTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.questions = [
+            LegacyQuestion.objects.create(key=f'q{n}', title=f'Q{n}', subtitle='', checkpoint_label=f'Checkpoint {n}')
+            for n in (1, 2)
+        ]
+        for question in cls.questions:
+            LegacyChoice.objects.create(question=question, choice_id='1', title='A', subtitle='', description='')
+        cls.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+
+    def post(self, user_id, question):
+        response = self.client.post('/api/responses/', {
+            'user_id': user_id, 'question': question.pk, 'selected_choice_ids': [question.choices.get().pk],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def erase(self, user_id):
+        request = ErasureRequest.objects.create(user_id=user_id)
+        erasure.erase(request)
+        request.refresh_from_db()
+        return request
+
+    def test_placeholder_users_legacy_rows_are_found_by_username(self):
+        for question in self.questions:
+            self.post('device-1', question)
+        self.post('device-2', self.questions[0])
+        placeholder = User.objects.get(pk=legacy_user_uuid('device-1'))
+        self.assertEqual(placeholder.username, 'legacy:device-1')
+
+        request = self.erase(placeholder.pk)
+        self.assertIn('device-1', request.legacy_user_ids)
+        self.assertEqual(request.deleted['questionnaire.LegacyResponse'], 2)
+        self.assertFalse(LegacyResponse.objects.filter(user_id='device-1').exists())
+        self.assertTrue(LegacyResponse.objects.filter(user_id='device-2').exists())
+        self.assertFalse(User.objects.filter(pk=placeholder.pk).exists())
+        # The user row is gone, so only the stored ids can still find the legacy rows.
+        LegacyResponse.objects.create(user_id='device-1', question=self.questions[0])
+        self.assertEqual(
+            erasure.remaining_rows(placeholder.pk, request.legacy_user_ids), {'questionnaire.LegacyResponse': 1},
+        )
+
+    def test_uuid_keyed_rows_are_erased_in_any_spelling(self):
+        self.post(str(self.user.pk), self.questions[0])
+        self.post(self.user.pk.hex.upper(), self.questions[1])
+
+        request = self.erase(self.user.pk)
+        self.assertEqual(request.deleted['questionnaire.LegacyResponse'], 2)
+        self.assertFalse(LegacyResponse.objects.exists())
+        self.assertEqual(erasure.remaining_rows(self.user.pk, request.legacy_user_ids), {})
+
+
+class ClaimTests(TestCase):
+    def test_a_claim_whose_task_never_ran_is_taken_again(self):
+        request = ErasureRequest.objects.create(user_id=User.objects.create_user(username='a', email='a@example.com').pk)
+        now = timezone.now()
+        self.assertEqual(erasure.claim_new_requests(now), [request.pk])
+        self.assertEqual(erasure.claim_new_requests(now + timedelta(minutes=1)), [])
+        self.assertEqual(erasure.claim_new_requests(now + timedelta(hours=1)), [request.pk])
+
+        ErasureRequest.objects.filter(pk=request.pk).update(status='running')
+        self.assertEqual(erasure.claim_new_requests(now + timedelta(days=1)), [])
+
+    def test_released_claim_is_taken_by_the_next_poll(self):
+        request = ErasureRequest.objects.create(user_id=User.objects.create_user(username='a', email='a@example.com').pk)
+        self.assertEqual(erasure.claim_new_requests(), [request.pk])
+        erasure.release_claim(request.pk)
+        self.assertEqual(erasure.claim_new_requests(), [request.pk])
@@ -0,0 +1,18 @@
+from rest_framework.test import APITestCase
+
+from questionnaire.models import User
+
+
+class ExplanationListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', username='reader', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def test_invalid_user_filter_is_a_bad_request(self):
+        response = self.client.get('/api/explanations/', {'user': 'bad'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'detail': 'Invalid user id.'})
+
+    def test_user_filter_accepts_a_user_id(self):
+        response = self.client.get('/api/explanations/', {'user': str(self.user.pk)})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,134 @@
+import csv
+import json
+import shutil
+import tempfile
+import uuid
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from questionnaire.export import RESEARCH_COLUMNS, iter_research_rows, pseudonymize, uuid_shard_bounds
+from questionnaire.models import CheckpointResponse, Explanation, QuestionResponse, SelectedChoice, User
+from questionnaire.synthetic import generate_users
+
+
+class PlanExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.user = User.objects.get(pk=generate_users(1, answered=3, seed=5, prefix='export')[0])
+        generate_users(1, answered=3, seed=6, prefix='other')
+        Explanation.objects.filter(user=cls.user).update(text_content='<b>Mine</b> & only mine')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get('/api/me/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_json_export_holds_the_whole_plan(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('filename="care-plan.json"', response['Content-Disposition'])
+        data = json.loads(body)
+        self.assertEqual(data['user']['email'], self.user.email)
+
+        expected = set(QuestionResponse.objects.filter(user=self.user).values_list('main_question__key', flat=True))
+        self.assertEqual({row['question'] for row in data['responses']}, expected)
+        exported_choices = {
+            choice['key'] for row in data['responses'] for checkpoint in row['checkpoints']
+            for choice in checkpoint['selectedChoices']
+        }
+        selected = SelectedChoice.objects.filter(user=self.user).values_list('choice__key', flat=True)
+        self.assertEqual(exported_choices, set(selected))
+        self.assertEqual(
+            {explanation['text'] for row in data['responses'] for explanation in row['explanations']},
+            {'<b>Mine</b> & only mine'},
+        )
+
+    def test_html_export_is_escaped(self):
+        response, body = self.export(output='html')
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertIn('filename="care-plan.html"', response['Content-Disposition'])
+        self.assertTrue(body.startswith('<!DOCTYPE html>'))
+        self.assertTrue(body.endswith('</html>\n'))
+        self.assertEqual(body.count('<section>'), 3)
+        self.assertIn('&lt;b&gt;Mine&lt;/b&gt; &amp; only mine', body)
+        self.assertNotIn('<b>Mine</b>', body)
+
+    def test_export_requires_a_user(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/me/export/').status_code, 401)
+
+    def test_empty_plan_is_valid_json(self):
+        self.client.force_authenticate(User.objects.create_user(email='new@example.com', username='new', password='pw'))
+        _, body = self.export()
+        self.assertEqual(json.loads(body)['responses'], [])
+
+
+@override_settings(RESEARCH_EXPORT_KEY='research-key')
+class ResearchExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.user_ids = generate_users(12, answered=2, seed=8, prefix='research')
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def export(self, *args):
+        call_command('export_responses', str(self.tmp / 'out.csv'), *args, stdout=StringIO())
+        rows = []
+        for path in sorted(self.tmp.iterdir()):
+            with open(path, newline='', encoding='utf-8') as handle:
+                header, *body = csv.reader(handle)
+            self.assertEqual(header, RESEARCH_COLUMNS)
+            rows.append(body)
+        return rows
+
+    def test_participants_are_pseudonymized(self):
+        rows = list(iter_research_rows('research-key'))
+        self.assertEqual(len(rows), CheckpointResponse.objects.count())
+        self.assertEqual({row[0] for row in rows}, {pseudonymize(user_id, 'research-key') for user_id in self.user_ids})
+        self.assertNotEqual(pseudonymize(self.user_ids[0], 'research-key'), pseudonymize(self.user_ids[0], 'other'))
+
+        cr = CheckpointResponse.objects.select_related('checkpoint').filter(user_id=self.user_ids[0]).first()
+        choices = '|'.join(sorted(cr.selected_choices.values_list('key', flat=True)))
+        participant = pseudonymize(self.user_ids[0], 'research-key')
+        self.assertIn((participant, cr.checkpoint.checkpoint_number, choices, str(cr.updated_at.year)),
+                      [(row[0], row[3], row[5], row[7]) for row in rows])
+
+        self.export()
+        text = (self.tmp / 'out.csv').read_text()
+        for user in User.objects.filter(pk__in=self.user_ids):
+            self.assertNotIn(str(user.pk), text)
+            self.assertNotIn(user.email, text)
+
+    def test_shards_split_participants_without_overlap(self):
+        whole, = self.export()
+        shutil.rmtree(self.tmp)
+        self.tmp.mkdir()
+        shards = self.export('--shards', '4')
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(sorted(row for shard in shards for row in shard), sorted(whole))
+        owners = [{row[0] for row in shard} for shard in shards]
+        self.assertEqual(sum(len(participants) for participants in owners), len(set().union(*owners)))
+
+    def test_shard_bounds_cover_every_id(self):
+        bounds = [uuid_shard_bounds(shard, 3) for shard in range(3)]
+        self.assertEqual(bounds[0][0], uuid.UUID(int=0))
+        self.assertIsNone(bounds[-1][1])
+        self.assertEqual([high for _, high in bounds[:-1]], [low for low, _ in bounds[1:]])
+
+    @override_settings(RESEARCH_EXPORT_KEY='')
+    def test_a_key_is_required(self):
+        with self.assertRaisesMessage(CommandError, 'RESEARCH_EXPORT_KEY'):
+            self.export()
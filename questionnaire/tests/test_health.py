@@ -0,0 +1,80 @@
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+
+from questionnaire import health
+
+
+def check_database_and_close():
+    # Probes run in pool threads; a connection left open there would block dropping the test database.
+    try:
+        health.check_database()
+    finally:
+        connection.close()
+
+
+@override_settings(METRICS={**settings.METRICS, 'TOKEN': 'scrape-token', 'CELERY_BROKER_URL': ''})
+class MetricsTests(TestCase):
+    def scrape(self, token='scrape-token'):
+        return self.client.get('/api/metrics/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_scrape_requires_the_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.assertEqual(self.scrape('wrong').status_code, 401)
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_requests_are_counted_by_view_and_status(self):
+        labels = {'view': 'health-check', 'method': 'GET', 'status': '200'}
+        before = REGISTRY.get_sample_value('awfm_requests_total', labels) or 0
+        self.client.get('/api/health/')
+        self.client.get('/api/health/')
+        self.assertEqual(REGISTRY.get_sample_value('awfm_requests_total', labels), before + 2)
+        body = self.scrape().content.decode()
+        self.assertIn('awfm_request_duration_seconds_bucket{', body)
+        self.assertIn(f'awfm_requests_total{{method="GET",status="200",view="health-check"}} {before + 2}', body)
+
+
+@override_settings(READINESS={'CHECKS': ['database', 'cache'], 'TIMEOUT': 0.5, 'CACHE_SECONDS': 60})
+class ReadinessTests(TestCase):
+    def setUp(self):
+        health._result = None
+        self.addCleanup(setattr, health, '_result', None)
+        patcher = mock.patch.dict(health.CHECKS, database=check_database_and_close)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ready(self):
+        response = self.client.get('/api/ready/')
+        return response.status_code, response.json()
+
+    def test_ready_when_every_check_passes(self):
+        self.assertEqual(self.ready(), (200, {'status': 'ready', 'checks': {'database': 'ok', 'cache': 'ok'}}))
+
+    def test_failing_check_makes_the_service_unavailable(self):
+        with mock.patch.dict(health.CHECKS, cache=mock.Mock(side_effect=ConnectionError)):
+            self.assertEqual(self.ready(), (503, {
+                'status': 'unavailable', 'checks': {'database': 'ok', 'cache': 'error: ConnectionError'},
+            }))
+
+    def test_slow_check_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with mock.patch.dict(health.CHECKS, cache=lambda: release.wait(5)):
+            status, data = self.ready()
+        self.assertEqual((status, data['checks']['cache']), (503, 'timeout'))
+
+    def test_result_is_reused_until_it_expires(self):
+        check = mock.Mock()
+        with mock.patch.dict(health.CHECKS, cache=check):
+            self.ready()
+            self.ready()
+            self.assertEqual(check.call_count, 1)
+            health._expires = 0
+            self.ready()
+            self.assertEqual(check.call_count, 2)
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from questionnaire import images
+from questionnaire.models import ImageAsset
+
+SOURCE_URL = 'https://images.example.org/content/sunrise.png'
+
+
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.tmp)
+        (cls.tmp / 'sources').mkdir()
+        Image.new('RGB', (800, 400), (200, 120, 40)).save(cls.tmp / 'sources' / 'sunrise.png')
+
+    def setUp(self):
+        config = dict(
+            settings.IMAGES, FORMATS=['webp'],
+            FETCHER={'BACKEND': 'questionnaire.images.LocalFileFetcher', 'ROOT': self.tmp / 'sources'},
+        )
+        storages = dict(settings.STORAGES, images={
+            'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': self.tmp / 'out'},
+        })
+        override = override_settings(IMAGES=config, STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+        images._fetcher = None
+        images._ready['loaded_at'] = None
+        self.addCleanup(setattr, images, '_fetcher', None)
+
+    def processed(self):
+        asset = ImageAsset.objects.get(pk=images.register([SOURCE_URL])[0])
+        self.assertTrue(images.process(asset))
+        images._ready['loaded_at'] = None
+        return asset
+
+    def test_process_writes_webp_variants_no_wider_than_the_source(self):
+        asset = self.processed()
+        self.assertEqual((asset.width, asset.height), (800, 400))
+        self.assertEqual([(v['format'], v['width']) for v in asset.variants],
+                         [('webp', 320), ('webp', 480), ('webp', 640), ('webp', 800)])
+        with images.get_storage().open(asset.variants[0]['name']) as stored, Image.open(stored) as variant:
+            self.assertEqual((variant.format, variant.size), ('WEBP', (320, 160)))
+
+    def test_image_fields_use_the_variants_once_ready(self):
+        self.assertEqual(images.image_fields(SOURCE_URL), {'image': SOURCE_URL, 'imageSrcset': {}})
+        asset = self.processed()
+        fields = images.image_fields(SOURCE_URL)
+        prefix = f'/api/images/{asset.digest}/'
+        self.assertEqual(fields['image'], f'{prefix}640.webp')
+        self.assertEqual(
+            fields['imageSrcset'],
+            {'webp': ', '.join(f'{prefix}{width}.webp {width}w' for width in (320, 480, 640, 800))},
+        )
+
+    def test_variant_is_served_as_immutable(self):
+        asset = self.processed()
+        response = self.client.get(f'/api/images/{asset.digest}/320.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.IMAGES["CACHE_SECONDS"]}, immutable')
+        self.assertEqual(response['ETag'], f'"{asset.digest}-320.webp"')
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'RIFF')
+
+        revalidated = self.client.get(f'/api/images/{asset.digest}/320.webp', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get(f'/api/images/{asset.digest}/9999.webp').status_code, 404)
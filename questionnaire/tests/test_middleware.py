@@ -0,0 +1,23 @@
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from questionnaire.middleware import APICompressionMiddleware
+
+
+class APICompressionTests(SimpleTestCase):
+    def compress(self, response, path='/api/plans/'):
+        request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING='gzip, br')
+        return APICompressionMiddleware(lambda request: response)(request)
+
+    def test_json_is_compressed_with_brotli(self):
+        response = self.compress(JsonResponse({'rows': ['row'] * 1000}))
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_html_falls_back_to_gzip(self):
+        html = '<html><input name="csrfmiddlewaretoken" value="token">' + '<p>row</p>' * 1000 + '</html>'
+        response = self.compress(HttpResponse(html, content_type='text/html; charset=utf-8'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_non_api_paths_are_left_alone(self):
+        response = self.compress(JsonResponse({'rows': ['row'] * 1000}), path='/admin/')
+        self.assertFalse(response.has_header('Content-Encoding'))
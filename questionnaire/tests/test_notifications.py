@@ -0,0 +1,122 @@
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from questionnaire import notifications
+from questionnaire.models import (
+    CareTeam, Notification, NotificationDigest, NotificationEvent, NotificationPreference, TeamMembership, User,
+)
+
+
+class FanOutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        cls.team = CareTeam.objects.create(owner=cls.owner)
+        cls.members = {}
+        for name in ('hourly', 'daily', 'off', 'no_affirmations'):
+            user = User.objects.create_user(email=f'{name}@example.com', username=name, password='pw')
+            TeamMembership.objects.create(care_team=cls.team, user=user)
+            cls.members[name] = user
+        NotificationPreference.objects.create(user=cls.members['daily'], frequency='daily')
+        NotificationPreference.objects.create(user=cls.members['off'], frequency='off')
+        NotificationPreference.objects.create(user=cls.members['no_affirmations'], affirmations=False)
+
+    def recipients(self):
+        return set(Notification.objects.values_list('recipient_id', flat=True))
+
+    def waiting_since(self, user, ago):
+        Notification.objects.filter(recipient=user).update(created_at=timezone.now() - ago)
+
+    def test_fan_out_follows_preferences_and_skips_the_actor(self):
+        notifications.enqueue('explanation', self.team.pk, self.owner.pk, 1)
+        self.assertEqual(notifications.fan_out(), 1)
+        self.assertEqual(self.recipients(), {self.members[name].pk for name in ('hourly', 'daily', 'no_affirmations')})
+
+        Notification.objects.all().delete()
+        notifications.enqueue('affirmation', self.team.pk, self.members['hourly'].pk, 2)
+        notifications.fan_out()
+        self.assertEqual(self.recipients(), {self.owner.pk, self.members['daily'].pk})
+
+    def test_fan_out_can_run_twice(self):
+        notifications.enqueue('explanation', self.team.pk, self.owner.pk, 1)
+        notifications.fan_out()
+        self.assertEqual(notifications.fan_out(), 0)
+        # A worker that died before marking its events re-reads them.
+        NotificationEvent.objects.update(fanned_out=False)
+        self.assertEqual(notifications.fan_out(), 1)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertFalse(NotificationEvent.objects.filter(fanned_out=False).exists())
+
+    def test_collect_due_waits_for_each_window(self):
+        notifications.enqueue('explanation', self.team.pk, self.owner.pk, 1)
+        notifications.fan_out()
+        self.assertEqual(notifications.collect_due(), [])
+
+        self.waiting_since(self.members['hourly'], timedelta(minutes=61))
+        self.waiting_since(self.members['daily'], timedelta(hours=2))
+        digest_id, = notifications.collect_due()
+        digest = NotificationDigest.objects.get(pk=digest_id)
+        self.assertEqual((digest.recipient, digest.event_count, digest.status), (self.members['hourly'], 1, 'pending'))
+        self.assertEqual(notifications.collect_due(), [])
+
+        self.waiting_since(self.members['daily'], timedelta(hours=25))
+        digest_id, = notifications.collect_due()
+        self.assertEqual(NotificationDigest.objects.get(pk=digest_id).recipient, self.members['daily'])
+
+    def test_collect_due_drops_notifications_of_muted_recipients(self):
+        notifications.enqueue('explanation', self.team.pk, self.owner.pk, 1)
+        notifications.fan_out()
+        NotificationPreference.objects.filter(user=self.members['daily']).update(frequency='off')
+        self.assertEqual(notifications.collect_due(), [])
+        self.assertEqual(self.recipients(), {self.members['hourly'].pk, self.members['no_affirmations'].pk})
+
+
+class DeliverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        team = CareTeam.objects.create(owner=owner)
+        event = NotificationEvent.objects.create(kind='affirmation', care_team=team, actor=owner, object_id='1')
+        cls.digest_ids = []
+        for n in range(3):
+            recipient = User.objects.create_user(email=f'member{n}@example.com', username=f'member{n}', password='pw')
+            digest = NotificationDigest.objects.create(recipient=recipient, event_count=1)
+            Notification.objects.create(recipient=recipient, event=event, digest=digest)
+            cls.digest_ids.append(digest.pk)
+
+    def statuses(self):
+        return list(NotificationDigest.objects.order_by('id').values_list('status', flat=True))
+
+    def test_sends_each_digest_and_marks_it_sent(self):
+        self.assertEqual(notifications.deliver(self.digest_ids), 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(self.statuses(), ['sent'] * 3)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(notifications.deliver(self.digest_ids), 0)
+
+    def test_a_failure_keeps_the_digests_already_sent(self):
+        backend = mail.get_connection().__class__
+        sent = []
+
+        def send_messages(self, messages):
+            if len(sent) == 1:
+                raise SMTPServerDisconnected('gone')
+            sent.extend(messages)
+            return len(messages)
+
+        with mock.patch.object(backend, 'send_messages', send_messages):
+            with self.assertRaises(SMTPServerDisconnected):
+                notifications.deliver(self.digest_ids)
+        self.assertEqual(self.statuses(), ['sent', 'pending', 'pending'])
+        self.assertEqual(notifications.deliver(self.digest_ids), 2)
+        self.assertEqual(self.statuses(), ['sent'] * 3)
+
+    def test_a_digest_claimed_by_a_lost_worker_is_picked_up_again(self):
+        NotificationDigest.objects.filter(pk=self.digest_ids[0]).update(status='sending', claimed_at='2000-01-01T00:00Z')
+        self.assertIn(self.digest_ids[0], notifications.stalled_digest_ids())
+        self.assertEqual(self.statuses()[0], 'pending')
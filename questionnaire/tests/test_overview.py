@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from questionnaire.models import CareTeam, CheckpointResponse, TeamMembership, User
+from questionnaire.synthetic import generate_users
+
+
+class CareTeamOverviewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+        owner_id, member_id = generate_users(2, answered=1, seed=1, prefix='overview')
+        self.owner = User.objects.get(pk=owner_id)
+        self.membership = TeamMembership.objects.create(
+            care_team=CareTeam.objects.create(owner=self.owner), user_id=member_id,
+        )
+        self.client.force_authenticate(self.owner)
+
+    def affirmed_latest(self):
+        response = self.client.get('/api/care-team/overview/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['members'][0]['affirmedLatest']
+
+    def test_owner_plan_edit_after_an_affirmation_makes_it_out_of_date(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.has_affirmed = True
+            self.membership.save()
+        self.assertTrue(self.affirmed_latest())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CheckpointResponse.objects.filter(user=self.owner).first().save()
+        self.assertFalse(self.affirmed_latest())
+
+    def test_member_edits_do_not_make_the_affirmation_out_of_date(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.has_affirmed = True
+            self.membership.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            CheckpointResponse.objects.filter(user_id=self.membership.user_id).first().save()
+        self.assertTrue(self.affirmed_latest())
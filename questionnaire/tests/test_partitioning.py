@@ -0,0 +1,67 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from questionnaire import partitioning
+from questionnaire.models import CheckpointResponse, Explanation, QuestionResponse, SelectedChoice, User
+from questionnaire.synthetic import generate_users
+
+
+class ExplanationUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.author, cls.other = generate_users(2, answered=1, seed=1, prefix='partition')
+
+    def test_explanation_of_another_users_response_is_invalid(self):
+        explanation = Explanation(
+            user_id=self.other, question_response=QuestionResponse.objects.get(user_id=self.author),
+            explanation_type='text', text_content='Mine',
+        )
+        with self.assertRaises(ValidationError) as raised:
+            explanation.full_clean()
+        self.assertIn('question_response', raised.exception.message_dict)
+
+    def test_user_defaults_to_the_responses_user(self):
+        explanation = Explanation.objects.create(
+            question_response=QuestionResponse.objects.get(user_id=self.author), explanation_type='text',
+        )
+        self.assertEqual(explanation.user_id, self.author)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Hash partitioning needs PostgreSQL')
+class ConvertTests(TransactionTestCase):
+    def setUp(self):
+        call_command('seed_data', stdout=StringIO())
+        self.author, self.other = generate_users(2, answered=3, seed=2, prefix='partition')
+        self.addCleanup(partitioning.drop_old)
+
+    def counts(self):
+        return [model.objects.count() for model in (QuestionResponse, CheckpointResponse, SelectedChoice)]
+
+    def test_convert_refuses_mismatched_rows_then_partitions_every_table(self):
+        explanation = Explanation.objects.filter(user_id=self.author).first()
+        Explanation.objects.filter(pk=explanation.pk).update(user_id=self.other)
+        with self.assertRaises(partitioning.PartitioningError):
+            partitioning.convert(partitions=4, batch_size=10)
+        self.assertEqual({row['state'] for row in partitioning.status()}, {'plain'})
+
+        Explanation.objects.filter(pk=explanation.pk).update(user_id=self.author)
+        before = self.counts()
+        self.assertEqual(len(partitioning.convert(partitions=4, batch_size=10)), 3)
+        self.assertEqual(
+            [(row['state'], row['partitions']) for row in partitioning.status()], [('partitioned', 4)] * 3,
+        )
+        self.assertEqual(self.counts(), before)
+
+        # Writes keep working, and the (question_response_id, user_id) foreign key rejects a mismatch.
+        user = User.objects.get(pk=self.author)
+        cr = CheckpointResponse.objects.filter(user=user).first()
+        cr.selected_choices.clear()
+        self.assertFalse(SelectedChoice.objects.filter(user=user, checkpointresponse=cr).exists())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Explanation.objects.filter(pk=explanation.pk).update(user_id=self.other)
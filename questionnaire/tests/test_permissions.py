@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from questionnaire.models import CareTeam, Explanation, QuestionResponse, TeamMembership, User
+from questionnaire.permissions import can_interact_with_explanation, care_team_access
+from questionnaire.synthetic import generate_users
+
+
+class CareTeamVisibilityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+        author_id, member_id, viewer_id, stranger_id = generate_users(
+            4, answered=1, explanations=False, seed=1, prefix='perm',
+        )
+        self.author, self.member, self.viewer, self.stranger = (
+            User.objects.get(pk=pk) for pk in (author_id, member_id, viewer_id, stranger_id)
+        )
+        self.team = CareTeam.objects.create(owner=self.author)
+        TeamMembership.objects.create(care_team=self.team, user=self.member, role='member')
+        TeamMembership.objects.create(care_team=self.team, user=self.viewer, role='viewer')
+        response = QuestionResponse.objects.get(user=self.author)
+        self.explanations = {
+            visibility: Explanation.objects.create(
+                question_response=response, explanation_type='text', text_content=visibility, visibility=visibility,
+            )
+            for visibility in ('private', 'care_team', 'public')
+        }
+
+    def visible_to(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/explanations/', {'user': str(self.author.pk)})
+        self.assertEqual(response.status_code, 200)
+        return {row['visibility'] for row in response.json()['results']}
+
+    def test_author_sees_all_of_their_explanations(self):
+        self.assertEqual(self.visible_to(self.author), {'private', 'care_team', 'public'})
+
+    def test_team_members_see_care_team_and_public_explanations(self):
+        self.assertEqual(self.visible_to(self.member), {'care_team', 'public'})
+        self.assertEqual(self.visible_to(self.viewer), {'care_team', 'public'})
+
+    def test_others_see_only_public_explanations(self):
+        self.assertEqual(self.visible_to(self.stranger), {'public'})
+
+    def test_hidden_explanations_are_not_found(self):
+        self.client.force_authenticate(self.stranger)
+        for visibility, status in (('private', 404), ('care_team', 404), ('public', 200)):
+            response = self.client.get(f'/api/explanations/{self.explanations[visibility].pk}/')
+            self.assertEqual(response.status_code, status, visibility)
+
+    def test_only_members_may_interact_with_care_team_explanations(self):
+        care_team = self.explanations['care_team']
+        self.assertTrue(can_interact_with_explanation(self.member, care_team))
+        self.assertFalse(can_interact_with_explanation(self.viewer, care_team))
+        self.assertFalse(can_interact_with_explanation(self.stranger, care_team))
+        self.assertTrue(can_interact_with_explanation(self.stranger, self.explanations['public']))
+
+    def test_adding_a_member_invalidates_their_cached_access(self):
+        self.assertEqual(self.visible_to(self.stranger), {'public'})
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamMembership.objects.create(care_team=self.team, user=self.stranger, role='viewer')
+        self.assertEqual(self.visible_to(self.stranger), {'care_team', 'public'})
+
+    def test_removing_a_member_invalidates_their_cached_access(self):
+        self.assertEqual(self.visible_to(self.member), {'care_team', 'public'})
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamMembership.objects.filter(user=self.member).delete()
+        self.assertEqual(self.visible_to(self.member), {'public'})
+
+    def test_cached_access_is_kept_until_the_membership_commits(self):
+        care_team_access(self.stranger)
+        with self.captureOnCommitCallbacks() as callbacks:
+            TeamMembership.objects.create(care_team=self.team, user=self.stranger, role='viewer')
+            self.assertNotIn(self.author.pk, care_team_access(self.stranger)['view'])
+        for callback in callbacks:
+            callback()
+        self.assertIn(self.author.pk, care_team_access(self.stranger)['view'])
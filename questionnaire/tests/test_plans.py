@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from questionnaire.models import Comment, Explanation, MainQuestion, Reaction, User
+from questionnaire.plans import PLAN_MAX_QUERIES, plan_queryset
+from questionnaire.serializers import PlanQuestionResponseSerializer
+from questionnaire.synthetic import generate_questions, generate_users
+
+
+class PlanQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        generate_questions(max(0, 100 - MainQuestion.objects.count()))
+
+    def serialize(self, user):
+        return PlanQuestionResponseSerializer(plan_queryset(user), many=True).data
+
+    def test_queries_do_not_grow_with_answers(self):
+        for answered, queries in ((0, 1), (10, PLAN_MAX_QUERIES), (100, PLAN_MAX_QUERIES)):
+            with self.subTest(answered=answered):
+                user = User.objects.get(pk=generate_users(1, answered=answered, prefix=f'plan{answered}')[0])
+                with self.assertNumQueries(queries):
+                    data = self.serialize(user)
+                self.assertEqual(len(data), answered)
+
+    def test_reaction_and_comment_counts_are_not_multiplied(self):
+        user_id, *others = generate_users(4, answered=1, seed=1, prefix='counts')
+        explanation = Explanation.objects.filter(user_id=user_id).first()
+        for other in others:
+            Reaction.objects.create(user_id=other, explanation=explanation, reaction_type='support')
+            Comment.objects.create(user_id=other, explanation=explanation, content='Agreed')
+        Comment.objects.create(user_id=others[0], explanation=explanation, content='And another')
+
+        explanations = self.serialize(User.objects.get(pk=user_id))[0]['explanations']
+        counts = {row['id']: (row['reactionCount'], row['commentCount']) for row in explanations}
+        self.assertEqual(counts[explanation.pk], (3, 4))
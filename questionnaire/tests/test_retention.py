@@ -0,0 +1,94 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from questionnaire.models import AIInteraction, AIInteractionArchive, AIUsageTotal, Explanation, User
+from questionnaire.retention import (
+    ai_usage, archive_ai_interactions, archive_batch, compress_payload, decompress_payload, purge_batch,
+)
+from questionnaire.synthetic import generate_users
+
+
+class AIRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.user_ids = generate_users(2, answered=1, seed=4, prefix='retention')
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.user, self.other = User.objects.filter(pk__in=self.user_ids).order_by('pk')
+        self.explanation = Explanation.objects.filter(user=self.user).first()
+
+    def interaction(self, user, days_old, tokens, compared=()):
+        interaction = AIInteraction.objects.create(
+            user=user, explanation=self.explanation, interaction_type='summarize',
+            prompt=f'Summarize {days_old}', response=f'Résumé {days_old} ✓', tokens_used=tokens,
+        )
+        interaction.compared_explanations.set(compared)
+        AIInteraction.objects.filter(pk=interaction.pk).update(created_at=self.now - timedelta(days=days_old))
+        return interaction
+
+    def test_payload_round_trips(self):
+        payload = compress_payload('Prompt ✓', 'Réponse\n' * 100)
+        self.assertLess(len(payload), len('Réponse\n' * 100))
+        self.assertEqual(decompress_payload(memoryview(payload)), {'prompt': 'Prompt ✓', 'response': 'Réponse\n' * 100})
+
+    def test_archive_batch_moves_old_rows_and_adds_to_totals(self):
+        oldest = self.interaction(self.user, 200, 10, compared=[self.explanation])
+        self.interaction(self.user, 150, 20)
+        self.interaction(self.other, 120, 5)
+        recent = self.interaction(self.user, 10, 1)
+        cutoff = self.now - timedelta(days=90)
+
+        self.assertEqual(archive_batch(cutoff, 2), 2)
+        archived = AIInteractionArchive.objects.get(pk=oldest.pk)
+        self.assertEqual(archived.compared_explanation_ids, [self.explanation.pk])
+        self.assertEqual(decompress_payload(archived.payload), {'prompt': 'Summarize 200', 'response': 'Résumé 200 ✓'})
+        self.assertEqual(AIUsageTotal.objects.get(user=self.user).tokens_used, 30)
+        self.assertFalse(AIUsageTotal.objects.filter(user=self.other).exists())
+
+        self.assertEqual(archive_batch(cutoff, 2), 1)
+        self.assertEqual(archive_batch(cutoff, 2), 0)
+        totals = {total.user_id: (total.interactions, total.tokens_used) for total in AIUsageTotal.objects.all()}
+        self.assertEqual(totals, {self.user.pk: (2, 30), self.other.pk: (1, 5)})
+        self.assertEqual(list(AIInteraction.objects.values_list('pk', flat=True)), [recent.pk])
+
+    def test_totals_increment_across_batches(self):
+        self.interaction(self.user, 200, 10)
+        archive_batch(self.now - timedelta(days=90), 10)
+        self.interaction(self.user, 100, 7)
+        archive_batch(self.now - timedelta(days=90), 10)
+        total = AIUsageTotal.objects.get(user=self.user)
+        self.assertEqual((total.interactions, total.tokens_used), (2, 17))
+
+    def test_purge_batch_deletes_old_archives_but_keeps_totals(self):
+        for days_old in (900, 800, 100):
+            self.interaction(self.user, days_old, 4)
+        archive_batch(self.now - timedelta(days=90), 10)
+        self.assertEqual(purge_batch(self.now - timedelta(days=730), 1), 1)
+        self.assertEqual(purge_batch(self.now - timedelta(days=730), 10), 1)
+        self.assertEqual(AIInteractionArchive.objects.count(), 1)
+        self.assertEqual(AIUsageTotal.objects.get(user=self.user).tokens_used, 12)
+
+    @override_settings(AI_RETENTION={**settings.AI_RETENTION, 'BATCH_SIZE': 2, 'PAUSE_SECONDS': 0})
+    def test_archive_ai_interactions_applies_the_policy(self):
+        for days_old in (1000, 400, 300, 200, 5):
+            self.interaction(self.user, days_old, 1)
+        self.assertEqual(archive_ai_interactions(now=self.now), (4, 1))
+        self.assertEqual(AIInteraction.objects.count(), 1)
+        self.assertEqual(AIInteractionArchive.objects.count(), 3)
+
+    def test_ai_usage_adds_hot_rows_to_archived_totals(self):
+        self.interaction(self.user, 200, 10)
+        archive_batch(self.now - timedelta(days=90), 10)
+        self.interaction(self.user, 5, 3)
+        self.interaction(self.user, 1, 2)
+        self.assertEqual(ai_usage([self.user.pk, self.other.pk]), {
+            self.user.pk: {'interactions': 3, 'tokens_used': 15},
+            self.other.pk: {'interactions': 0, 'tokens_used': 0},
+        })
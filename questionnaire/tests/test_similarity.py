@@ -0,0 +1,161 @@
+import math
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from questionnaire.models import (
+    CheckpointResponse, Explanation, PeerNeighbor, QuestionResponse, SelectedChoice, User, UserChoiceVector,
+)
+from questionnaire.similarity import (
+    mark_users_dirty, pack, refresh_dirty, similar_explanations, top_neighbors, unpack,
+)
+from questionnaire.synthetic import generate_users
+
+
+def brute_force(query, candidate, metric):
+    shared = len(query & candidate)
+    if metric == 'cosine':
+        denominator = math.sqrt(len(query) * len(candidate))
+    else:
+        denominator = len(query | candidate)
+    return shared / denominator if denominator else 0.0
+
+
+class TopNeighborsTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.sets = [set(np.nonzero(rng.random(40) < 0.3)[0].tolist()) for _ in range(30)]
+        self.sets[5] = set()  # Scores 0 against everyone
+        self.matrix = unpack([pack(choices) for choices in self.sets])
+
+    def check(self, metric, k, **kwargs):
+        results = list(top_neighbors(self.matrix, self.matrix, k, metric, **kwargs))
+        self.assertEqual([index for index, _, _ in results], list(range(len(self.sets))))
+        for index, columns, scores in results:
+            expected = sorted(
+                (brute_force(self.sets[index], other, metric) for column, other in enumerate(self.sets)
+                 if 'query_ids' not in kwargs or column != index),
+                reverse=True,
+            )
+            expected = [score for score in expected[:k] if score > 0]
+            np.testing.assert_allclose(scores, expected, rtol=1e-6)
+            for column, score in zip(columns, scores):
+                self.assertAlmostEqual(score, brute_force(self.sets[index], self.sets[column], metric), places=6)
+        return results
+
+    def test_pack_round_trips(self):
+        for choices in self.sets:
+            self.assertEqual(set(np.nonzero(unpack([pack(choices)])[0])[0].tolist()), choices)
+
+    def test_scores_match_a_brute_force_computation(self):
+        for metric in ('jaccard', 'cosine'):
+            with self.subTest(metric=metric):
+                results = self.check(metric, 4)
+                # Without ids, every non-empty row is its own best match.
+                for index, columns, scores in results:
+                    if self.sets[index]:
+                        self.assertAlmostEqual(scores[0], 1.0, places=6)
+                self.assertEqual(len(results[5][1]), 0)
+
+    def test_own_row_is_excluded_given_ids(self):
+        ids = [f'user-{n}' for n in range(len(self.sets))]
+        for metric in ('jaccard', 'cosine'):
+            with self.subTest(metric=metric):
+                for index, columns, _ in self.check(metric, 5, query_ids=ids, candidate_ids=ids):
+                    self.assertNotIn(index, columns)
+
+    def test_small_blocks_give_the_same_results(self):
+        whole = self.check('jaccard', 3)
+        # 4 bytes per score: one query row per block, then three.
+        for block_bytes in (1, 3 * 4 * len(self.sets)):
+            with self.subTest(block_bytes=block_bytes):
+                blocked = self.check('jaccard', 3, block_bytes=block_bytes)
+                for (_, _, expected), (_, _, scores) in zip(whole, blocked):
+                    np.testing.assert_array_equal(scores, expected)
+
+    def test_k_larger_than_the_candidates(self):
+        results = self.check('jaccard', 100)
+        self.assertEqual(len(results[0][1]), sum(1 for other in self.sets if self.sets[0] & other))
+
+
+class MarkDirtyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+
+    def test_deleting_an_answer_marks_the_vector_dirty(self):
+        user_id, = generate_users(1, answered=1, seed=1, prefix='dirty')
+        CheckpointResponse.objects.filter(user_id=user_id).first().delete()
+        self.assertTrue(UserChoiceVector.objects.get(user_id=user_id).dirty)
+
+    def test_deleting_a_question_response_marks_the_vector_dirty(self):
+        user_id, = generate_users(1, answered=1, seed=2, prefix='dirty')
+        QuestionResponse.objects.filter(user_id=user_id).delete()
+        self.assertTrue(UserChoiceVector.objects.get(user_id=user_id).dirty)
+
+    def test_deleting_the_user_leaves_no_vector_behind(self):
+        user_id, = generate_users(1, answered=2, seed=3, prefix='dirty')
+        User.objects.get(pk=user_id).delete()
+        self.assertFalse(UserChoiceVector.objects.filter(user_id=user_id).exists())
+        self.assertFalse(User.objects.filter(pk=user_id).exists())
+
+
+class RefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+
+    def setUp(self):
+        self.user_ids = generate_users(6, answered=2, seed=11, prefix='peer')
+        self.user = User.objects.get(pk=self.user_ids[0])
+        # Everyone but the last user shares their explanations.
+        Explanation.objects.filter(user_id__in=self.user_ids[:-1]).update(visibility='public')
+
+    def choices(self, user_id):
+        return set(SelectedChoice.objects.filter(user_id=user_id).values_list('choice_id', flat=True))
+
+    def test_refresh_dirty_stores_the_best_public_peers(self):
+        mark_users_dirty(self.user_ids)
+        self.assertEqual(refresh_dirty(), 6)
+        self.assertFalse(UserChoiceVector.objects.filter(dirty=True).exists())
+        self.assertEqual(refresh_dirty(), 0)
+
+        vector = UserChoiceVector.objects.get(user=self.user)
+        self.assertEqual(vector.choice_count, len(self.choices(self.user.pk)))
+        mine = self.choices(self.user.pk)
+        expected = sorted(
+            (brute_force(mine, self.choices(other), 'jaccard'), other) for other in self.user_ids[1:-1]
+        )
+        neighbors = list(PeerNeighbor.objects.filter(user=self.user))
+        self.assertEqual([neighbor.rank for neighbor in neighbors], list(range(1, len(neighbors) + 1)))
+        self.assertNotIn(self.user.pk, [neighbor.neighbor_id for neighbor in neighbors])
+        self.assertNotIn(self.user_ids[-1], [neighbor.neighbor_id for neighbor in neighbors])
+        np.testing.assert_allclose(
+            [neighbor.score for neighbor in neighbors],
+            [score for score, _ in reversed(expected) if score > 0], rtol=1e-6,
+        )
+
+    def test_refresh_dirty_respects_the_limit(self):
+        UserChoiceVector.objects.all().delete()
+        mark_users_dirty(self.user_ids)
+        self.assertEqual(refresh_dirty(limit=4), 4)
+        self.assertEqual(UserChoiceVector.objects.filter(dirty=True).count(), 2)
+
+    def test_similar_explanations_follow_the_stored_scores(self):
+        mark_users_dirty(self.user_ids)
+        refresh_dirty()
+        scores = dict(PeerNeighbor.objects.filter(user=self.user).values_list('neighbor_id', 'score'))
+        explanations = list(similar_explanations(self.user))
+        self.assertTrue(explanations)
+        self.assertEqual({explanation.user_id for explanation in explanations}, set(scores))
+        self.assertEqual([explanation.similarity for explanation in explanations],
+                         sorted((scores[explanation.user_id] for explanation in explanations), reverse=True))
+
+        question_key = explanations[0].question_response.main_question.key
+        filtered = similar_explanations(self.user, question_key=question_key)
+        self.assertEqual({e.question_response.main_question.key for e in filtered}, {question_key})
+
+        Explanation.objects.filter(user_id__in=scores).update(visibility='care_team')
+        self.assertFalse(similar_explanations(self.user).exists())
@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from questionnaire.models import (
+    CareTeam, CheckpointResponse, Explanation, PlanBlob, PlanSnapshot, TeamMembership, User,
+)
+from questionnaire.snapshots import diff_snapshots, take_snapshot
+from questionnaire.synthetic import generate_users
+
+
+class PlanSnapshotTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+
+    def setUp(self):
+        owner_id, member_id = generate_users(2, answered=2, seed=3, prefix='snapshot')
+        self.owner = User.objects.get(pk=owner_id)
+        self.membership = TeamMembership.objects.create(
+            care_team=CareTeam.objects.create(owner=self.owner), user_id=member_id,
+        )
+
+    def edit_explanation(self, text):
+        explanation = Explanation.objects.filter(user=self.owner).order_by('pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            explanation.text_content = text
+            explanation.save()
+        return explanation
+
+    def swap_choice(self):
+        """Replace one selected choice of the owner's first checkpoint response with an unselected one."""
+        cr = CheckpointResponse.objects.filter(user=self.owner).select_related('checkpoint').order_by('pk').first()
+        selected = list(cr.selected_choices.order_by('key'))
+        unselected = cr.checkpoint.choices.exclude(pk__in=[choice.pk for choice in selected]).order_by('key').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            cr.selected_choices.remove(selected[0])
+            cr.selected_choices.add(unselected, through_defaults={'user': self.owner})
+        return cr, selected[0], unselected
+
+    def test_unchanged_plan_keeps_its_version(self):
+        first = take_snapshot(self.owner)
+        self.assertEqual(take_snapshot(self.owner).pk, first.pk)
+        # A save that changes no content is logged, but yields the same digest.
+        with self.captureOnCommitCallbacks(execute=True):
+            CheckpointResponse.objects.filter(user=self.owner).first().save()
+        self.assertEqual(take_snapshot(self.owner).pk, first.pk)
+        self.assertEqual(PlanSnapshot.objects.filter(user=self.owner).count(), 1)
+
+    def test_versions_share_the_blobs_of_unchanged_questions(self):
+        first = take_snapshot(self.owner)
+        self.assertEqual(PlanBlob.objects.filter(user=self.owner).count(), 2)
+        self.edit_explanation('Rewritten')
+        second = take_snapshot(self.owner)
+        self.assertEqual(second.version, first.version + 1)
+        # Only the edited question got a new blob.
+        self.assertEqual(PlanBlob.objects.filter(user=self.owner).count(), 3)
+        self.assertNotEqual(first.manifest[0], second.manifest[0])
+        self.assertEqual(first.manifest[1], second.manifest[1])
+
+    def test_affirmation_records_the_version(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.has_affirmed = True
+            self.membership.save()
+        self.membership.refresh_from_db()
+        snapshot = self.membership.affirmed_snapshot
+        self.assertEqual((snapshot.user_id, snapshot.version, snapshot.reason), (self.owner.pk, 1, 'affirmation'))
+
+    def test_diff_after_a_choice_and_an_explanation_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.has_affirmed = True
+            self.membership.save()
+        cr, removed, added = self.swap_choice()
+        explanation = self.edit_explanation('Changed my mind')
+
+        self.client.force_authenticate(self.owner)
+        response = self.client.get('/api/me/plan/affirmations/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['version'], 2)
+        member, = data['members']
+        self.assertEqual(member['affirmedVersion'], 1)
+        change, = member['changes']
+        self.assertEqual(change, {
+            'question': explanation.question_response.main_question.key,
+            'status': 'changed',
+            'checkpoints': {str(cr.checkpoint.checkpoint_number): {'added': [added.key], 'removed': [removed.key]}},
+            'explanations': {'added': [], 'removed': [], 'changed': [explanation.pk]},
+        })
+
+        old, new = PlanSnapshot.objects.filter(user=self.owner).order_by('version')
+        self.assertEqual(diff_snapshots(old, new), [change])
+        self.assertEqual(diff_snapshots(new, new), [])
@@ -0,0 +1,68 @@
+import threading
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from questionnaire.models import ChangeLogEntry, Section, User
+from questionnaire.sync import build_sync_payload, current_token, record_bulk_change
+
+
+class SyncPayloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=StringIO())
+        cls.user = User.objects.create_user(email='sync@example.com', username='sync', password='pw')
+
+    def test_changes_after_a_token_are_returned_once(self):
+        token = build_sync_payload(self.user)['token']
+        section = Section.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            section.save()
+        payload = build_sync_payload(self.user, int(token))
+        self.assertEqual([row['id'] for row in payload['changes']['sections']], [section.pk])
+        self.assertEqual(build_sync_payload(self.user, int(payload['token']))['changes'], {})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL hands out change log ids before commit')
+class ChangeLogOrderTests(TransactionTestCase):
+    def test_entries_become_visible_in_id_order(self):
+        Section.objects.create(key='order', title='Order', order=99)
+        before = current_token()
+        logged, release = threading.Event(), threading.Event()
+        errors = []
+
+        def open_transaction():
+            try:
+                with transaction.atomic():
+                    record_bulk_change(Section.objects.all())
+                    logged.set()
+                    release.wait(10)
+            except Exception as exc:  # Surfaced by the assertion below.
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        def later_writer():
+            try:
+                record_bulk_change(Section.objects.all())
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=open_transaction)
+        first.start()
+        self.assertTrue(logged.wait(10))
+        second = threading.Thread(target=later_writer)
+        second.start()
+        second.join(0.5)
+        # The second writer may not take an id until the first has committed.
+        self.assertTrue(second.is_alive())
+        self.assertEqual(current_token(), before)
+        release.set()
+        first.join(10)
+        second.join(10)
+        self.assertEqual(errors, [])
+        first_id, second_id = ChangeLogEntry.objects.filter(id__gt=before).order_by('id').values_list('id', flat=True)
+        self.assertLess(first_id, second_id)
@@ -0,0 +1,95 @@
+from unittest import mock, skipUnless
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from questionnaire.middleware import LoadSheddingMiddleware
+from questionnaire.throttling import MemoryTokenBucketBackend, RedisTokenBucketBackend, parse_rate
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401 - fakeredis runs Lua scripts with it
+except ImportError:
+    fakeredis = None
+
+
+class TokenBucketMixin:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def test_burst_then_refusal_with_wait(self):
+        backend = self.make_backend()
+        rate = parse_rate('60/min')
+        for _ in range(3):
+            self.assertEqual(backend.consume('read:user:1', rate, 3)[0], True)
+        allowed, wait = backend.consume('read:user:1', rate, 3)
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 1.0)
+
+    def test_buckets_are_per_key(self):
+        backend = self.make_backend()
+        self.assertTrue(backend.consume('write:user:1', 1.0, 1)[0])
+        self.assertFalse(backend.consume('write:user:1', 1.0, 1)[0])
+        self.assertTrue(backend.consume('write:user:2', 1.0, 1)[0])
+
+
+class MemoryTokenBucketTests(TokenBucketMixin, SimpleTestCase):
+    def make_backend(self):
+        return MemoryTokenBucketBackend()
+
+    def test_tokens_refill_over_time(self):
+        backend = self.make_backend()
+        with mock.patch('questionnaire.throttling.time.monotonic', return_value=100.0):
+            self.assertTrue(backend.consume('ai:user:1', 0.5, 1)[0])
+            self.assertFalse(backend.consume('ai:user:1', 0.5, 1)[0])
+        with mock.patch('questionnaire.throttling.time.monotonic', return_value=102.0):
+            self.assertTrue(backend.consume('ai:user:1', 0.5, 1)[0])
+
+
+@skipUnless(fakeredis, 'needs fakeredis with Lua support (fakeredis[lua])')
+class RedisTokenBucketTests(TokenBucketMixin, SimpleTestCase):
+    def make_backend(self):
+        server = fakeredis.FakeServer()
+        with mock.patch('redis.Redis.from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=server)):
+            return RedisTokenBucketBackend('redis://localhost:6379/0')
+
+
+@override_settings(LOAD_SHEDDING={
+    'ENABLED': True, 'MAX_QUEUE_SECONDS': 2.0, 'MAX_LATENCY_SECONDS': 1.0,
+    'LOW_PRIORITY_SCOPES': ['ai'], 'LOW_PRIORITY_PREFIXES': ['/api/me/export/'], 'RETRY_AFTER': 5,
+})
+class LoadSheddingTests(SimpleTestCase):
+    def setUp(self):
+        self.middleware = LoadSheddingMiddleware(lambda request: HttpResponse())
+        self.factory = RequestFactory()
+
+    def shed(self, path, **headers):
+        request = self.factory.get(path, **headers)
+        self.middleware.process_request(request)
+        response = self.middleware.process_view(request, lambda r: None, (), {})
+        return response is not None and response.status_code == 503
+
+    def test_low_priority_requests_are_shed_while_latency_is_high(self):
+        self.middleware.latency = 5.0
+        self.assertTrue(self.shed('/api/me/export/'))
+        self.assertFalse(self.shed('/api/me/plan/'))
+
+    def test_queueing_time_alone_sheds(self):
+        with mock.patch('questionnaire.middleware.time.time', return_value=1_700_000_010.0):
+            self.assertTrue(self.shed('/api/me/export/', HTTP_X_REQUEST_START='t=1700000000000'))  # ms
+            self.assertFalse(self.shed('/api/me/export/', HTTP_X_REQUEST_START='t=1700000009.5'))
+
+    def test_average_decays_while_requests_are_shed(self):
+        with mock.patch('questionnaire.middleware.time.monotonic', return_value=0.0):
+            self.middleware.latency, self.middleware.measured_at = 4.0, 0.0
+            self.assertTrue(self.shed('/api/me/export/'))
+        # Two half-lives later 4s has decayed to 1s; one more and it is under the limit.
+        with mock.patch('questionnaire.middleware.time.monotonic', return_value=3 * self.middleware.half_life):
+            self.assertFalse(self.shed('/api/me/export/'))
+
+    def test_shed_responses_are_not_averaged_in(self):
+        request = self.factory.get('/api/me/export/')
+        self.middleware.process_request(request)
+        self.middleware.process_response(request, HttpResponse(status=503))
+        self.assertEqual(self.middleware.latency, 0.0)
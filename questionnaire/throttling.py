@@ -0,0 +1,163 @@
+"""
+Token-bucket rate limiting for the API.
+
+Every request draws from one bucket per (scope, user): 'ai' for AI endpoints,
+'write' for unsafe methods and 'read' otherwise. Buckets live in Redis and are
+updated atomically by a Lua script so all gunicorn workers share them; an
+in-memory backend is used when REDIS_URL is not configured (dev and tests).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+# KEYS[1] bucket key. ARGV: refill rate (tokens/sec), capacity, cost.
+# Returns {allowed (0/1), seconds until `cost` tokens are available}.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+def parse_rate(rate):
+    """Parse '30/min' style rates into tokens per second."""
+    count, period = rate.split('/')
+    return int(count) / DURATIONS[period]
+
+
+class MemoryTokenBucketBackend:
+    """Process-local buckets; same semantics as the Redis backend."""
+
+    def __init__(self, **kwargs):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, capacity, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                return True, 0.0
+            self._buckets[key] = (tokens, now)
+            return False, (cost - tokens) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisTokenBucketBackend:
+    """Buckets shared by all workers, updated atomically with a Lua script."""
+
+    def __init__(self, url, prefix='throttle:', **kwargs):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self.script = self.client.register_script(TOKEN_BUCKET_LUA)
+        self.prefix = prefix
+
+    def consume(self, key, rate, capacity, cost=1):
+        allowed, wait = self.script(keys=[self.prefix + key], args=[rate, capacity, cost])
+        return bool(allowed), float(wait)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured bucket backend, created on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = dict(settings.THROTTLE_BACKEND)
+                backend_class = import_string(config.pop('BACKEND'))
+                _backend = backend_class(**{key.lower(): value for key, value in config.items()})
+    return _backend
+
+
+def reset_backend():
+    """Forget the backend so the next request builds its own (called after a worker forks)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+class BucketThrottle(BaseThrottle):
+    """
+    DRF throttle drawing from the request's token bucket.
+
+    Views can set `throttle_scope = 'ai'` (or any THROTTLE_BUCKETS key);
+    otherwise the scope is 'read' for safe methods and 'write' for the rest.
+    Redis errors fail open so an outage does not take the API down with it.
+    """
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def allow_request(self, request, view):
+        return self.consume(request, self.get_scope(request, view))
+
+    def consume(self, request, scope):
+        """
+        Draw one token from `scope`'s bucket for the request's user (or
+        client address). Also used directly for work a view only does
+        sometimes, such as creating a legacy placeholder user.
+        """
+        bucket = settings.THROTTLE_BUCKETS.get(scope)
+        if bucket is None:
+            return True
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'anon:{self.get_ident(request)}'
+
+        try:
+            allowed, self._wait = get_backend().consume(
+                f'{scope}:{ident}', parse_rate(bucket['rate']), bucket['burst']
+            )
+        except Exception:
+            logger.warning('Throttle backend unavailable; allowing request', exc_info=True)
+            return True
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
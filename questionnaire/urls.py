@@ -1,16 +1,33 @@
 """URL configuration for the questionnaire API."""
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView
 from . import views
 
 router = DefaultRouter()
 router.register(r'responses', views.ResponseViewSet)
 router.register(r'team', views.TeamMemberViewSet)
+router.register(r'explanations', views.ExplanationViewSet, basename='explanation')
 
 urlpatterns = [
+    # Before the router, whose responses/<pk>/ route would match it.
+    path('responses/ops/', views.ResponseOpsView.as_view(), name='response-ops'),
     path('', include(router.urls)),
     path('main-question/', views.MainScreenQuestionView.as_view(), name='main-question'),
     path('questions/', views.QuestionDataView.as_view(), name='question-data'),
     path('choices/<str:question_key>/', views.ChoicesView.as_view(), name='choices'),
+    path('auth/token/', TokenObtainPairView.as_view(), name='token-obtain'),
+    path('auth/token/refresh/', views.RotatingTokenRefreshView.as_view(), name='token-refresh'),
+    path('auth/logout/', views.LogoutView.as_view(), name='logout'),
+    path('content/manifest/', views.content_manifest, name='content-manifest'),
+    path('images/<str:digest>/<str:name>', views.image_variant, name='image-variant'),
+    path('me/plan/', views.PlanView.as_view(), name='plan'),
+    path('me/plan/affirmations/', views.PlanAffirmationsView.as_view(), name='plan-affirmations'),
+    path('me/export/', views.PlanExportView.as_view(), name='plan-export'),
+    path('care-team/overview/', views.CareTeamOverviewView.as_view(), name='care-team-overview'),
+    path('me/notifications/', views.NotificationPreferenceView.as_view(), name='notification-preferences'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
     path('health/', views.health_check, name='health-check'),
+    path('ready/', views.ready_check, name='ready-check'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
@@ -1,20 +1,59 @@
 """API views for the AWFM Questionnaire."""
+import hmac
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_safe
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view, throttle_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response as DRFResponse
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from .models import Question, Choice, TeamMember, MainScreenQuestion, Response
+from .models import (
+    LegacyQuestion, LegacyTeamMember, LegacyMainScreenQuestion, LegacyResponse, Explanation, NotificationPreference,
+    QuestionResponse, CheckpointResponse,
+)
+from . import audit
+from .authentication import RotatingTokenRefreshSerializer, deny_token
+from .autosave import apply_ops
+from .backfill import forget_response, legacy_user_uuid, mirror_response
+from .bundles import load_manifest
+from .permissions import CanViewExplanation, visible_explanations
+from .plans import plan_queryset, selected_choices_prefetch
+from .export import iter_plan_json, iter_plan_html
+from .health import readiness
+from .idempotency import idempotent
+from .images import CONTENT_TYPES, get_storage, variant_name
+from .metrics import render_metrics
+from .overview import team_overview
+from .similarity import similar_explanations
+from .snapshots import affirmation_diffs
+from .sync import build_sync_payload
+from .throttling import BucketThrottle
 from .serializers import (
     QuestionSerializer, ChoiceSerializer,
-    TeamMemberSerializer, MainScreenQuestionSerializer, ResponseSerializer
+    TeamMemberSerializer, MainScreenQuestionSerializer, ResponseSerializer,
+    ExplanationSerializer, PlanQuestionResponseSerializer, NotificationPreferenceSerializer,
+    ResponseOpsSerializer, QuestionResponseSerializer, CheckpointResponseSerializer,
 )
 
 
+def page_rows(response):
+    """The serialized rows of a list response, paginated or not."""
+    return response.data['results'] if isinstance(response.data, dict) else response.data
+
+
 class MainScreenQuestionView(APIView):
     """Get the main screen question."""
     def get(self, request):
-        question = MainScreenQuestion.objects.first()
+        question = LegacyMainScreenQuestion.objects.first()
         if question:
             serializer = MainScreenQuestionSerializer(question)
             return DRFResponse(serializer.data)
@@ -28,7 +67,7 @@ class MainScreenQuestionView(APIView):
 class QuestionDataView(APIView):
     """Get question metadata for all checkpoints (q1, q2, q3)."""
     def get(self, request):
-        questions = Question.objects.all()
+        questions = LegacyQuestion.objects.all()
         result = {}
         for q in questions:
             result[q.key] = QuestionSerializer(q).data
@@ -39,27 +78,27 @@ class ChoicesView(APIView):
     """Get choices for a specific question (q1, q2, or q3)."""
     def get(self, request, question_key):
         try:
-            question = Question.objects.get(key=question_key)
+            question = LegacyQuestion.objects.get(key=question_key)
             choices = question.choices.all()
             serializer = ChoiceSerializer(choices, many=True)
             return DRFResponse(serializer.data)
-        except Question.DoesNotExist:
+        except LegacyQuestion.DoesNotExist:
             return DRFResponse([], status=status.HTTP_404_NOT_FOUND)
 
 
 class TeamMemberViewSet(viewsets.ReadOnlyModelViewSet):
     """API endpoint for team members (with affirmation status)."""
-    queryset = TeamMember.objects.all()
+    queryset = LegacyTeamMember.objects.all()
     serializer_class = TeamMemberSerializer
 
 
 class ResponseViewSet(viewsets.ModelViewSet):
-    """API endpoint for user responses."""
-    queryset = Response.objects.all()
+    """API endpoint for user responses (mirrored into the new response tables, see questionnaire.backfill)."""
+    queryset = LegacyResponse.objects.all()
     serializer_class = ResponseSerializer
 
     def get_queryset(self):
-        queryset = Response.objects.all()
+        queryset = LegacyResponse.objects.all()
         user_id = self.request.query_params.get('user_id')
         question_key = self.request.query_params.get('question')
 
@@ -70,6 +109,21 @@ class ResponseViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def _audit(self, action, responses):
+        for response in responses:
+            audit.record(self.request, action, 'legacy_response', response['id'],
+                         owner=legacy_user_uuid(response['user_id']))
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        self._audit('phi_viewed', page_rows(response))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        self._audit('phi_viewed', [response.data])
+        return response
+
     def create(self, request, *args, **kwargs):
         """Create or update a response (upsert behavior)."""
         user_id = request.data.get('user_id')
@@ -77,19 +131,264 @@ class ResponseViewSet(viewsets.ModelViewSet):
 
         if user_id and question_key:
             try:
-                question = Question.objects.get(key=question_key)
-                existing = Response.objects.get(user_id=user_id, question=question)
+                question = LegacyQuestion.objects.get(key=question_key)
+                existing = LegacyResponse.objects.get(user_id=user_id, question=question)
                 serializer = self.get_serializer(existing, data=request.data, partial=True)
                 serializer.is_valid(raise_exception=True)
-                serializer.save()
+                self.perform_update(serializer)
                 return DRFResponse(serializer.data, status=status.HTTP_200_OK)
-            except (Question.DoesNotExist, Response.DoesNotExist):
+            except (LegacyQuestion.DoesNotExist, LegacyResponse.DoesNotExist):
                 pass
 
         return super().create(request, *args, **kwargs)
 
+    def _may_create_legacy_user(self):
+        # Anyone can post new client ids; each one would otherwise add a User row.
+        return BucketThrottle().consume(self.request, 'legacy_user')
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        mirror_response(serializer.save(), may_create_user=self._may_create_legacy_user)
+        self._audit('phi_created', [serializer.data])
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        mirror_response(serializer.save(), may_create_user=self._may_create_legacy_user)
+        self._audit('phi_updated', [serializer.data])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        self._audit('phi_deleted', [{'id': instance.pk, 'user_id': instance.user_id}])
+        forget_response(instance)
+        instance.delete()
+
+
+class ResponseOpsView(APIView):
+    """
+    Apply a batch of queued choice toggles and completion changes in one
+    transaction (see questionnaire.autosave). Requires an Idempotency-Key;
+    operations at or below the client's last applied seq are skipped.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        serializer = ResponseOpsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        applied, skipped, last_seq, question_response_ids, checkpoint_response_ids = apply_ops(
+            request.user, serializer.validated_data['client'], serializer.validated_data['ops'],
+        )
+        audit.record(request, 'phi_updated', 'checkpoint_response', checkpoint_response_ids, owner=request.user.pk)
+        checkpoint_responses = CheckpointResponse.objects.filter(
+            user=request.user, pk__in=checkpoint_response_ids,
+        ).prefetch_related(selected_choices_prefetch(request.user))
+        return DRFResponse({
+            'applied': applied,
+            'skipped': skipped,
+            'last_seq': last_seq,
+            'question_responses': QuestionResponseSerializer(
+                QuestionResponse.objects.filter(user=request.user, pk__in=question_response_ids), many=True,
+            ).data,
+            'checkpoint_responses': CheckpointResponseSerializer(checkpoint_responses, many=True).data,
+        })
+
+
+class ExplanationViewSet(viewsets.ReadOnlyModelViewSet):
+    """Explanations the current user may see (own, their care teams', and public)."""
+    serializer_class = ExplanationSerializer
+    permission_classes = [IsAuthenticated, CanViewExplanation]
+
+    def get_queryset(self):
+        queryset = visible_explanations(Explanation.objects.all(), self.request.user)
+        question_key = self.request.query_params.get('question')
+        author_id = self.request.query_params.get('user')
+        if question_key:
+            queryset = queryset.filter(question_response__main_question__key=question_key)
+        if author_id:
+            try:
+                author_id = uuid.UUID(author_id)
+            except ValueError:
+                raise ValidationError({'detail': 'Invalid user id.'})
+            queryset = queryset.filter(user_id=author_id)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        audit.record_rows(request, 'explanation_viewed', 'explanation', page_rows(response))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        audit.record_rows(request, 'explanation_viewed', 'explanation', [response.data])
+        return response
+
+    @action(detail=False)
+    def similar(self, request):
+        """Public explanations by the users who answered most like the current user (`?question=`)."""
+        explanations = similar_explanations(request.user, request.query_params.get('question'))
+        data = [
+            dict(self.get_serializer(explanation).data, similarity=round(explanation.similarity, 3))
+            for explanation in explanations
+        ]
+        audit.record_rows(request, 'explanation_viewed', 'explanation', data)
+        return DRFResponse(data)
+
+
+class RotatingTokenRefreshView(TokenRefreshView):
+    """Exchange a refresh token for a new access/refresh pair (single use)."""
+    serializer_class = RotatingTokenRefreshSerializer
+
+
+class LogoutView(APIView):
+    """Revoke the current access token and, if given, the refresh token."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.auth is not None and hasattr(request.auth, 'payload'):
+            deny_token(request.auth)
+        refresh = request.data.get('refresh')
+        if refresh:
+            try:
+                deny_token(RefreshToken(refresh))
+            except TokenError:
+                pass
+        return DRFResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+class PlanView(APIView):
+    """The current user's full care plan, loaded in a fixed number of queries."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = PlanQuestionResponseSerializer(plan_queryset(request.user), many=True)
+        audit.record(request, 'phi_viewed', 'plan', request.user.pk, owner=request.user.pk)
+        return DRFResponse({'responses': serializer.data})
+
+
+class PlanAffirmationsView(APIView):
+    """The current plan version and what changed in it since each care-team member affirmed."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        audit.record(request, 'phi_viewed', 'plan_affirmations', request.user.pk, owner=request.user.pk)
+        return DRFResponse(affirmation_diffs(request.user))
+
+
+class CareTeamOverviewView(APIView):
+    """Each member of the current user's care team with role, affirmation and questionnaire progress."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        overview = team_overview(request.user)
+        if overview is None:
+            return DRFResponse({'detail': 'You do not have a care team.'}, status=status.HTTP_404_NOT_FOUND)
+        audit.record(request, 'phi_viewed', 'care_team_overview', overview['team']['id'], owner=request.user.pk)
+        return DRFResponse(overview)
+
+
+class NotificationPreferenceView(APIView):
+    """Read or change how often the current user gets care-team digests."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        preference = NotificationPreference.objects.filter(user=request.user).first()
+        return DRFResponse(NotificationPreferenceSerializer(preference or NotificationPreference(user=request.user)).data)
+
+    def patch(self, request):
+        preference, _ = NotificationPreference.objects.get_or_create(user=request.user)
+        serializer = NotificationPreferenceSerializer(preference, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return DRFResponse(serializer.data)
+
+
+class PlanExportView(APIView):
+    """
+    Stream the current user's complete care plan.
+
+    Returns JSON by default, or a printable HTML page with ?output=html.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.query_params.get('output') == 'html':
+            response = StreamingHttpResponse(iter_plan_html(request.user), content_type='text/html; charset=utf-8')
+            filename = 'care-plan.html'
+        else:
+            response = StreamingHttpResponse(iter_plan_json(request.user), content_type='application/json')
+            filename = 'care-plan.json'
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        audit.record(request, 'phi_exported', 'plan', request.user.pk, owner=request.user.pk)
+        return response
+
+
+class SyncView(APIView):
+    """
+    Delta sync for returning clients.
+
+    Without ?since the full state is returned along with a token; passing that
+    token back returns only rows changed since, plus tombstones for deletions.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return DRFResponse({'detail': 'Invalid sync token.'}, status=status.HTTP_400_BAD_REQUEST)
+        audit.record(request, 'phi_viewed', 'sync', since or 0, owner=request.user.pk)
+        return DRFResponse(build_sync_payload(request.user, since))
+
+
+@api_view(['GET'])
+def content_manifest(request):
+    """Current content bundle hash and URLs; the bundles themselves are static files."""
+    manifest = load_manifest()
+    if manifest is None:
+        return DRFResponse({'detail': 'Content bundle has not been built.'}, status=status.HTTP_404_NOT_FOUND)
+    response = DRFResponse(manifest)
+    response['ETag'] = f'"{manifest["version"]}"'
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
 
 @api_view(['GET'])
+@throttle_classes([])
 def health_check(request):
-    """Health check endpoint."""
+    """Liveness: the process is up and serving. Dependencies are checked by ready_check."""
     return DRFResponse({'status': 'healthy', 'service': 'awfm-questionnaire'})
+
+
+@api_view(['GET'])
+@throttle_classes([])
+def ready_check(request):
+    """Readiness: database, cache and storage answer within READINESS['TIMEOUT']."""
+    ready, checks = readiness()
+    return DRFResponse(
+        {'status': 'ready' if ready else 'unavailable', 'checks': checks},
+        status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+def metrics(request):
+    """Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS['TOKEN']>` when a token is set."""
+    token = settings.METRICS['TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+@require_safe
+@condition(etag_func=lambda request, digest, name: f'"{digest}-{name}"')
+def image_variant(request, digest, name):
+    """A content image variant. Its URL names its content, so clients and CDNs may keep it forever."""
+    stored = variant_name(digest, name)
+    if stored is None:
+        raise Http404('No such image variant.')
+    response = FileResponse(get_storage().open(stored), content_type=CONTENT_TYPES[name.rsplit('.', 1)[1]])
+    response['Cache-Control'] = f'public, max-age={settings.IMAGES["CACHE_SECONDS"]}, immutable'
+    return response